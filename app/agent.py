@@ -1,21 +1,65 @@
-"""Example ADK agent using DatastoreSearchTool."""
+"""Example ADK agent using the search tools configured in ``config/agent.yaml``."""
 
 from dotenv import load_dotenv
 from google.adk.agents import Agent
 
 from .config import agent_config
-# from .tools.datastore_tool import datastore_search_tool as search_tool
-from .tools.ragengine_tool import ask_vertex_ai_rag_engine as search_tool
-# from .tools.ragengine_tool import rag_engine_tool as search_tool
-from .utils.prompts import get_prompt
+from .tools import build_tools
+from .tools.common import get_prefetcher
+from .utils import telemetry
+from .utils.answer_cache import AnswerCache
+from .utils.prompts import prompt_provider
 
 load_dotenv()
 
+if agent_config.telemetry:
+    telemetry.configure(breakdown_path=agent_config.telemetry_breakdown_path)
+
+# Only the configured tools are imported and built; their clients connect on
+# first use, or when a deployed replica starts (see ``app/agent_engine.py``).
+tools = build_tools(agent_config.tools)
+
+# Repeated opening questions are answered from the cache without calling the
+# model or the tools. Cached answers are scoped to the prompt and corpus version.
+answer_cache = (
+    AnswerCache(
+        namespace=(agent_config.agent_prompt_id, agent_config.rag_corpus, agent_config.answer_cache_corpus_version),
+        max_entries=agent_config.answer_cache_size,
+        ttl=agent_config.answer_cache_ttl,
+        similarity_threshold=agent_config.answer_cache_similarity,
+    )
+    if agent_config.answer_cache_size > 0
+    else None
+)
+
+# Retrieval for the user's message starts alongside the first model call; the
+# tools use its result when the model's query matches the message.
+prefetcher = get_prefetcher()
+if prefetcher is not None:
+    prefetcher.track(tools)
+
+before_agent_callbacks, after_agent_callbacks = [], []
+before_model_callbacks, after_model_callbacks = [], []
+if agent_config.telemetry:
+    before_agent_callbacks.append(telemetry.start_turn_callback)
+    after_agent_callbacks.append(telemetry.end_turn_callback)
+if answer_cache:
+    # First, so that a cached answer skips the prefetch as well as the model.
+    before_model_callbacks.append(answer_cache.before_model_callback)
+    after_model_callbacks.append(answer_cache.after_model_callback)
+if prefetcher is not None:
+    before_model_callbacks.append(prefetcher.before_model_callback)
+    after_agent_callbacks.append(prefetcher.after_agent_callback)
+
 root_agent = Agent(
     model=agent_config.model,
     name=agent_config.name,
-    instruction=get_prompt(agent_config.agent_prompt_id),
-    tools=[search_tool],
+    instruction=prompt_provider(agent_config.agent_prompt_id),
+    tools=tools,
+    before_agent_callback=before_agent_callbacks or None,
+    after_agent_callback=after_agent_callbacks or None,
+    before_model_callback=before_model_callbacks or None,
+    after_model_callback=after_model_callbacks or None,
 )
 
 __all__ = ["root_agent"]
@@ -0,0 +1,31 @@
+"""Vertex AI Agent Engine entrypoint for the agent in ``app/agent.py``."""
+
+from vertexai.preview.reasoning_engines import AdkApp
+
+from .agent import root_agent, tools
+from .config import agent_config
+from .tools import warm_up_tools
+
+
+class AgentApp(AdkApp):
+    """
+    ``AdkApp`` that connects the tools' Google Cloud clients in the background
+    when Agent Engine sets up a replica, if ``grpc_warm_up_timeout`` is set.
+
+    Importing the agent never starts the warm-up, so scripts and evals that only
+    import it do not open connections they may never use.
+
+    Example usage:
+      ```
+      app = AgentApp(agent=root_agent, enable_tracing=True)
+      remote_app = agent_engines.create(app, ...)
+      ```
+    """
+
+    def set_up(self) -> None:
+        super().set_up()
+        if agent_config.grpc_warm_up_timeout is not None:
+            warm_up_tools(tools, agent_config.grpc_warm_up_timeout)
+
+
+__all__ = ["AgentApp", "root_agent"]
@@ -26,8 +26,50 @@ class AgentConfig(BaseModel):
     location: str = "us-central1"
     datastore_id: str = ""
     datastore_kind: str = "Document"
+    datastore_max_pages: int | None = None
+    datastore_max_results: int | None = None
+    entity_cache_size: int = 0
+    entity_cache_ttl: float | None = 3600.0
+    entity_cache_path: str | None = None
+    grpc_pool_size: int = 4
+    grpc_keepalive_time: float = 30.0
+    grpc_keepalive_timeout: float = 10.0
+    grpc_max_concurrent_streams: int = 100
+    grpc_warm_up_timeout: float | None = None
     rag_corpus: str | None = None
+    retrieval_cache_size: int = 1024
+    retrieval_cache_ttl: float | None = 600.0
+    retrieval_cache_similarity: float | None = None
+    corpus_generations_path: str | None = None
+    corpus_generations_refresh: float = 30.0
+    retrieval_timeout: float | None = 10.0
+    retrieval_hedge_percentile: float | None = None
+    retrieval_breaker_failures: int = 5
+    retrieval_breaker_reset: float = 30.0
+    reranker: str | None = None
+    rerank_fetch_k: int = 20
+    rerank_top_n: int = 5
+    rerank_token_budget: int | None = None
+    context_token_budget: int | None = None
+    context_max_document_tokens: int | None = 600
+    retrieval_session_dedup: bool = False
+    retrieval_session_max_remembered: int = 2000
+    retrieval_prefetch: bool = False
+    retrieval_prefetch_similarity: float | None = None
+    retrieval_coalesce: bool = True
     agent_prompt_id: str = "default"
+    answer_cache_size: int = 0
+    answer_cache_ttl: float | None = 3600.0
+    answer_cache_similarity: float | None = 0.95
+    answer_cache_corpus_version: str = ""
+    tools: list[str] = ["ask_vertex_ai_rag_engine"]
+    hybrid_rag_corpora: list[str] = []
+    hybrid_top_n: int = 10
+    local_index_path: str | None = None
+    local_index_top_k: int = 5
+    local_index_nprobe: int = 16
+    telemetry: bool = False
+    telemetry_breakdown_path: str | None = None
 
 
 class DeploymentConfig(BaseModel):
@@ -0,0 +1,72 @@
+"""
+Registry of the agent's search tools.
+
+Tools are named in ``tools`` in ``config/agent.yaml``. ``build_tools`` imports
+only the modules those tools live in and builds each tool once per process, so
+an agent that uses one tool does not pay for importing and constructing the rest.
+"""
+
+from __future__ import annotations
+
+import importlib
+import logging
+import threading
+from typing import Any, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tool name -> (module in this package, factory in that module).
+TOOL_FACTORIES = {
+    "ask_vertex_ai_rag_engine": ("ragengine_tool", "build_ask_vertex_ai_rag_engine"),
+    "rag_engine_tool": ("ragengine_tool", "build_rag_engine_tool"),
+    "datastore_search_tool": ("datastore_tool", "build_datastore_search_tool"),
+    "hybrid_search_tool": ("hybrid_tool", "build_hybrid_search_tool"),
+    "local_index_tool": ("local_index_tool", "build_local_index_tool"),
+}
+
+
+def build_tool(name: str) -> Any:
+    """
+    Import the module of tool ``name`` and build the tool.
+
+    Raises:
+      ValueError: If ``name`` is not a known tool, or the tool is not configured
+        (``local_index_tool`` without ``local_index_path``).
+    """
+    if name not in TOOL_FACTORIES:
+        raise ValueError(f"Unknown tool '{name}'; expected one of {sorted(TOOL_FACTORIES)}")
+    module_name, factory_name = TOOL_FACTORIES[name]
+    module = importlib.import_module(f".{module_name}", __name__)
+    tool = getattr(module, factory_name)()
+    if tool is None:
+        raise ValueError(f"Tool '{name}' is not configured in agent.yaml")
+    return tool
+
+
+def build_tools(names: Iterable[str]) -> List[Any]:
+    """Build the tools named in ``names``, in order."""
+    return [build_tool(name) for name in names]
+
+
+def warm_up_tools(tools: Iterable[Any], timeout: Optional[float] = None) -> threading.Thread:
+    """
+    Connect the clients of ``tools`` on a background thread so startup does not wait for it.
+
+    Tools without a ``warm_up`` method are skipped; a failed warm-up is logged
+    and the connection is made on the first call instead.
+    """
+    tools = [tool for tool in tools if hasattr(tool, "warm_up")]
+
+    def run() -> None:
+        for tool in tools:
+            try:
+                tool.warm_up(timeout)
+            except Exception as error:
+                logger.warning("Warming up %s failed: %s", tool.name, error)
+
+    thread = threading.Thread(target=run, name="tool-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+__all__ = ["TOOL_FACTORIES", "build_tool", "build_tools", "warm_up_tools"]
@@ -0,0 +1,133 @@
+"""
+Pieces shared by the search tools, built from ``agent_config`` on first use.
+
+Every tool that asks for the packer, retrieval cache, hedged caller, reranker,
+session deduplicator, prefetcher or single-flight group gets the same instance,
+so tools combined by the hybrid search share one cache and one circuit breaker.
+"""
+
+from __future__ import annotations
+
+import functools
+from typing import Any, Dict, List, Optional, Sequence
+
+from ..config import agent_config
+from ..utils.context_packing import ContextPacker
+from ..utils.corpus_generation import CorpusGenerations
+from ..utils.hedging import CircuitBreaker, HedgedCaller
+from ..utils.prefetch import RetrievalPrefetcher
+from ..utils.reranking import Reranker, build_reranker
+from ..utils.retrieval_cache import RetrievalCache
+from ..utils.session_dedup import SessionDeduplicator
+from ..utils.single_flight import SingleFlight
+
+
+@functools.cache
+def get_packer() -> Optional[ContextPacker]:
+    """Return the context packer for tool results, or None when no token budget is configured."""
+    if not agent_config.context_token_budget:
+        return None
+    return ContextPacker(
+        token_budget=agent_config.context_token_budget,
+        max_document_tokens=agent_config.context_max_document_tokens,
+    )
+
+
+@functools.cache
+def get_retrieval_cache() -> Optional[RetrievalCache]:
+    """Return the RAG Engine retrieval cache, or None when it is disabled."""
+    if agent_config.retrieval_cache_size <= 0:
+        return None
+    return RetrievalCache(
+        max_entries=agent_config.retrieval_cache_size,
+        ttl=agent_config.retrieval_cache_ttl,
+        similarity_threshold=agent_config.retrieval_cache_similarity,
+        generations=(
+            CorpusGenerations(agent_config.corpus_generations_path, agent_config.corpus_generations_refresh)
+            if agent_config.corpus_generations_path
+            else None
+        ),
+    )
+
+
+@functools.cache
+def get_retrieval_caller() -> HedgedCaller:
+    """Return the deadline-bound, hedged caller for RAG Engine requests."""
+    return HedgedCaller(
+        timeout=agent_config.retrieval_timeout,
+        hedge_percentile=agent_config.retrieval_hedge_percentile,
+        breaker=CircuitBreaker(
+            failure_threshold=agent_config.retrieval_breaker_failures,
+            reset_timeout=agent_config.retrieval_breaker_reset,
+        ),
+    )
+
+
+@functools.cache
+def get_reranker() -> Optional[Reranker]:
+    """Return the configured reranker, or None for no reranking."""
+    return build_reranker(agent_config.reranker)
+
+
+@functools.cache
+def get_session_deduplicator() -> Optional[SessionDeduplicator]:
+    """Return the deduplicator of chunks across a session's turns, or None when it is disabled."""
+    if not agent_config.retrieval_session_dedup:
+        return None
+    return SessionDeduplicator(max_remembered=agent_config.retrieval_session_max_remembered)
+
+
+@functools.cache
+def get_prefetcher() -> Optional[RetrievalPrefetcher]:
+    """Return the speculative retrieval prefetcher, or None when prefetching is disabled."""
+    if not agent_config.retrieval_prefetch:
+        return None
+    return RetrievalPrefetcher(similarity_threshold=agent_config.retrieval_prefetch_similarity)
+
+
+@functools.cache
+def get_single_flight() -> Optional[SingleFlight]:
+    """Return the group that coalesces identical concurrent backend requests, or None when disabled."""
+    if not agent_config.retrieval_coalesce:
+        return None
+    return SingleFlight("retrieval")
+
+
+async def retrieve_documents(tool: Any, query: str, tool_context: Any) -> Any:
+    """Return ``tool``'s documents for ``query``: the turn's prefetched result when it matches, else ``tool.retrieve``."""
+    prefetcher = getattr(tool, "prefetcher", None)
+    if prefetcher is not None and tool_context is not None:
+        documents = await prefetcher.take(tool_context.invocation_id, tool.name, query)
+        if documents is not None:
+            return documents
+    return await tool.retrieve(query)
+
+
+def present_documents(
+    query: str,
+    documents: Sequence[Dict[str, Any]],
+    packer: Optional[ContextPacker],
+    deduplicator: Optional[SessionDeduplicator],
+    tool_context: Any,
+) -> List[Dict[str, Any]]:
+    """
+    Shape ranked documents into a tool result: without the chunks the session
+    has already seen when there is a ``deduplicator`` and a session, then packed
+    when there is a ``packer``.
+    """
+    if deduplicator is not None and tool_context is not None:
+        return deduplicator.present(query, documents, tool_context.state, packer)
+    return packer.pack(query, documents) if packer else list(documents)
+
+
+__all__ = [
+    "get_packer",
+    "get_prefetcher",
+    "get_reranker",
+    "get_retrieval_cache",
+    "get_retrieval_caller",
+    "get_session_deduplicator",
+    "get_single_flight",
+    "present_documents",
+    "retrieve_documents",
+]
@@ -1,4 +1,5 @@
-from typing import Any
+import functools
+from typing import Any, List, Optional
 
 from google.genai import types
 from google.adk.tools.base_tool import BaseTool
@@ -7,8 +8,20 @@ from google.adk.tools.tool_context import ToolContext
 from ..utils.discover_datastore_searcher import (
     DiscoveryDatastoreSearcher,
     DiscoveryDatastoreSearcherConfig,
+    Entity,
 )
 from ..config import agent_config
+from ..utils.context_packing import ContextPacker
+from ..utils.prefetch import RetrievalPrefetcher
+from ..utils.session_dedup import SessionDeduplicator
+from .common import (
+    get_packer,
+    get_prefetcher,
+    get_session_deduplicator,
+    get_single_flight,
+    present_documents,
+    retrieve_documents,
+)
 
 
 class DatastoreSearchTool(BaseTool):
@@ -20,9 +33,15 @@ class DatastoreSearchTool(BaseTool):
         *,
         name: str = "datastore_search",
         description: str = "Search indexed datastore documents",
+        packer: Optional[ContextPacker] = None,
+        deduplicator: Optional[SessionDeduplicator] = None,
+        prefetcher: Optional[RetrievalPrefetcher] = None,
     ) -> None:
         super().__init__(name=name, description=description)
         self.searcher = searcher
+        self.packer = packer
+        self.deduplicator = deduplicator
+        self.prefetcher = prefetcher
 
     def _get_declaration(self) -> types.FunctionDeclaration:
         return types.FunctionDeclaration(
@@ -39,27 +58,77 @@ class DatastoreSearchTool(BaseTool):
             ),
         )
 
+    @staticmethod
+    def _to_document(doc_id: str, entity: Optional[Entity]) -> dict[str, Any]:
+        """Flatten a search result and its entity into the document shape the retrieval tools share."""
+        entity = entity or {}
+        return {
+            "id": doc_id,
+            "title": entity.get("title") or doc_id,
+            "content": entity.get("content", ""),
+            "source_uri": entity.get("source_uri") or entity.get("url") or "",
+        }
+
+    def warm_up(self, timeout: Optional[float] = None) -> None:
+        """Connect the searcher's clients ahead of the first query."""
+        self.searcher.warm_up(timeout)
+
+    async def retrieve(self, query: str) -> List[dict[str, Any]]:
+        """Search for ``query`` and return one document dict per result, best first."""
+        documents: List[dict[str, Any]] = []
+        for response, entities in await self.searcher.collect_async(query):
+            entities = entities or [None] * len(response.results)
+            for result, entity in zip(response.results, entities):
+                documents.append(self._to_document(result.id, entity))
+        return documents
+
     async def run_async(
         self, *, args: dict[str, Any], tool_context: ToolContext
     ) -> Any:
         query = args["query"]
-        results = self.searcher(query)
-        return results
+        documents = await retrieve_documents(self, query, tool_context)
+        return present_documents(query, documents, self.packer, self.deduplicator, tool_context)
 
 
-config = DiscoveryDatastoreSearcherConfig(
-    project_id=agent_config.project_id,
-    location=agent_config.location,
-    data_store_id=agent_config.datastore_id,
-    datastore_kind=agent_config.datastore_kind,
-)
+@functools.cache
+def get_searcher() -> DiscoveryDatastoreSearcher:
+    """Return the searcher for the configured datastore; its clients connect on first search."""
+    config = DiscoveryDatastoreSearcherConfig(
+        project_id=agent_config.project_id,
+        location=agent_config.location,
+        data_store_id=agent_config.datastore_id,
+        datastore_kind=agent_config.datastore_kind,
+        max_pages=agent_config.datastore_max_pages,
+        max_results=agent_config.datastore_max_results,
+        entity_cache_size=agent_config.entity_cache_size,
+        entity_cache_ttl=agent_config.entity_cache_ttl,
+        entity_cache_path=agent_config.entity_cache_path,
+        channel_pool_size=agent_config.grpc_pool_size,
+        keepalive_time=agent_config.grpc_keepalive_time,
+        keepalive_timeout=agent_config.grpc_keepalive_timeout,
+        max_concurrent_streams=agent_config.grpc_max_concurrent_streams,
+    )
+    return DiscoveryDatastoreSearcher(config=config, single_flight=get_single_flight())
 
-searcher = DiscoveryDatastoreSearcher(config=config)
 
-datastore_search_tool = DatastoreSearchTool(
-    searcher=searcher,
-    name="search_datastore",
-    description="Search documents from datastore",
-)
+@functools.cache
+def build_datastore_search_tool() -> DatastoreSearchTool:
+    """Build the configured datastore search tool once per process."""
+    return DatastoreSearchTool(
+        searcher=get_searcher(),
+        name="search_datastore",
+        description="Search documents from datastore",
+        packer=get_packer(),
+        deduplicator=get_session_deduplicator(),
+        prefetcher=get_prefetcher(),
+    )
+
+
+def __getattr__(name: str) -> Any:
+    # Build the module-level tool on first access rather than at import.
+    if name == "datastore_search_tool":
+        return build_datastore_search_tool()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-__all__ = ["datastore_search_tool"]
\ No newline at end of file
+__all__ = ["DatastoreSearchTool", "build_datastore_search_tool", "datastore_search_tool"]
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import hashlib
+import logging
+from typing import Any, Awaitable, List, Optional, Protocol, Sequence
+
+from google.genai import types
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+from ..config import agent_config
+from ..utils.context_packing import ContextPacker
+from ..utils.embeddings import normalize_text
+from ..utils.fusion import reciprocal_rank_fusion
+from ..utils.prefetch import RetrievalPrefetcher
+from ..utils.session_dedup import SessionDeduplicator
+from .common import (
+    get_packer,
+    get_prefetcher,
+    get_session_deduplicator,
+    present_documents,
+    retrieve_documents,
+)
+from .datastore_tool import build_datastore_search_tool
+from .local_index_tool import build_local_index_tool
+from .ragengine_tool import build_rag_engine_tool, make_rag_engine_tool
+
+logger = logging.getLogger(__name__)
+
+
+class Retriever(Protocol):
+    """Anything that returns ranked document dicts for a query, e.g. the search tools in this package."""
+
+    name: str
+
+    def retrieve(self, query: str) -> Awaitable[List[dict[str, Any]]]: ...
+
+
+def document_key(document: dict[str, Any]) -> tuple[str, str]:
+    """
+    Identify a chunk by its full source URI and a hash of its normalized text, so
+    the same chunk found by several backends is merged while same-named files in
+    other directories, and other chunks of the same source, stay apart.
+    """
+    source = document.get("source_uri") or document.get("id") or document.get("title") or ""
+    digest = hashlib.sha1(normalize_text(document.get("content") or "").encode("utf-8")).hexdigest()[:16]
+    return source, digest
+
+
+class HybridSearchTool(BaseTool):
+    """Tool that queries several retrieval backends at once and fuses their rankings."""
+
+    def __init__(
+        self,
+        retrievers: Sequence[Retriever],
+        *,
+        name: str = "hybrid_search",
+        description: str = "Search all document sources at once",
+        top_n: int = 10,
+        rrf_k: int = 60,
+        packer: Optional[ContextPacker] = None,
+        deduplicator: Optional[SessionDeduplicator] = None,
+        prefetcher: Optional[RetrievalPrefetcher] = None,
+    ) -> None:
+        super().__init__(name=name, description=description)
+        self.retrievers = list(retrievers)
+        self.top_n = top_n
+        self.rrf_k = rrf_k
+        self.packer = packer
+        self.deduplicator = deduplicator
+        self.prefetcher = prefetcher
+
+    def _get_declaration(self) -> types.FunctionDeclaration:
+        return types.FunctionDeclaration(
+            name=self.name,
+            description=self.description,
+            parameters=types.Schema(
+                type=types.Type.OBJECT,
+                properties={
+                    "query": types.Schema(type=types.Type.STRING, description="User search query"),
+                },
+                required=["query"],
+            ),
+        )
+
+    def warm_up(self, timeout: Optional[float] = None) -> None:
+        """Connect the clients of every retriever that supports warming up."""
+        for retriever in self.retrievers:
+            if hasattr(retriever, "warm_up"):
+                retriever.warm_up(timeout)
+
+    async def retrieve(self, query: str) -> List[dict[str, Any]]:
+        """
+        Query every retriever concurrently and return the fused top ``top_n`` documents.
+
+        A backend that fails is logged and left out of the fusion. Each returned
+        document gains ``score`` (its RRF score) and ``retrievers`` (the backends
+        that found it).
+
+        Raises:
+          RuntimeError: If every backend failed.
+        """
+        outcomes = await asyncio.gather(
+            *(retriever.retrieve(query) for retriever in self.retrievers),
+            return_exceptions=True,
+        )
+        ranked_lists: List[List[dict[str, Any]]] = []
+        names: List[str] = []
+        for retriever, outcome in zip(self.retrievers, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.warning("Retriever %s failed: %s", retriever.name, outcome)
+                continue
+            ranked_lists.append(outcome)
+            names.append(retriever.name)
+        if not ranked_lists:
+            raise RuntimeError("every retrieval backend failed")
+
+        fused = reciprocal_rank_fusion(ranked_lists, key=document_key, k=self.rrf_k)
+        return [
+            {**document, "score": round(score, 5), "retrievers": [names[i] for i in found_in]}
+            for document, score, found_in in fused[: self.top_n]
+        ]
+
+    async def run_async(self, *, args: dict[str, Any], tool_context: ToolContext) -> Any:
+        query = args["query"]
+        try:
+            documents = await retrieve_documents(self, query, tool_context)
+        except RuntimeError as error:
+            return f"Retrieval is temporarily unavailable ({error}). Answer without the documents or ask the user to retry."
+        return present_documents(query, documents, self.packer, self.deduplicator, tool_context)
+
+
+@functools.cache
+def build_hybrid_search_tool() -> HybridSearchTool:
+    """
+    Build the hybrid search over every configured backend once per process: the
+    datastore if ``datastore_id`` is set, the ``rag_corpus`` and
+    ``hybrid_rag_corpora`` corpora, and the local index if ``local_index_path`` is set.
+
+    Raises:
+      ValueError: If no backend is configured.
+    """
+    retrievers: List[Retriever] = []
+    if agent_config.datastore_id:
+        retrievers.append(build_datastore_search_tool())
+    if agent_config.rag_corpus:
+        retrievers.append(build_rag_engine_tool())
+    retrievers.extend(
+        make_rag_engine_tool(corpus, name=f"rag_engine_query_tool_{index}")
+        for index, corpus in enumerate(agent_config.hybrid_rag_corpora, start=1)
+    )
+    local_index_tool = build_local_index_tool()
+    if local_index_tool is not None:
+        retrievers.append(local_index_tool)
+    if not retrievers:
+        raise ValueError(
+            "hybrid_search_tool needs a backend: set datastore_id, rag_corpus, hybrid_rag_corpora or local_index_path"
+        )
+    return HybridSearchTool(
+        retrievers=retrievers,
+        name="hybrid_search",
+        description="Search the datastore and the RAG Engine corpora at once and return one ranked list of documents.",
+        top_n=agent_config.hybrid_top_n,
+        packer=get_packer(),
+        deduplicator=get_session_deduplicator(),
+        prefetcher=get_prefetcher(),
+    )
+
+
+def __getattr__(name: str) -> Any:
+    # Build the module-level tool on first access rather than at import.
+    if name == "hybrid_search_tool":
+        return build_hybrid_search_tool()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ["HybridSearchTool", "build_hybrid_search_tool", "hybrid_search_tool"]
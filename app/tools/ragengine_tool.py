@@ -1,22 +1,129 @@
 from __future__ import annotations
 
-from typing import Any, List
+import asyncio
+import functools
+import logging
+from typing import Any, Callable, List, Optional
 
 from google.genai import types
+from google.adk.models import LlmRequest
 from google.adk.tools.base_tool import BaseTool
 from google.adk.tools.retrieval.vertex_ai_rag_retrieval import VertexAiRagRetrieval
 from google.adk.tools.tool_context import ToolContext
-from vertexai.preview import rag
 
 from ..config import agent_config
+from ..utils import telemetry
+from ..utils.context_packing import ContextPacker
+from ..utils.hedging import CircuitOpenError, HedgedCaller, RetrievalTimeoutError
+from ..utils.reranking import Reranker, rerank
+from ..utils.retrieval_cache import RetrievalCache
+from ..utils.prefetch import RetrievalPrefetcher
+from ..utils.session_dedup import SessionDeduplicator
+from ..utils.single_flight import SingleFlight, request_key
+from .common import (
+    get_packer,
+    get_prefetcher,
+    get_reranker,
+    get_retrieval_cache,
+    get_retrieval_caller,
+    get_session_deduplicator,
+    get_single_flight,
+    present_documents,
+    retrieve_documents,
+)
+
+
+def _rag() -> Any:
+    """Return ``vertexai.preview.rag``, imported on first retrieval since importing it takes seconds."""
+    from vertexai.preview import rag
+
+    return rag
+
+
+async def _call_backend(
+    caller: Optional[HedgedCaller], flights: Optional[SingleFlight], fn, **kwargs: Any
+) -> Any:
+    """
+    Run a blocking RAG Engine retrieval off the event loop, through ``caller`` if
+    one is set, sharing one call among identical concurrent requests if ``flights`` is set.
+    """
+
+    async def call() -> Any:
+        if caller is None:
+            return await asyncio.to_thread(fn, **kwargs)
+        return await caller.call(fn, **kwargs)
+
+    with telemetry.stage("rag.retrieve") as stage:
+        if flights is None:
+            response = await call()
+        else:
+            response = await flights.do_async(request_key(fn, **kwargs), call)
+        if stage:
+            contexts = response.contexts.contexts
+            stage.set(results=len(contexts), payload_bytes=sum(len(ctx.text) for ctx in contexts))
+    return response
+
+
+async def _rerank_contexts(
+    reranker: Optional[Reranker],
+    query: str,
+    contexts: List[Any],
+    top_n: Optional[int],
+    token_budget: Optional[int],
+) -> List[Any]:
+    """Rerank retrieved contexts on a worker thread and keep the best of them."""
+    if reranker is None:
+        return contexts
+    with telemetry.stage("rag.rerank", candidates=len(contexts)) as stage:
+        kept = await asyncio.to_thread(
+            rerank, query, contexts, lambda ctx: ctx.text, reranker, top_n, token_budget
+        )
+        stage.set(results=len(kept))
+    return kept
+
+
+def _unavailable(error: Exception) -> str:
+    """Message returned to the model when retrieval timed out or the backend is failing fast."""
+    return f"Retrieval is temporarily unavailable ({error}). Answer without the corpus or ask the user to retry."
 
 
 class RagEngineQueryTool(BaseTool):
     """Tool to query a Vertex AI RAG Engine corpus."""
 
-    def __init__(self, rag_corpus: str, *, name: str = "query_rag_engine", description: str = "Query documents from Vertex AI RAG Engine") -> None:
+    def __init__(
+        self,
+        rag_corpus: str,
+        *,
+        name: str = "query_rag_engine",
+        description: str = "Query documents from Vertex AI RAG Engine",
+        similarity_top_k: int = 5,
+        vector_distance_threshold: Optional[float] = None,
+        cache: Optional[RetrievalCache] = None,
+        caller: Optional[HedgedCaller] = None,
+        reranker: Optional[Reranker] = None,
+        top_n: Optional[int] = None,
+        token_budget: Optional[int] = None,
+        packer: Optional[ContextPacker] = None,
+        retrieval_query: Optional[Callable[..., Any]] = None,
+        deduplicator: Optional[SessionDeduplicator] = None,
+        prefetcher: Optional[RetrievalPrefetcher] = None,
+        flights: Optional[SingleFlight] = None,
+    ) -> None:
         super().__init__(name=name, description=description)
         self.rag_corpus = rag_corpus
+        # Stands in for ``rag.retrieval_query``, e.g. a replay fake in benchmarks.
+        self.retrieval_query = retrieval_query
+        self.similarity_top_k = similarity_top_k
+        self.vector_distance_threshold = vector_distance_threshold
+        self.cache = cache
+        self.caller = caller
+        self.reranker = reranker
+        self.top_n = top_n
+        self.token_budget = token_budget
+        self.packer = packer
+        self.deduplicator = deduplicator
+        self.prefetcher = prefetcher
+        self.flights = flights
 
     def _get_declaration(self) -> types.FunctionDeclaration:
         return types.FunctionDeclaration(
@@ -31,38 +138,232 @@ class RagEngineQueryTool(BaseTool):
             ),
         )
 
-    async def run_async(self, *, args: dict[str, Any], tool_context: ToolContext) -> Any:
-        query = args["query"]
-        response = rag.retrieval_query(
+    async def _retrieve(self, query: str) -> Any:
+        return await _call_backend(
+            self.caller,
+            self.flights,
+            self.retrieval_query or _rag().retrieval_query,
             text=query,
-            rag_resources=[rag.RagResource(rag_corpus=self.rag_corpus)],
-            similarity_top_k=5,
+            rag_resources=[types.VertexRagStoreRagResource(rag_corpus=self.rag_corpus)],
+            similarity_top_k=self.similarity_top_k,
+            vector_distance_threshold=self.vector_distance_threshold,
+        )
+
+    async def retrieve(self, query: str) -> List[dict[str, str]]:
+        """
+        Retrieve the contexts for ``query`` as document dicts, best first.
+
+        Raises:
+          RetrievalTimeoutError: If the retrieval misses its deadline.
+          CircuitOpenError: If the backend is failing fast.
+        """
+        if self.cache is None:
+            response = await self._retrieve(query)
+        else:
+            response = await self.cache.get_or_fetch_async(
+                query,
+                [self.rag_corpus],
+                self.similarity_top_k,
+                self.vector_distance_threshold,
+                lambda: self._retrieve(query),
+            )
+        contexts = await _rerank_contexts(
+            self.reranker, query, list(response.contexts.contexts), self.top_n, self.token_budget
         )
         results: List[dict[str, str]] = []
-        for ctx in response.contexts:
+        for ctx in contexts:
             results.append({
-                "title": ctx.title,
-                "content": ctx.chunk.content,
+                "title": ctx.source_display_name,
+                "content": ctx.text,
                 "source_uri": ctx.source_uri,
             })
         return results
 
+    async def run_async(self, *, args: dict[str, Any], tool_context: ToolContext) -> Any:
+        query = args["query"]
+        try:
+            documents = await retrieve_documents(self, query, tool_context)
+        except (RetrievalTimeoutError, CircuitOpenError) as error:
+            return _unavailable(error)
+        return present_documents(query, documents, self.packer, self.deduplicator, tool_context)
 
-ask_vertex_ai_rag_engine = VertexAiRagRetrieval(
-    name="retrieve_rag_documentation",
-    description="Use this tool to retrieve documentation and reference materials for the question from the RAG corpus,",
-    rag_resources=[rag.RagResource(rag_corpus=agent_config.rag_corpus)],
-    similarity_top_k=10,
-    vector_distance_threshold=0.6,
-)
 
-rag_engine_tool = RagEngineQueryTool(
-    rag_corpus=agent_config.rag_corpus or "default_rag_corpus",
-    name="rag_engine_query_tool",
-    description="Tool to query a Vertex AI RAG Engine corpus for relevant documents."
-)
+class CachedVertexAiRagRetrieval(VertexAiRagRetrieval):
+    """``VertexAiRagRetrieval`` that serves repeated queries from a ``RetrievalCache``,
+    runs the retrieval off the event loop through a ``HedgedCaller`` and can rerank
+    the over-fetched contexts down to ``top_n`` or ``token_budget``.
+
+    For Gemini 2 models ``VertexAiRagRetrieval`` attaches the corpus as Gemini's
+    built-in retrieval, which bypasses all of this. This tool is always declared as
+    a function instead, so every retrieval goes through ``run_async``.
+    """
+
+    def __init__(
+        self,
+        *,
+        cache: Optional[RetrievalCache] = None,
+        caller: Optional[HedgedCaller] = None,
+        reranker: Optional[Reranker] = None,
+        top_n: Optional[int] = None,
+        token_budget: Optional[int] = None,
+        packer: Optional[ContextPacker] = None,
+        deduplicator: Optional[SessionDeduplicator] = None,
+        prefetcher: Optional[RetrievalPrefetcher] = None,
+        flights: Optional[SingleFlight] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.caller = caller
+        self.reranker = reranker
+        self.top_n = top_n
+        self.token_budget = token_budget
+        self.packer = packer
+        self.deduplicator = deduplicator
+        self.prefetcher = prefetcher
+        self.flights = flights
+
+    async def process_llm_request(self, *, tool_context: ToolContext, llm_request: LlmRequest) -> None:
+        # Skip VertexAiRagRetrieval's built-in retrieval and declare the tool as a function.
+        await BaseTool.process_llm_request(self, tool_context=tool_context, llm_request=llm_request)
+
+    @property
+    def corpora(self) -> List[str]:
+        store = self.vertex_rag_store
+        return [resource.rag_corpus for resource in store.rag_resources or []] + list(
+            store.rag_corpora or []
+        )
+
+    async def retrieve(self, query: str) -> List[dict[str, str]]:
+        """
+        Retrieve the contexts for ``query`` as document dicts, best first.
+
+        Raises:
+          RetrievalTimeoutError: If the retrieval misses its deadline.
+          CircuitOpenError: If the backend is failing fast.
+        """
+        store = self.vertex_rag_store
+
+        async def retrieve() -> Any:
+            return await _call_backend(
+                self.caller,
+                self.flights,
+                _rag().retrieval_query,
+                text=query,
+                rag_resources=store.rag_resources,
+                rag_corpora=store.rag_corpora,
+                similarity_top_k=store.similarity_top_k,
+                vector_distance_threshold=store.vector_distance_threshold,
+            )
+
+        if self.cache is None:
+            response = await retrieve()
+        else:
+            response = await self.cache.get_or_fetch_async(
+                query,
+                self.corpora,
+                store.similarity_top_k,
+                store.vector_distance_threshold,
+                retrieve,
+            )
+        logging.debug("RAG raw response: %s", response)
+
+        contexts = await _rerank_contexts(
+            self.reranker, query, list(response.contexts.contexts), self.top_n, self.token_budget
+        )
+        return [
+            {"title": ctx.source_display_name, "content": ctx.text, "source_uri": ctx.source_uri}
+            for ctx in contexts
+        ]
+
+    async def run_async(self, *, args: dict[str, Any], tool_context: ToolContext) -> Any:
+        query = args["query"]
+        try:
+            documents = await retrieve_documents(self, query, tool_context)
+        except (RetrievalTimeoutError, CircuitOpenError) as error:
+            return _unavailable(error)
+        if not documents:
+            return f"No matching result found with the config: {self.vertex_rag_store}"
+        if self.packer is None and self.deduplicator is None:
+            return [document["content"] for document in documents]
+        return present_documents(query, documents, self.packer, self.deduplicator, tool_context)
+
+
+@functools.cache
+def build_ask_vertex_ai_rag_engine() -> CachedVertexAiRagRetrieval:
+    """Build the configured ``VertexAiRagRetrieval`` tool once per process."""
+    reranker = get_reranker()
+    return CachedVertexAiRagRetrieval(
+        name="retrieve_rag_documentation",
+        description="Use this tool to retrieve documentation and reference materials for the question from the RAG corpus,",
+        rag_resources=[types.VertexRagStoreRagResource(rag_corpus=agent_config.rag_corpus)],
+        similarity_top_k=agent_config.rerank_fetch_k if reranker else 10,
+        vector_distance_threshold=0.6,
+        cache=get_retrieval_cache(),
+        caller=get_retrieval_caller(),
+        reranker=reranker,
+        top_n=agent_config.rerank_top_n,
+        token_budget=agent_config.rerank_token_budget,
+        packer=get_packer(),
+        deduplicator=get_session_deduplicator(),
+        prefetcher=get_prefetcher(),
+        flights=get_single_flight(),
+    )
+
+
+def make_rag_engine_tool(
+    rag_corpus: str,
+    name: str = "rag_engine_query_tool",
+    description: str = "Tool to query a Vertex AI RAG Engine corpus for relevant documents.",
+) -> RagEngineQueryTool:
+    """Build a ``RagEngineQueryTool`` for ``rag_corpus`` with the configured settings and shared pieces."""
+    reranker = get_reranker()
+    return RagEngineQueryTool(
+        rag_corpus=rag_corpus,
+        name=name,
+        description=description,
+        similarity_top_k=agent_config.rerank_fetch_k if reranker else 5,
+        cache=get_retrieval_cache(),
+        caller=get_retrieval_caller(),
+        reranker=reranker,
+        top_n=agent_config.rerank_top_n,
+        token_budget=agent_config.rerank_token_budget,
+        packer=get_packer(),
+        deduplicator=get_session_deduplicator(),
+        prefetcher=get_prefetcher(),
+        flights=get_single_flight(),
+    )
+
+
+@functools.cache
+def build_rag_engine_tool() -> RagEngineQueryTool:
+    """Build the configured ``RagEngineQueryTool`` once per process."""
+    return make_rag_engine_tool(agent_config.rag_corpus or "default_rag_corpus")
+
+
+_LAZY_ATTRIBUTES = {
+    "ask_vertex_ai_rag_engine": build_ask_vertex_ai_rag_engine,
+    "rag_engine_tool": build_rag_engine_tool,
+    "retrieval_cache": get_retrieval_cache,
+    "retrieval_caller": get_retrieval_caller,
+    "reranker": get_reranker,
+    "packer": get_packer,
+}
+
+
+def __getattr__(name: str) -> Any:
+    # Build the module-level tools and their shared pieces on first access rather than at import.
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
+    "CachedVertexAiRagRetrieval",
+    "RagEngineQueryTool",
     "ask_vertex_ai_rag_engine",
+    "build_ask_vertex_ai_rag_engine",
+    "build_rag_engine_tool",
+    "make_rag_engine_tool",
     "rag_engine_tool",
-]
\ No newline at end of file
+]
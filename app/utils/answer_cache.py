@@ -0,0 +1,190 @@
+"""
+Cache of the agent's final answers to repeated questions.
+
+``AnswerCache.before_model_callback`` answers a cached question before the
+model is called, so a hit skips generation and, because the model never asks
+for it, retrieval too. ``after_model_callback`` stores the final answer of a
+miss. Only the opening message of a session is cached: later messages depend on
+the conversation before them.
+
+Answers are keyed on the normalized message text within a namespace that
+should identify everything else the answer depends on, e.g. the prompt id and
+corpus version. With ``similarity_threshold`` set, a message whose local
+embedding lies within that cosine similarity of a cached one in the same
+namespace is a hit too, provided both use the same content words: hashed-token
+embeddings rate "how do I enable SSO" and "how do I disable SSO" as near
+duplicates, but they are different questions. Stopwords, word order and plural
+endings may differ; negations may not.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, FrozenSet, Hashable, Optional
+
+from google.adk.models import LlmResponse
+from google.genai import types
+
+from . import telemetry
+from .cache import CacheStats, LRUCache
+from .embeddings import Embedder, NearDuplicateIndex, content_terms, normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+def _singular(term: str) -> str:
+    if len(term) > 4 and term.endswith("ies"):
+        return term[:-3] + "y"
+    if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+        return term[:-1]
+    return term
+
+
+def question_terms(text: str) -> FrozenSet[str]:
+    """Return the content words of ``text`` with plural endings removed; near-duplicate questions must share them."""
+    return frozenset(_singular(term) for term in content_terms(text))
+
+
+@dataclass
+class CachedAnswer:
+    """
+    A stored answer.
+
+    Attributes:
+      text (str): The answer text.
+      duration_ms (float): Time from the first model call to the answer when it
+        was produced; what a hit saves.
+    """
+
+    text: str
+    duration_ms: float
+
+
+class AnswerCache:
+    """
+    LRU/TTL cache of final answers with optional near-duplicate matching,
+    hooked into an agent through its model callbacks.
+
+    Attributes:
+      namespace (Hashable): Scope of the cached answers, e.g. ``(prompt_id, corpus_version)``.
+      entries (LRUCache): Answers keyed by ``(namespace, normalized_text)``.
+      similarity_threshold (Optional[float]): Minimum cosine similarity for a
+        near-duplicate hit. None restricts hits to exact normalized matches.
+      stats (CacheStats): Hits and misses of opening messages.
+      saved_ms (float): Total time the hits saved.
+
+    Example usage:
+      ```
+      cache = AnswerCache(namespace=("default", "v3"), similarity_threshold=0.95)
+      agent = Agent(
+          ...,
+          before_model_callback=cache.before_model_callback,
+          after_model_callback=cache.after_model_callback,
+      )
+      ```
+    """
+
+    def __init__(
+        self,
+        namespace: Hashable = (),
+        max_entries: int = 1024,
+        ttl: Optional[float] = 3600.0,
+        similarity_threshold: Optional[float] = None,
+        embedder: Optional[Embedder] = None,
+    ) -> None:
+        self.namespace = namespace
+        self.entries = LRUCache(max_entries=max_entries, ttl=ttl)
+        self.similarity_threshold = similarity_threshold
+        self._index = NearDuplicateIndex(similarity_threshold, embedder) if similarity_threshold is not None else None
+        self.stats = CacheStats()
+        self.saved_ms = 0.0
+        # Invocation id -> (normalized message, start) of misses awaiting their answer.
+        # Bounded so that invocations that never answer are eventually forgotten.
+        self._pending = LRUCache(max_entries=1024, ttl=600.0)
+        self._lock = threading.Lock()
+
+    def get(self, text: str) -> Optional[CachedAnswer]:
+        """Return the answer cached for ``text`` or a near duplicate of it, or None."""
+        normalized = normalize_text(text)
+        answer = self.entries.get((self.namespace, normalized))
+        if answer is not None or self._index is None:
+            return answer
+        terms = question_terms(normalized)
+        neighbour = self._index.nearest(self.namespace, normalized, lambda cached: question_terms(cached) == terms)
+        if neighbour is None:
+            return None
+        answer = self.entries.get((self.namespace, neighbour))
+        if answer is None:
+            self._index.discard(self.namespace, neighbour)
+        return answer
+
+    def set(self, text: str, answer: CachedAnswer) -> None:
+        """Cache ``answer`` for ``text``."""
+        normalized = normalize_text(text)
+        self.entries.set((self.namespace, normalized), answer)
+        if self._index is not None:
+            self._index.add(self.namespace, normalized)
+            self._index.prune(
+                self.namespace, 2 * self.entries.max_entries, lambda q: (self.namespace, q) in self.entries
+            )
+
+    def clear(self) -> None:
+        """Drop every cached answer, e.g. after the corpus was re-indexed."""
+        self.entries.clear()
+        if self._index is not None:
+            self._index.drop_groups(lambda group: True)
+
+    @staticmethod
+    def _opening_message(llm_request: Any) -> Optional[str]:
+        """Return the text of a request that carries only the session's first user message, else None."""
+        contents = llm_request.contents
+        if len(contents) != 1 or contents[0].role != "user" or not contents[0].parts:
+            return None
+        if any(part.text is None for part in contents[0].parts):
+            return None  # files, images or function parts
+        return "".join(part.text for part in contents[0].parts).strip() or None
+
+    def before_model_callback(self, callback_context: Any, llm_request: Any) -> Optional[LlmResponse]:
+        """ADK ``before_model_callback``: answer a cached opening message without calling the model."""
+        text = self._opening_message(llm_request)
+        if text is None:
+            return None
+        answer = self.get(text)
+        if answer is None:
+            with self._lock:
+                self.stats.misses += 1
+            telemetry.record_cache("answer", 0, 1)
+            self._pending.set(callback_context.invocation_id, (text, time.perf_counter()))
+            return None
+        with self._lock:
+            self.stats.hits += 1
+            self.saved_ms += answer.duration_ms
+        telemetry.record_cache("answer", 1, 0, answer.duration_ms)
+        logger.info(
+            "Answer cache hit for invocation %s saved about %.0fms (hit ratio %.2f)",
+            callback_context.invocation_id,
+            answer.duration_ms,
+            self.stats.hit_ratio,
+        )
+        return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=answer.text)]))
+
+    def after_model_callback(self, callback_context: Any, llm_response: LlmResponse) -> None:
+        """ADK ``after_model_callback``: cache the final answer to a missed opening message."""
+        pending = self._pending.get(callback_context.invocation_id)
+        if pending is None or llm_response.partial:
+            return None
+        parts = llm_response.content.parts if llm_response.content else None
+        if not llm_response.error_code and parts and any(part.function_call for part in parts):
+            return None  # the model is retrieving; the answer comes in a later call
+        self._pending.delete(callback_context.invocation_id)
+        if llm_response.error_code or not parts:
+            return None
+        answer = "".join(part.text for part in parts if part.text and not part.thought)
+        if answer:
+            text, start = pending
+            self.set(text, CachedAnswer(answer, (time.perf_counter() - start) * 1000))
+        return None
+
+
+__all__ = ["AnswerCache", "CachedAnswer", "question_terms"]
@@ -0,0 +1,158 @@
+"""
+In-process LRU cache with TTL expiry, entry/byte bounds and hit/miss counters.
+
+This is the building block for the caches in front of the retrieval backends.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters describing how a cache is performing.
+
+    Attributes:
+      hits (int): Lookups answered from the cache.
+      misses (int): Lookups that found nothing, or only an expired entry.
+      evictions (int): Entries dropped to stay within the entry or byte bound.
+      expirations (int): Entries dropped because their TTL elapsed.
+      invalidations (int): Entries dropped by an explicit invalidation.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """Return the share of lookups answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the counters and hit ratio as a plain dict, e.g. for logging."""
+        return {**asdict(self), "hit_ratio": self.hit_ratio}
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with optional TTL and byte bound.
+
+    Attributes:
+      max_entries (int): Maximum number of entries kept.
+      max_bytes (Optional[int]): Maximum total size of the entries, as measured by ``sizeof``.
+        None disables the byte bound.
+      ttl (Optional[float]): Seconds an entry stays valid. None keeps entries until evicted.
+      sizeof (Callable[[Any], int]): Returns the size of a value; only used with ``max_bytes``.
+      stats (CacheStats): Hit, miss and eviction counters.
+
+    Example usage:
+      ```
+      cache = LRUCache(max_entries=1024, ttl=300)
+      cache.set(("Document", "a.md"), entity)
+      entity = cache.get(("Document", "a.md"))
+      ```
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof or (lambda value: 1)
+        self.stats = CacheStats()
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        # Membership only; does not touch recency, expiry or the counters.
+        return key in self._entries
+
+    @property
+    def total_bytes(self) -> int:
+        """Return the total size of the cached values as measured by ``sizeof``."""
+        return self._bytes
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for ``key``, or ``default`` if absent or expired."""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.stats.misses += 1
+                return default
+            value, expires_at, _ = item
+            if expires_at and expires_at <= self._clock():
+                self._pop(key)
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Cache ``value`` under ``key``, evicting the least recently used entries as needed."""
+        ttl = self.ttl if ttl is None else ttl
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            expires_at = self._clock() + ttl if ttl else 0.0
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                self._pop(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        """Drop ``key`` from the cache and return whether it was present."""
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._pop(key)
+            self.stats.invalidations += 1
+            return True
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches ``predicate`` and return how many were dropped."""
+        with self._lock:
+            doomed = [key for key in self._entries if predicate(key)]
+            for key in doomed:
+                self._pop(key)
+            self.stats.invalidations += len(doomed)
+            return len(doomed)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self.stats.invalidations += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def _pop(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+
+__all__ = ["CacheStats", "LRUCache"]
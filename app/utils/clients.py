@@ -0,0 +1,340 @@
+"""
+Process-wide Google Cloud clients over pooled, kept-alive gRPC channels.
+
+Creating a client opens a gRPC channel and resolves credentials; a new TLS
+connection then costs a handshake on its first call. ``search_service_client``
+and ``datastore_client`` build each client once per ``(service, endpoint,
+credentials)`` and return the same instance afterwards, so every searcher and
+tool in the process shares its connections.
+
+Each shared client runs on a ``ChannelPool``: up to ``pool_size`` channels with
+keepalive pings, so idle connections survive load balancer timeouts. A call goes
+to the least busy open channel, and a new channel is only opened once every open
+one carries ``max_concurrent_streams`` calls, the HTTP/2 stream limit beyond
+which further calls would queue on the connection.
+
+``warm_up`` connects the pooled channels ahead of the first request, and
+``close_all`` (registered with ``atexit``) shuts them down.
+"""
+
+import atexit
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import grpc
+from google.api_core.client_options import ClientOptions
+from google.auth.credentials import Credentials
+from google.cloud import datastore
+from google.cloud import discoveryengine_v1beta as discoveryengine
+from google.cloud.datastore.client import DATASTORE_EMULATOR_HOST
+from google.cloud.datastore_v1.services.datastore import DatastoreClient
+from google.cloud.datastore_v1.services.datastore.transports.grpc import (
+    DatastoreGrpcTransport,
+)
+from google.cloud.discoveryengine_v1beta.services.search_service.transports.grpc import (
+    SearchServiceGrpcTransport,
+)
+
+
+@dataclass(frozen=True)
+class ChannelSettings:
+    """
+    Tuning for the gRPC channels behind a shared client.
+
+    Attributes:
+      pool_size (int): Most channels (connections) per client. Defaults to 4.
+      keepalive_time (float): Seconds between keepalive pings. Defaults to 30.
+      keepalive_timeout (float): Seconds to wait for a ping ack before dropping
+        the connection. Defaults to 10.
+      max_concurrent_streams (int): In-flight calls per channel before the pool
+        opens another. Defaults to 100, the limit Google front ends advertise.
+    """
+
+    pool_size: int = 4
+    keepalive_time: float = 30.0
+    keepalive_timeout: float = 10.0
+    max_concurrent_streams: int = 100
+
+    def options(self) -> List[Tuple[str, Any]]:
+        """Return the channel arguments for these settings."""
+        return [
+            ("grpc.keepalive_time_ms", int(self.keepalive_time * 1000)),
+            ("grpc.keepalive_timeout_ms", int(self.keepalive_timeout * 1000)),
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.http2.max_pings_without_data", 0),
+            # Keep each pooled channel on its own connection rather than
+            # letting gRPC share one subchannel between them.
+            ("grpc.use_local_subchannel_pool", 1),
+        ]
+
+
+class _PooledMultiCallable:
+    """Unary-unary callable that runs each call on the pool's least busy channel."""
+
+    def __init__(self, pool: "ChannelPool", method: str, args: Tuple[Any, ...]) -> None:
+        self._pool = pool
+        self._method = method
+        self._args = args
+
+    def _start(self) -> Tuple[int, grpc.UnaryUnaryMultiCallable]:
+        index, channel = self._pool._acquire()
+        return index, channel.unary_unary(self._method, *self._args)
+
+    def __call__(self, request: Any, **kwargs: Any) -> Any:
+        index, call = self._start()
+        try:
+            return call(request, **kwargs)
+        finally:
+            self._pool._release(index)
+
+    def with_call(self, request: Any, **kwargs: Any) -> Any:
+        index, call = self._start()
+        try:
+            return call.with_call(request, **kwargs)
+        finally:
+            self._pool._release(index)
+
+    def future(self, request: Any, **kwargs: Any) -> Any:
+        index, call = self._start()
+        try:
+            future = call.future(request, **kwargs)
+        except BaseException:
+            self._pool._release(index)
+            raise
+        future.add_done_callback(lambda _: self._pool._release(index))
+        return future
+
+
+class ChannelPool(grpc.Channel):
+    """
+    A ``grpc.Channel`` that spreads calls over up to ``settings.pool_size`` channels.
+
+    Unary-unary calls, which is all the search and lookup APIs use, are balanced
+    per call. Streaming calls stay on the channel that is least busy when they
+    start and are not counted.
+
+    Attributes:
+      settings (ChannelSettings): Pool size, keepalive and stream limits.
+    """
+
+    def __init__(self, factory: Callable[[List[Tuple[str, Any]]], grpc.Channel], settings: ChannelSettings) -> None:
+        self._factory = factory
+        self.settings = settings
+        self._channels: List[grpc.Channel] = []
+        self._in_flight: List[int] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _open(self) -> int:
+        # Callers hold the lock.
+        if self._closed:
+            raise ValueError("Cannot use a closed ChannelPool")
+        self._channels.append(self._factory(self.settings.options()))
+        self._in_flight.append(0)
+        return len(self._channels) - 1
+
+    def _acquire(self) -> Tuple[int, grpc.Channel]:
+        with self._lock:
+            if not self._channels:
+                index = self._open()
+            else:
+                index = min(range(len(self._channels)), key=self._in_flight.__getitem__)
+                if (
+                    self._in_flight[index] >= self.settings.max_concurrent_streams
+                    and len(self._channels) < self.settings.pool_size
+                ):
+                    index = self._open()
+            self._in_flight[index] += 1
+            return index, self._channels[index]
+
+    def _release(self, index: int) -> None:
+        with self._lock:
+            # Calls can finish after ``close`` has emptied the pool.
+            if index < len(self._in_flight):
+                self._in_flight[index] -= 1
+
+    def _least_busy(self) -> grpc.Channel:
+        with self._lock:
+            if not self._channels:
+                self._open()
+            return self._channels[min(range(len(self._channels)), key=self._in_flight.__getitem__)]
+
+    @property
+    def in_flight(self) -> List[int]:
+        """Calls currently running on each open channel."""
+        with self._lock:
+            return list(self._in_flight)
+
+    def warm_up(self, timeout: Optional[float] = None) -> None:
+        """
+        Open ``pool_size`` channels and wait until each is connected.
+
+        Raises:
+          grpc.FutureTimeoutError: If a channel is not ready within ``timeout``.
+        """
+        with self._lock:
+            while len(self._channels) < self.settings.pool_size:
+                self._open()
+            channels = list(self._channels)
+        for channel in channels:
+            grpc.channel_ready_future(channel).result(timeout=timeout)
+
+    def subscribe(self, callback, try_to_connect=False):
+        self._least_busy().subscribe(callback, try_to_connect=try_to_connect)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            channels = list(self._channels)
+        for channel in channels:
+            channel.unsubscribe(callback)
+
+    def unary_unary(self, method, request_serializer=None, response_deserializer=None, _registered_method=False):
+        return _PooledMultiCallable(self, method, (request_serializer, response_deserializer, _registered_method))
+
+    def unary_stream(self, method, request_serializer=None, response_deserializer=None, _registered_method=False):
+        return self._least_busy().unary_stream(method, request_serializer, response_deserializer, _registered_method)
+
+    def stream_unary(self, method, request_serializer=None, response_deserializer=None, _registered_method=False):
+        return self._least_busy().stream_unary(method, request_serializer, response_deserializer, _registered_method)
+
+    def stream_stream(self, method, request_serializer=None, response_deserializer=None, _registered_method=False):
+        return self._least_busy().stream_stream(method, request_serializer, response_deserializer, _registered_method)
+
+    def close(self):
+        with self._lock:
+            channels, self._channels, self._in_flight = self._channels, [], []
+            self._closed = True
+        for channel in channels:
+            channel.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+# (service, endpoint, credentials) -> (client, pool)
+_CLIENTS: Dict[Hashable, Tuple[Any, ChannelPool]] = {}
+_LOCK = threading.Lock()
+
+
+def regional_client_options(project_id: str, location: str, service: str) -> Optional[ClientOptions]:
+    """Return the project-scoped ``service`` endpoint for regional locations, or None for ``global``."""
+    if location == "global":
+        return None
+    return ClientOptions(api_endpoint=f"{project_id}-{service}.googleapis.com")
+
+
+def _shared(key: Hashable, build: Callable[[], Tuple[Any, ChannelPool]]) -> Any:
+    with _LOCK:
+        if key not in _CLIENTS:
+            _CLIENTS[key] = build()
+        return _CLIENTS[key][0]
+
+
+def search_service_client(
+    project_id: str,
+    location: str,
+    credentials: Optional[Credentials] = None,
+    settings: Optional[ChannelSettings] = None,
+) -> discoveryengine.SearchServiceClient:
+    """
+    Return the shared Discovery Engine search client for the endpoint of
+    ``project_id`` and ``location`` and for ``credentials`` (None for the defaults).
+
+    ``settings`` only applies when this call creates the client.
+    """
+    options = regional_client_options(project_id, location, "discoveryengine")
+    endpoint = options.api_endpoint if options else SearchServiceGrpcTransport.DEFAULT_HOST
+
+    def build() -> Tuple[Any, ChannelPool]:
+        pool = ChannelPool(
+            lambda channel_options: SearchServiceGrpcTransport.create_channel(
+                f"{endpoint}:443", credentials=credentials, options=channel_options
+            ),
+            settings or ChannelSettings(),
+        )
+        transport = SearchServiceGrpcTransport(host=endpoint, channel=pool)
+        return discoveryengine.SearchServiceClient(transport=transport), pool
+
+    return _shared(("discoveryengine", endpoint, credentials), build)
+
+
+def datastore_client(
+    project_id: str,
+    location: str,
+    credentials: Optional[Credentials] = None,
+    settings: Optional[ChannelSettings] = None,
+) -> datastore.Client:
+    """
+    Return the shared Datastore client for ``project_id``, the endpoint of
+    ``project_id`` and ``location``, and ``credentials`` (None for the defaults).
+
+    Unlike a search client, a Datastore client is bound to its project: it builds
+    keys in it and sends it with every request, so each project gets its own.
+
+    Honours ``DATASTORE_EMULATOR_HOST`` like ``datastore.Client`` does.
+    ``settings`` only applies when this call creates the client.
+    """
+    options = regional_client_options(project_id, location, "datastore")
+    emulator_host = os.environ.get(DATASTORE_EMULATOR_HOST)
+    endpoint = emulator_host or (options.api_endpoint if options else DatastoreGrpcTransport.DEFAULT_HOST)
+
+    def build() -> Tuple[Any, ChannelPool]:
+        client = datastore.Client(project=project_id, client_options=options, credentials=credentials)
+        if emulator_host:
+            factory = lambda channel_options: grpc.insecure_channel(endpoint, options=channel_options)
+        else:
+            factory = lambda channel_options: DatastoreGrpcTransport.create_channel(
+                f"{endpoint}:443", credentials=client._credentials, options=channel_options
+            )
+        pool = ChannelPool(factory, settings or ChannelSettings())
+        # datastore.Client builds its GAPIC client lazily into this attribute
+        # (see google.cloud.datastore._gapic); supplying it routes the client
+        # over the pool instead of a private channel.
+        client._datastore_api_internal = DatastoreClient(
+            transport=DatastoreGrpcTransport(host=endpoint, channel=pool),
+            client_info=client._client_info,
+        )
+        return client, pool
+
+    return _shared(("datastore", project_id, endpoint, credentials), build)
+
+
+def warm_up(timeout: Optional[float] = None) -> None:
+    """
+    Connect every shared client's channels.
+
+    Raises:
+      grpc.FutureTimeoutError: If a channel is not ready within ``timeout``.
+    """
+    with _LOCK:
+        pools = [pool for _, pool in _CLIENTS.values()]
+    for pool in pools:
+        pool.warm_up(timeout)
+
+
+def close_all() -> None:
+    """Close every shared client's channels and forget the clients."""
+    with _LOCK:
+        pools = [pool for _, pool in _CLIENTS.values()]
+        _CLIENTS.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_all)
+
+__all__ = [
+    "ChannelPool",
+    "ChannelSettings",
+    "close_all",
+    "datastore_client",
+    "regional_client_options",
+    "search_service_client",
+    "warm_up",
+]
@@ -0,0 +1,157 @@
+"""
+Pack retrieved documents into a compact, token-budgeted tool result.
+
+Tool results are pasted verbatim into the model context, so everything in them
+is paid for on every later model call of the turn. ``ContextPacker`` takes the
+ranked documents a retrieval tool found and, best first:
+
+1. drops documents whose text is mostly contained in one already kept,
+2. trims long documents to the sentences that match the query,
+3. stops once the token budget is spent,
+
+and emits plain ``{"source", "text"}`` dicts.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+
+from . import telemetry
+from .embeddings import content_terms, normalize_text
+from .tokens import CHARS_PER_TOKEN, estimate_tokens
+
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+_GAP = " … "
+
+
+def _shingles(text: str, size: int) -> FrozenSet[str]:
+    words = normalize_text(text).split()
+    if len(words) <= size:
+        return frozenset([" ".join(words)]) if words else frozenset()
+    return frozenset(" ".join(words[i : i + size]) for i in range(len(words) - size + 1))
+
+
+@dataclass
+class ContextPacker:
+    """
+    Fit ranked documents into a token budget.
+
+    Attributes:
+      token_budget (int): Estimated tokens allowed for the whole packed result.
+      max_document_tokens (Optional[int]): Estimated tokens allowed per document, so
+        one long document cannot crowd out the rest. None lets a document use
+        whatever budget is left.
+      overlap_threshold (float): Share of a document's word shingles that must already
+        appear in a kept document for it to be dropped as a duplicate.
+      shingle_size (int): Words per shingle used for overlap detection.
+    """
+
+    token_budget: int = 2000
+    max_document_tokens: Optional[int] = 600
+    overlap_threshold: float = 0.8
+    shingle_size: int = 5
+
+    def pack(self, query: str, documents: Sequence[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """
+        Pack ``documents`` for ``query``.
+
+        Args:
+          query (str): The retrieval query, used to pick the sentences worth keeping.
+          documents (Sequence[Dict[str, Any]]): Ranked documents, best first, with a
+            ``content`` text and ``title`` / ``source_uri`` / ``id`` to cite.
+
+        Returns:
+          List[Dict[str, str]]: ``{"source": ..., "text": ...}`` per kept document.
+        """
+        return [packed for _, packed in self.pack_indexed(query, documents)]
+
+    def pack_indexed(self, query: str, documents: Sequence[Dict[str, Any]]) -> List[Tuple[int, Dict[str, str]]]:
+        """Like ``pack``, but pair each packed item with the index of the document it came from."""
+        with telemetry.stage("context.pack", documents=len(documents)) as stage:
+            terms = set(content_terms(query))
+            kept_shingles: List[FrozenSet[str]] = []
+            packed: List[Tuple[int, Dict[str, str]]] = []
+            remaining = self.token_budget
+            for index, document in enumerate(documents):
+                if remaining <= 0:
+                    break
+                text = (document.get("content") or "").strip()
+                if not text:
+                    continue
+                shingles = _shingles(text, self.shingle_size)
+                if self._is_duplicate(shingles, kept_shingles):
+                    continue
+
+                allowance = remaining
+                if self.max_document_tokens is not None:
+                    allowance = min(allowance, self.max_document_tokens)
+                text = self.trim(text, terms, allowance)
+                if not text:
+                    continue
+                kept_shingles.append(shingles)
+                packed.append((index, {"source": self.source(document), "text": text}))
+                remaining -= estimate_tokens(text)
+            if stage:
+                stage.set(results=len(packed), payload_bytes=sum(len(item["text"]) for _, item in packed))
+        return packed
+
+    @staticmethod
+    def source(document: Dict[str, Any]) -> str:
+        """Return the short citation for a document."""
+        return document.get("title") or document.get("source_uri") or document.get("id") or ""
+
+    def _is_duplicate(self, shingles: FrozenSet[str], kept: List[FrozenSet[str]]) -> bool:
+        if not shingles:
+            return False
+        return any(
+            len(shingles & other) / len(shingles) >= self.overlap_threshold for other in kept
+        )
+
+    @staticmethod
+    def sentences(text: str) -> List[str]:
+        """Split ``text`` into the sentences ``trim`` chooses from."""
+        return [s.strip() for s in _SENTENCE_RE.split(text) if s and s.strip()]
+
+    @staticmethod
+    def trim(text: str, terms: Set[str], token_budget: int) -> str:
+        """
+        Shorten ``text`` to fit ``token_budget``, preferring sentences that contain query ``terms``.
+
+        Kept sentences stay in document order; gaps are marked with an ellipsis.
+        """
+        if estimate_tokens(text) <= token_budget:
+            return text
+        sentences = ContextPacker.sentences(text)
+        scores = [len(terms & set(normalize_text(s).split())) for s in sentences]
+        # Keep only matching sentences, best first; with no match, keep the lead.
+        order = sorted(
+            (i for i in range(len(sentences)) if scores[i] or not any(scores)),
+            key=lambda i: (-scores[i], i),
+        )
+        chosen: Set[int] = set()
+        used = 0
+        for index in order:
+            cost = estimate_tokens(sentences[index]) + 1
+            if used + cost > token_budget:
+                continue
+            chosen.add(index)
+            used += cost
+        if not chosen:
+            # Not even one sentence fits: cut the best one to the budget.
+            best = sentences[order[0]]
+            return best[: max(0, token_budget * CHARS_PER_TOKEN - len(_GAP))].rstrip() + _GAP.rstrip()
+
+        parts: List[str] = []
+        previous = -1
+        for index in sorted(chosen):
+            if index != previous + 1:
+                parts.append(_GAP.strip())
+            parts.append(sentences[index])
+            previous = index
+        if previous != len(sentences) - 1:
+            parts.append(_GAP.strip())
+        return " ".join(parts)
+
+
+__all__ = ["ContextPacker"]
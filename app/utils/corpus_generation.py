@@ -0,0 +1,148 @@
+"""
+Corpus generations shared between the indexing scripts and the agent.
+
+The retrieval cache lives in the agent's process while re-indexing runs in
+another one, often on another machine, so the indexer cannot drop the agent's
+cached responses directly. Instead, every indexing run that changes a corpus
+bumps that corpus's generation in a small JSON document at a location both can
+reach: a local path, or a ``gs://`` URI for deployed agents. The agent re-reads
+the document at most every ``refresh_interval`` seconds, and a
+``RetrievalCache`` drops a corpus's entries when its generation changes.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+logger = logging.getLogger(__name__)
+
+_WRITE_ATTEMPTS = 5
+
+
+class CorpusGenerations:
+    """
+    Per-corpus generation markers in a JSON document shared across processes.
+
+    Attributes:
+      location (str): Local path or ``gs://bucket/object`` URI of the document.
+      refresh_interval (float): Seconds a read stays current before ``current``
+        reads the document again.
+
+    Example usage:
+      ```
+      # Indexing script, after changing the corpus:
+      CorpusGenerations("gs://my-bucket/rag/generations.json").bump(corpus)
+
+      # Agent:
+      cache = RetrievalCache(generations=CorpusGenerations("gs://my-bucket/rag/generations.json"))
+      ```
+    """
+
+    def __init__(
+        self,
+        location: str,
+        refresh_interval: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.location = location
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self._generations: Dict[str, str] = {}
+        self._read_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _gcs_blob(self) -> Any:
+        from google.cloud import storage
+
+        bucket, _, name = self.location[len("gs://"):].partition("/")
+        return storage.Client().bucket(bucket).blob(name)
+
+    def _read(self) -> Tuple[Dict[str, str], Any]:
+        """Return the stored generations and a token for a conditional write: the GCS object generation, or None."""
+        if self.location.startswith("gs://"):
+            blob = self._gcs_blob()
+            try:
+                text = blob.download_as_text()
+            except NotFound:
+                return {}, 0
+            return json.loads(text or "{}"), blob.generation
+        path = Path(self.location)
+        if not path.exists():
+            return {}, None
+        return json.loads(path.read_text(encoding="utf-8") or "{}"), None
+
+    def _write(self, generations: Dict[str, str], token: Any) -> None:
+        """
+        Store ``generations``, on GCS only if the object is unchanged since it was read.
+
+        Raises:
+          google.api_core.exceptions.PreconditionFailed: If another writer got there first.
+        """
+        text = json.dumps(generations, indent=2, sort_keys=True)
+        if self.location.startswith("gs://"):
+            self._gcs_blob().upload_from_string(
+                text, content_type="application/json", if_generation_match=token
+            )
+            return
+        path = Path(self.location)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def due(self) -> bool:
+        """Return whether ``current`` would read the document again."""
+        with self._lock:
+            return self._read_at is None or self._clock() - self._read_at >= self.refresh_interval
+
+    def refresh(self) -> Dict[str, str]:
+        """Read the document now; on failure keep the last values and retry after ``refresh_interval``."""
+        try:
+            generations, _ = self._read()
+        except Exception as error:
+            logger.warning("Reading corpus generations from %s failed: %s", self.location, error)
+            generations = None
+        with self._lock:
+            if generations is not None:
+                self._generations = generations
+            self._read_at = self._clock()
+            return dict(self._generations)
+
+    def current(self) -> Dict[str, str]:
+        """Return the generation per corpus, reading the document when the last read is stale."""
+        if self.due():
+            return self.refresh()
+        with self._lock:
+            return dict(self._generations)
+
+    def bump(self, corpus: str) -> str:
+        """
+        Give ``corpus`` a new generation, telling every agent reading the document
+        that its cached results for the corpus are stale, and return it.
+
+        Raises:
+          google.api_core.exceptions.PreconditionFailed: If concurrent writers kept
+            winning the race on GCS.
+        """
+        for attempt in range(_WRITE_ATTEMPTS):
+            generations, token = self._read()
+            generations[corpus] = uuid.uuid4().hex
+            try:
+                self._write(generations, token)
+            except PreconditionFailed:
+                if attempt == _WRITE_ATTEMPTS - 1:
+                    raise
+                continue
+            return generations[corpus]
+
+
+__all__ = ["CorpusGenerations"]
@@ -0,0 +1,329 @@
+"""
+Batched Datastore entity hydration.
+
+Search results only carry document IDs; the full documents live in Datastore.
+This module turns a (possibly nested, possibly repetitive) list of document IDs
+into as few ``get_multi`` calls as possible: IDs are flattened and deduplicated,
+split into chunks under the per-lookup key limit, looked up in parallel, and the
+entities are mapped back to the order of the requested IDs. Concurrent searches
+can also pool their IDs into shared lookups through a ``BatchingHydrationSession``.
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import Executor, Future, InvalidStateError
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+from google.cloud import datastore
+
+from . import telemetry
+from .entity_cache import EntityCache
+
+Entity = datastore.Entity
+
+# Datastore rejects lookups with more keys than this in a single request.
+MAX_KEYS_PER_LOOKUP = 1000
+
+
+def flatten_doc_ids(doc_ids: Iterable[Any]) -> Iterator[str]:
+    """Yield document IDs from a flat or nested (e.g. per-page) list of IDs."""
+    for doc_id in doc_ids:
+        if isinstance(doc_id, (list, tuple)):
+            yield from flatten_doc_ids(doc_id)
+        else:
+            yield doc_id
+
+
+def _gather(futures: Set[Future], combine) -> Future:
+    """
+    Return a future resolved with ``combine()`` once every future in ``futures`` is done.
+
+    No worker thread is held while waiting, so callers may gather futures that run
+    on the same bounded executor without risking a deadlock.
+    """
+    result: Future = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def _on_done(future: Future) -> None:
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if result.done():
+            return
+        try:
+            if future.cancelled():
+                result.cancel()
+            elif future.exception() is not None:
+                result.set_exception(future.exception())
+            elif last:
+                result.set_result(combine())
+        except InvalidStateError:
+            # The caller cancelled the gathered future or another chunk failed first.
+            pass
+
+    if not futures:
+        result.set_result(combine())
+    for future in futures:
+        future.add_done_callback(_on_done)
+    return result
+
+
+class DatastoreHydrator:
+    """
+    Look up Datastore entities of one kind by document ID in parallel, deduplicated chunks.
+
+    Attributes:
+      client (datastore.Client): Client used for the lookups.
+      kind (str): Datastore kind the document IDs belong to.
+      executor (Optional[Executor]): Pool the chunk lookups run on. Without one, chunks
+        are looked up sequentially on the calling thread.
+      chunk_size (int): Maximum keys per ``get_multi`` call. Capped at ``MAX_KEYS_PER_LOOKUP``.
+      max_retries (int): How many times keys that Datastore defers are looked up again
+        with backoff before the client drains them without delay.
+      retry_backoff (float): Initial delay in seconds between deferred retries, doubled each time.
+      cache (Optional[EntityCache]): Consulted before any lookup is sent; entities
+        read from Datastore are written back to it.
+
+    Example usage:
+      ```
+      hydrator = DatastoreHydrator(client, "Document", executor=pool)
+      entities = hydrator.fetch([["a", "b"], ["b", "c"]])  # 3 keys, one RPC
+      ```
+    """
+
+    def __init__(
+        self,
+        client: datastore.Client,
+        kind: str,
+        executor: Optional[Executor] = None,
+        chunk_size: int = MAX_KEYS_PER_LOOKUP,
+        max_retries: int = 3,
+        retry_backoff: float = 0.05,
+        cache: Optional[EntityCache] = None,
+    ) -> None:
+        self.client = client
+        self.kind = kind
+        self.executor = executor
+        self.chunk_size = max(1, min(chunk_size, MAX_KEYS_PER_LOOKUP))
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.cache = cache
+
+    def lookup(self, doc_ids: Sequence[str]) -> Dict[str, Entity]:
+        """
+        Look up one chunk of document IDs and return the entities found, keyed by ID.
+
+        Keys that Datastore defers are retried with exponential backoff; on the last
+        attempt the client is left to drain any still-deferred keys itself. Keys
+        reported as missing are not retried: lookups are strongly consistent, so a
+        missing key does not exist and maps to None in the caller's result.
+
+        Args:
+          doc_ids (Sequence[str]): Unique document IDs, at most ``chunk_size`` of them.
+
+        Returns:
+          Dict[str, Entity]: Entities found, keyed by document ID.
+        """
+        keys: List[datastore.Key] = [self.client.key(self.kind, doc_id) for doc_id in doc_ids]
+        found: Dict[str, Entity] = {}
+        delay = self.retry_backoff
+        with telemetry.stage("datastore.lookup", keys=len(keys)) as stage:
+            for attempt in range(self.max_retries + 1):
+                missing: List[Entity] = []
+                deferred: Optional[List[datastore.Key]] = (
+                    [] if attempt < self.max_retries else None
+                )
+                for entity in self.client.get_multi(keys, missing=missing, deferred=deferred):
+                    found[entity.key.id_or_name] = entity
+                if not deferred:
+                    break
+                keys = deferred
+                time.sleep(delay)
+                delay *= 2
+            stage.set(results=len(found), attempts=attempt + 1)
+        if self.cache is not None:
+            self.cache.put_many(self.kind, found.values())
+        return found
+
+    def _dispatch(self, doc_ids: List[str]) -> Future:
+        """Start the lookup of one chunk and return a future for its entities."""
+        if self.executor is not None:
+            # Run in the caller's context so the lookup joins its trace and turn.
+            return self.executor.submit(contextvars.copy_context().run, self.lookup, doc_ids)
+        future: Future = Future()
+        try:
+            future.set_result(self.lookup(doc_ids))
+        except Exception as exc:  # surfaced to the caller through the future
+            future.set_exception(exc)
+        return future
+
+    def session(self) -> "HydrationSession":
+        """Start a session that deduplicates lookups across several ``submit`` calls."""
+        return HydrationSession(self)
+
+    def submit(self, doc_ids: Iterable[Any]) -> Future:
+        """
+        Start hydrating ``doc_ids`` without blocking.
+
+        Args:
+          doc_ids (Iterable[Any]): Flat or nested document IDs.
+
+        Returns:
+          Future: Resolves to ``List[Optional[Entity]]`` aligned with the flattened IDs.
+        """
+        return self.session().submit(doc_ids)
+
+    def fetch(self, doc_ids: Iterable[Any]) -> List[Optional[Entity]]:
+        """
+        Hydrate ``doc_ids`` and block until all chunks are done.
+
+        Args:
+          doc_ids (Iterable[Any]): Flat or nested document IDs.
+
+        Returns:
+          List[Optional[Entity]]: One entry per flattened ID, None where the entity is missing.
+        """
+        return self.submit(doc_ids).result()
+
+
+class HydrationSession:
+    """
+    Track lookups already started so that each document ID is fetched at most once.
+
+    A session is meant to span one logical request, e.g. all pages of one search,
+    so that IDs repeated across pages do not cost another read. It is thread safe.
+    """
+
+    def __init__(self, hydrator: DatastoreHydrator) -> None:
+        self.hydrator = hydrator
+        self._lookups: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, doc_ids: Iterable[Any]) -> Future:
+        """
+        Start hydrating the IDs not already requested in this session.
+
+        Args:
+          doc_ids (Iterable[Any]): Flat or nested document IDs.
+
+        Returns:
+          Future: Resolves to ``List[Optional[Entity]]`` aligned with the flattened IDs.
+        """
+        ordered = list(flatten_doc_ids(doc_ids))
+        with self._lock:
+            new_ids = [
+                doc_id for doc_id in dict.fromkeys(ordered) if doc_id not in self._lookups
+            ]
+            if new_ids and self.hydrator.cache is not None:
+                cached = self.hydrator.cache.get_many(self.hydrator.kind, new_ids)
+                telemetry.record_cache("entity", len(cached), len(new_ids) - len(cached))
+                if cached:
+                    hit: Future = Future()
+                    hit.set_result(cached)
+                    for doc_id in cached:
+                        self._lookups[doc_id] = hit
+                    new_ids = [doc_id for doc_id in new_ids if doc_id not in cached]
+            self._start_lookups(new_ids)
+            needed = {self._lookups[doc_id] for doc_id in ordered}
+
+        def combine() -> List[Optional[Entity]]:
+            entities: Dict[str, Entity] = {}
+            for lookup in needed:
+                entities.update(lookup.result())
+            return [entities.get(doc_id) for doc_id in ordered]
+
+        return _gather(needed, combine)
+
+    def _start_lookups(self, new_ids: List[str]) -> None:
+        """Dispatch lookups for ``new_ids`` and record their futures. Called with the lock held."""
+        size = self.hydrator.chunk_size
+        for start in range(0, len(new_ids), size):
+            chunk = new_ids[start : start + size]
+            lookup = self.hydrator._dispatch(chunk)
+            for doc_id in chunk:
+                self._lookups[doc_id] = lookup
+
+    def flush(self) -> None:
+        """Send any IDs held back for batching. Lookups start immediately here, so this does nothing."""
+
+    def close(self) -> None:
+        """Send the held-back IDs and stop batching."""
+        self.flush()
+
+
+class BatchingHydrationSession(HydrationSession):
+    """
+    Session shared by concurrent searches that merges their IDs into common lookups.
+
+    New IDs are held in a batch that is sent as one ``get_multi`` once it holds
+    ``chunk_size`` IDs, or ``linger`` seconds after its first ID arrived, so
+    searches whose pages arrive close together share lookups instead of each
+    sending a small one. The wait adds up to ``linger`` to every lookup, which
+    suits bulk workloads rather than interactive ones.
+
+    Attributes:
+      linger (float): Longest a new ID waits for others before its batch is sent.
+
+    Example usage:
+      ```
+      session = BatchingHydrationSession(hydrator, linger=0.01)
+      first = session.submit(["a", "b"])
+      second = session.submit(["b", "c"])  # joins the same lookup
+      entities = first.result() + second.result()
+      session.close()
+      ```
+    """
+
+    def __init__(self, hydrator: DatastoreHydrator, linger: float = 0.01) -> None:
+        super().__init__(hydrator)
+        self.linger = linger
+        self._batch: List[str] = []
+        self._batch_lookup: Optional[Future] = None
+        self._timer: Optional[threading.Timer] = None
+
+    def _start_lookups(self, new_ids: List[str]) -> None:
+        for doc_id in new_ids:
+            if self._batch_lookup is None:
+                self._batch_lookup = Future()
+                self._timer = threading.Timer(self.linger, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            self._batch.append(doc_id)
+            self._lookups[doc_id] = self._batch_lookup
+            if len(self._batch) >= self.hydrator.chunk_size:
+                self._send()
+
+    def _send(self) -> None:
+        """Dispatch the pending batch and forward its outcome to the batch's future. Called with the lock held."""
+        batch, pending = self._batch, self._batch_lookup
+        self._batch, self._batch_lookup = [], None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        def forward(lookup: Future) -> None:
+            if lookup.cancelled():
+                pending.cancel()
+            elif lookup.exception() is not None:
+                pending.set_exception(lookup.exception())
+            else:
+                pending.set_result(lookup.result())
+
+        self.hydrator._dispatch(batch).add_done_callback(forward)
+
+    def flush(self) -> None:
+        """Send the pending batch now."""
+        with self._lock:
+            if self._batch:
+                self._send()
+
+
+__all__ = [
+    "BatchingHydrationSession",
+    "DatastoreHydrator",
+    "HydrationSession",
+    "MAX_KEYS_PER_LOOKUP",
+    "flatten_doc_ids",
+]
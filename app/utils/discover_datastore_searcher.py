@@ -4,21 +4,47 @@ with Google Discovery Engine and Datastore services
 to perform searches and retrieve corresponding entities.
 """
 
-from typing import List, Tuple, Callable, Optional, Any, Union
-from google.api_core.client_options import ClientOptions
+import asyncio
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import List, Tuple, Callable, Optional, Any, Union, Hashable
+from typing import Dict, Iterable, Set
 from google.cloud import discoveryengine_v1beta as discoveryengine
 from google.cloud.discoveryengine_v1beta.types import SearchRequest, SearchResponse
 from google.cloud.discoveryengine_v1beta.services.search_service.pagers import (
+    SearchAsyncPager,
     SearchPager,
 )
 from google.cloud import datastore
 from google.auth.credentials import Credentials
 from dataclasses import dataclass
-from typing import Iterator
+from collections import deque
+from typing import AsyncIterator, Deque, Iterator
+
+from .clients import (
+    ChannelSettings,
+    datastore_client as shared_datastore_client,
+    regional_client_options,
+    search_service_client,
+    warm_up as warm_up_clients,
+)
+from .datastore_hydrator import (
+    MAX_KEYS_PER_LOOKUP,
+    BatchingHydrationSession,
+    DatastoreHydrator,
+    HydrationSession,
+)
+from . import telemetry
+from .entity_cache import EntityCache
+from .single_flight import SingleFlight, request_key
 
 
 Entity = datastore.Entity
 
+# A bulk query: the query text, or the query text and a filter string.
+BulkQuery = Union[str, Tuple[str, str]]
+
 
 @dataclass
 class DiscoveryDatastoreSearcherConfig:
@@ -38,6 +64,30 @@ class DiscoveryDatastoreSearcherConfig:
         Defaults to 10.
       return_datastore_entities (bool, optional): Whether to return full datastore entities
         in search results. If False, only references might be returned. Defaults to True.
+      max_concurrent_lookups (int, optional): Size of the thread pool used to run blocking
+        Datastore lookups off the event loop and in parallel with pagination. Defaults to 8.
+      lookup_chunk_size (int, optional): Maximum keys per Datastore ``get_multi`` call.
+        Larger lookups are split into chunks that run in parallel. Defaults to 1000,
+        the Datastore per-lookup limit.
+      entity_cache_size (int, optional): Entries kept in the in-process entity cache.
+        0 disables the cache unless one is passed to the searcher. Defaults to 0.
+      entity_cache_max_bytes (int, optional): Byte bound for the in-process entity cache.
+        Defaults to None (entry bound only).
+      entity_cache_ttl (float, optional): Seconds a cached entity stays valid. Defaults to 3600.
+      entity_cache_path (str, optional): SQLite file for the entity cache tier shared by
+        processes on the same host. Defaults to None (in-process tier only).
+      max_pages (int, optional): Stop paging after this many search response pages.
+        Defaults to None (no limit).
+      max_results (int, optional): Stop paging once this many search results have been
+        returned; the last page is trimmed to fit. Defaults to None (no limit).
+      channel_pool_size (int, optional): Most gRPC channels behind each shared client.
+        Defaults to 4.
+      keepalive_time (float, optional): Seconds between keepalive pings on idle
+        channels. Defaults to 30.
+      keepalive_timeout (float, optional): Seconds to wait for a keepalive ack.
+        Defaults to 10.
+      max_concurrent_streams (int, optional): In-flight calls per channel before
+        another channel is opened. Defaults to 100.
 
     Properties:
       data_store_resource (str): Formatted resource path for the datastore, constructed from
@@ -52,6 +102,28 @@ class DiscoveryDatastoreSearcherConfig:
     datastore_kind: str
     page_size: int = 10
     return_datastore_entities: bool = True
+    max_concurrent_lookups: int = 8
+    lookup_chunk_size: int = MAX_KEYS_PER_LOOKUP
+    entity_cache_size: int = 0
+    entity_cache_max_bytes: Optional[int] = None
+    entity_cache_ttl: Optional[float] = 3600.0
+    entity_cache_path: Optional[str] = None
+    max_pages: Optional[int] = None
+    max_results: Optional[int] = None
+    channel_pool_size: int = 4
+    keepalive_time: float = 30.0
+    keepalive_timeout: float = 10.0
+    max_concurrent_streams: int = 100
+
+    @property
+    def channel_settings(self) -> ChannelSettings:
+        """Return the gRPC channel tuning for the shared clients."""
+        return ChannelSettings(
+            pool_size=self.channel_pool_size,
+            keepalive_time=self.keepalive_time,
+            keepalive_timeout=self.keepalive_timeout,
+            max_concurrent_streams=self.max_concurrent_streams,
+        )
 
     @property
     def data_store_resource(self) -> str:
@@ -104,6 +176,46 @@ class DiscoveryDatastoreSearcherConfig:
         )
 
 
+@dataclass
+class BulkSearchResult:
+    """
+    Outcome of one query run by ``DiscoveryDatastoreSearcher.search_many``.
+
+    Attributes:
+      index (int): Position of the query in the input.
+      query_text (str): The text searched for.
+      filter_str (str): The filter applied, "" for none.
+      result (Any): What ``__call__`` returns for the query; None if it failed.
+      error (Optional[Exception]): The exception the query failed with, if any.
+    """
+
+    index: int
+    query_text: str
+    filter_str: str
+    result: Any = None
+    error: Optional[Exception] = None
+
+
+class _ResultOrder:
+    """Hand bulk results back as they complete, or hold them back to restore input order."""
+
+    def __init__(self, ordered: bool) -> None:
+        self.ordered = ordered
+        self.buffered: Dict[int, BulkSearchResult] = {}
+        self._next_index = 0
+
+    def add(self, result: BulkSearchResult) -> List[BulkSearchResult]:
+        """Return the results that are ready to hand back once ``result`` is in."""
+        if not self.ordered:
+            return [result]
+        self.buffered[result.index] = result
+        ready: List[BulkSearchResult] = []
+        while self._next_index in self.buffered:
+            ready.append(self.buffered.pop(self._next_index))
+            self._next_index += 1
+        return ready
+
+
 class DiscoveryDatastoreSearcher:
     """
     DiscoveryDatastoreSearcher provides an integration between Google Cloud's Discovery Engine and Datastore services
@@ -118,7 +230,19 @@ class DiscoveryDatastoreSearcher:
       result_processor (Optional[Callable[[Tuple[List[SearchResponse], List[Entity]]], Any]]):
         Optional function to process search results and entities.
       discovery_client (discoveryengine.SearchServiceClient): Client for Discovery Engine API.
-      datastore_client (datastore.Client): Client for Datastore API.
+        Created lazily on first use.
+      datastore_client (datastore.Client): Client for Datastore API. Created lazily on first use.
+      async_discovery_client (discoveryengine.SearchServiceAsyncClient): asyncio client for
+        Discovery Engine API, used by ``call_async``. Created lazily on first use.
+      entity_cache (Optional[EntityCache]): Cache consulted before Datastore lookups.
+        Built from the ``entity_cache_*`` config fields unless one is passed in.
+      single_flight (Optional[SingleFlight]): When set, identical concurrent searches
+        share one search and its lookups; see ``collect``.
+
+    The lazily created clients are the process-wide ones from ``app.utils.clients``,
+    so searchers for the same project and credentials share their pooled channels.
+    Pre-built clients can be passed to the constructor instead, e.g. to substitute
+    local fakes in benchmarks.
 
     Example usage:
       ```
@@ -134,6 +258,13 @@ class DiscoveryDatastoreSearcher:
       searcher = DiscoveryDatastoreSearcher(config)
       results = searcher("shoes")
       search_responses, entities = results
+
+      # From a coroutine, without blocking the event loop:
+      results = await searcher.call_async("shoes")
+
+      # Many queries at once, e.g. for an offline job:
+      for outcome in searcher.search_many(["shoes", ("boots", "brand: ANY(\"acme\")")]):
+        print(outcome.index, outcome.error or outcome.result)
       ```
     """
 
@@ -144,39 +275,131 @@ class DiscoveryDatastoreSearcher:
         result_processor: Optional[
             Callable[[Tuple[List[SearchResponse], List[Entity]]], Any]
         ] = None,
+        discovery_client: Optional[discoveryengine.SearchServiceClient] = None,
+        async_discovery_client: Optional[
+            discoveryengine.SearchServiceAsyncClient
+        ] = None,
+        datastore_client: Optional[datastore.Client] = None,
+        entity_cache: Optional[EntityCache] = None,
+        single_flight: Optional[SingleFlight] = None,
     ) -> None:
         self.config = config
         self.result_processor: Optional[
             Callable[[Tuple[List[SearchResponse], List[Entity]]], Any]
         ] = result_processor
+        self._credentials = credentials
 
-        discoveryengine_client_options = (
-            ClientOptions(
-                api_endpoint=f"{self.config.project_id}-discoveryengine.googleapis.com"
-            )
-            if self.config.location != "global"
-            else None
+        self._discoveryengine_client_options = regional_client_options(
+            self.config.project_id, self.config.location, "discoveryengine"
         )
-        data_store_client_options = (
-            ClientOptions(api_endpoint=f"{self.project_id}-datastore.googleapis.com")
-            if self.config.location != "global"
-            else None
+
+        # Clients are created on first use, so building a searcher opens no
+        # connections, and are the process-wide pooled instances from
+        # ``app.utils.clients``. The async client binds its gRPC channel to the
+        # running event loop, so it is never shared; neither is the lookup pool.
+        self._discovery_client: Optional[discoveryengine.SearchServiceClient] = (
+            discovery_client
         )
+        self._datastore_client: Optional[datastore.Client] = datastore_client
+        self._async_discovery_client: Optional[
+            discoveryengine.SearchServiceAsyncClient
+        ] = async_discovery_client
+        self._lookup_executor: Optional[ThreadPoolExecutor] = None
+        self._hydrator: Optional[DatastoreHydrator] = None
 
-        # Initialize the clients.
-        self.discovery_client: discoveryengine.SearchServiceClient = (
-            discoveryengine.SearchServiceClient(
-                client_options=discoveryengine_client_options, credentials=credentials
+        if entity_cache is None and self.config.entity_cache_size > 0:
+            entity_cache = EntityCache(
+                max_entries=self.config.entity_cache_size,
+                max_bytes=self.config.entity_cache_max_bytes,
+                ttl=self.config.entity_cache_ttl,
+                shared_path=self.config.entity_cache_path,
             )
-        )
-        self.datastore_client: datastore.Client = datastore.Client(
-            project=self.config.project_id,
-            client_options=data_store_client_options,
-            credentials=credentials,
+        self.entity_cache: Optional[EntityCache] = entity_cache
+        self.single_flight: Optional[SingleFlight] = single_flight
+
+    @property
+    def discovery_client(self) -> discoveryengine.SearchServiceClient:
+        """Return the shared Discovery Engine client, creating it on first use."""
+        if self._discovery_client is None:
+            self._discovery_client = search_service_client(
+                self.config.project_id,
+                self.config.location,
+                self._credentials,
+                self.config.channel_settings,
+            )
+        return self._discovery_client
+
+    @property
+    def datastore_client(self) -> datastore.Client:
+        """Return the shared Datastore client, creating it on first use."""
+        if self._datastore_client is None:
+            self._datastore_client = shared_datastore_client(
+                self.config.project_id,
+                self.config.location,
+                self._credentials,
+                self.config.channel_settings,
+            )
+        return self._datastore_client
+
+    @property
+    def async_discovery_client(self) -> discoveryengine.SearchServiceAsyncClient:
+        """Return the asyncio Discovery Engine client, creating it on first use."""
+        if self._async_discovery_client is None:
+            self._async_discovery_client = discoveryengine.SearchServiceAsyncClient(
+                client_options=self._discoveryengine_client_options,
+                credentials=self._credentials,
+            )
+        return self._async_discovery_client
+
+    @property
+    def lookup_executor(self) -> ThreadPoolExecutor:
+        """Return the bounded thread pool used to run Datastore lookups concurrently."""
+        if self._lookup_executor is None:
+            self._lookup_executor = ThreadPoolExecutor(
+                max_workers=self.config.max_concurrent_lookups,
+                thread_name_prefix="datastore-lookup",
+            )
+        return self._lookup_executor
+
+    @property
+    def hydrator(self) -> DatastoreHydrator:
+        """Return the batched entity hydrator, which runs its lookups on ``lookup_executor``."""
+        if self._hydrator is None:
+            self._hydrator = DatastoreHydrator(
+                self.datastore_client,
+                self.config.datastore_kind,
+                executor=self.lookup_executor,
+                chunk_size=self.config.lookup_chunk_size,
+                cache=self.entity_cache,
+            )
+        return self._hydrator
+
+    def _build_search_request(
+        self,
+        query_text: str,
+        page_token: str = "",
+        filter_str: str = "",
+        page_size: Optional[int] = None,
+        **kwargs,
+    ) -> SearchRequest:
+        """Build the Discovery Engine search request shared by the sync and async paths."""
+        return SearchRequest(
+            serving_config=self.config.serving_config,
+            branch=self.config.branch,
+            query=query_text,
+            page_size=page_size or self.config.page_size,
+            page_token=page_token,
+            filter=filter_str,
+            **kwargs,
         )
 
     def search(
-        self, query_text: str, page_token: str = "", filter_str: str = "", **kwargs
+        self,
+        query_text: str,
+        page_token: str = "",
+        filter_str: str = "",
+        page_size: Optional[int] = None,
+        **kwargs,
     ) -> Iterator[SearchResponse]:
         """
         Perform a search using Discovery Engine.
@@ -185,62 +408,433 @@ class DiscoveryDatastoreSearcher:
           query_text (str): The search query.
           page_token (str): Optional page token for pagination.
           filter_str (str): Optional filter string.
+          page_size (int, optional): Overrides ``config.page_size`` for this request.
           **kwargs: Additional keyword arguments to pass to the search request.
 
         Returns:
           SearchResponse: The raw search response from Discovery Engine.
         """
-        request = SearchRequest(
-            serving_config=self.config.serving_config,
-            branch=self.config.branch,
-            query=query_text,
-            page_size=self.config.page_size,
-            page_token=page_token,
-            filter=filter_str,
-            **kwargs,
+        request = self._build_search_request(
+            query_text, page_token, filter_str, page_size, **kwargs
         )
         search_pager: SearchPager = self.discovery_client.search(request=request)
         return search_pager.pages
 
+    async def search_async(
+        self,
+        query_text: str,
+        page_token: str = "",
+        filter_str: str = "",
+        page_size: Optional[int] = None,
+        **kwargs,
+    ) -> AsyncIterator[SearchResponse]:
+        """
+        Perform a search using the asyncio Discovery Engine client.
+
+        Args:
+          query_text (str): The search query.
+          page_token (str): Optional page token for pagination.
+          filter_str (str): Optional filter string.
+          page_size (int, optional): Overrides ``config.page_size`` for this request.
+          **kwargs: Additional keyword arguments to pass to the search request.
+
+        Yields:
+          SearchResponse: Each page of the search response as it arrives.
+        """
+        request = self._build_search_request(
+            query_text, page_token, filter_str, page_size, **kwargs
+        )
+        search_pager: SearchAsyncPager = await self.async_discovery_client.search(
+            request=request
+        )
+        async for response in search_pager.pages:
+            yield response
+
     def fetch_datastore_entities(self, doc_ids: List[str]) -> List[Optional[Entity]]:
         """
         Retrieve Datastore entities corresponding to a list of document IDs.
 
+        IDs are deduplicated and looked up in parallel chunks of at most
+        ``config.lookup_chunk_size`` keys.
+
         Args:
           doc_ids (List[str]): List of document IDs (assumed to be key names for the given kind).
+            Nested lists, such as one list per search page, are flattened.
 
         Returns:
-          List[Optional[Entity]]: List of entities retrieved from Datastore.
+          List[Optional[Entity]]: One entity per flattened document ID, in the same order.
           If an entity is not found, None is returned for that key.
         """
-        keys: List[datastore.Key] = [
-            self.datastore_client.key(self.datastore_kind, doc_id) for doc_id in doc_ids
-        ]
-        return self.datastore_client.get_multi(keys)
+        return self.hydrator.fetch(doc_ids)
+
+    async def fetch_datastore_entities_async(
+        self, doc_ids: List[str]
+    ) -> List[Optional[Entity]]:
+        """
+        Retrieve Datastore entities without blocking the event loop.
+
+        The Datastore client has no asyncio transport, so the chunked lookups run on
+        the bounded ``lookup_executor`` pool.
+
+        Args:
+          doc_ids (List[str]): List of document IDs (assumed to be key names for the given kind).
+
+        Returns:
+          List[Optional[Entity]]: One entity per flattened document ID, in the same order.
+        """
+        return await asyncio.wrap_future(self.hydrator.submit(doc_ids))
+
+    def _resolve_caps(
+        self, max_pages: Optional[int], max_results: Optional[int]
+    ) -> Tuple[Optional[int], Optional[int]]:
+        """Return the effective page and result caps, falling back to the config."""
+        return (
+            max_pages if max_pages is not None else self.config.max_pages,
+            max_results if max_results is not None else self.config.max_results,
+        )
+
+    @staticmethod
+    def _trim_page(
+        response: SearchResponse, results_seen: int, max_results: Optional[int]
+    ) -> bool:
+        """
+        Trim a page to the remaining result budget.
+
+        Returns:
+          bool: True once the result cap has been reached and paging should stop.
+        """
+        if max_results is None:
+            return False
+        remaining = max_results - results_seen
+        if len(response.results) > remaining:
+            del response.results[remaining:]
+        return results_seen + len(response.results) >= max_results
+
+    @staticmethod
+    def _record_page(response: SearchResponse, start: float, page: int) -> None:
+        """Record the wait for one search page as a ``datastore.search_page`` stage."""
+        stage = telemetry.stage("datastore.search_page", start=start, page=page)
+        if stage:
+            stage.set(results=len(response.results))
+            if isinstance(response, SearchResponse):
+                stage.set(payload_bytes=SearchResponse.pb(response).ByteSize())
+            stage.end()
+
+    def _page_doc_ids(self, response: SearchResponse) -> List[str]:
+        """Extract the document IDs referenced by one search response page."""
+        return [result.id for result in response.results]
+
+    def stream(
+        self,
+        query_text: str,
+        page_token: str = "",
+        filter_str: str = "",
+        max_pages: Optional[int] = None,
+        max_results: Optional[int] = None,
+        hydration_session: Optional[HydrationSession] = None,
+        **kwargs,
+    ) -> Iterator[Tuple[SearchResponse, List[Optional[Entity]]]]:
+        """
+        Stream search pages together with their Datastore entities.
+
+        As soon as a page arrives its document IDs are submitted for hydration on
+        the lookup pool, and the next page is requested while that lookup is in
+        flight. IDs repeated across pages are only looked up once. Pages are
+        yielded in search order, each as soon as its entities are ready.
+
+        Parameters:
+          query_text (str): The text to search for
+          page_token (str, optional): Token for retrieving a specific page of results. Defaults to "".
+          filter_str (str, optional): Filter string to narrow down search results. Defaults to "".
+          max_pages (int, optional): Overrides ``config.max_pages``.
+          max_results (int, optional): Overrides ``config.max_results``.
+          hydration_session (HydrationSession, optional): Session to hydrate through, e.g.
+            one shared by several searches. Defaults to a new session for this search.
+          **kwargs: Additional keyword arguments to pass to the search method.
+
+        Yields:
+          Tuple[SearchResponse, List[Optional[Entity]]]: A page and the entities for its results.
+          The entity list is empty when ``config.return_datastore_entities`` is False.
+        """
+        max_pages, max_results = self._resolve_caps(max_pages, max_results)
+        page_size = (
+            min(self.config.page_size, max_results) if max_results else None
+        )
+        hydrate = self.config.return_datastore_entities
+        session: HydrationSession = hydration_session or self.hydrator.session()
+        pending: Deque[Tuple[SearchResponse, Optional[Future]]] = deque()
+        pages_seen = results_seen = 0
+        # Not entered as a context: it would span this generator's yields.
+        search_stage = telemetry.stage("datastore.search")
+        page_start = time.perf_counter()
+        try:
+            for response in self.search(
+                query_text, page_token, filter_str, page_size, **kwargs
+            ):
+                self._record_page(response, page_start, pages_seen)
+                done = self._trim_page(response, results_seen, max_results)
+                pages_seen += 1
+                results_seen += len(response.results)
+
+                doc_ids = self._page_doc_ids(response)
+                lookup: Optional[Future] = None
+                if hydrate and doc_ids:
+                    lookup = session.submit(doc_ids)
+                pending.append((response, lookup))
+
+                # Hand back every page whose lookup has already finished.
+                while pending and (pending[0][1] is None or pending[0][1].done()):
+                    ready, lookup = pending.popleft()
+                    yield ready, lookup.result() if lookup else []
+
+                if done or (max_pages is not None and pages_seen >= max_pages):
+                    break
+                page_start = time.perf_counter()
+
+            while pending:
+                ready, lookup = pending.popleft()
+                yield ready, lookup.result() if lookup else []
+        finally:
+            for _, lookup in pending:
+                if lookup is not None:
+                    lookup.cancel()
+            search_stage.set(pages=pages_seen, results=results_seen)
+            search_stage.end()
+
+    async def stream_async(
+        self,
+        query_text: str,
+        page_token: str = "",
+        filter_str: str = "",
+        max_pages: Optional[int] = None,
+        max_results: Optional[int] = None,
+        hydration_session: Optional[HydrationSession] = None,
+        **kwargs,
+    ) -> AsyncIterator[Tuple[SearchResponse, List[Optional[Entity]]]]:
+        """
+        Asynchronous counterpart of ``stream``.
+
+        Parameters:
+          query_text (str): The text to search for
+          page_token (str, optional): Token for retrieving a specific page of results. Defaults to "".
+          filter_str (str, optional): Filter string to narrow down search results. Defaults to "".
+          max_pages (int, optional): Overrides ``config.max_pages``.
+          max_results (int, optional): Overrides ``config.max_results``.
+          hydration_session (HydrationSession, optional): Session to hydrate through, e.g.
+            one shared by several searches. Defaults to a new session for this search.
+          **kwargs: Additional keyword arguments to pass to the search method.
+
+        Yields:
+          Tuple[SearchResponse, List[Optional[Entity]]]: A page and the entities for its results.
+        """
+        max_pages, max_results = self._resolve_caps(max_pages, max_results)
+        page_size = (
+            min(self.config.page_size, max_results) if max_results else None
+        )
+        hydrate = self.config.return_datastore_entities
+        session: HydrationSession = hydration_session or self.hydrator.session()
+        pending: Deque[Tuple[SearchResponse, Optional[asyncio.Future]]] = deque()
+        pages_seen = results_seen = 0
+        # Not entered as a context: it would span this generator's yields.
+        search_stage = telemetry.stage("datastore.search")
+        page_start = time.perf_counter()
+        try:
+            async for response in self.search_async(
+                query_text, page_token, filter_str, page_size, **kwargs
+            ):
+                self._record_page(response, page_start, pages_seen)
+                done = self._trim_page(response, results_seen, max_results)
+                pages_seen += 1
+                results_seen += len(response.results)
+
+                doc_ids = self._page_doc_ids(response)
+                lookup: Optional[asyncio.Future] = None
+                if hydrate and doc_ids:
+                    lookup = asyncio.wrap_future(session.submit(doc_ids))
+                pending.append((response, lookup))
+
+                while pending and (pending[0][1] is None or pending[0][1].done()):
+                    ready, lookup = pending.popleft()
+                    yield ready, lookup.result() if lookup else []
+
+                if done or (max_pages is not None and pages_seen >= max_pages):
+                    break
+                page_start = time.perf_counter()
+
+            while pending:
+                ready, lookup = pending.popleft()
+                yield ready, await lookup if lookup else []
+        finally:
+            for _, lookup in pending:
+                if lookup is not None:
+                    lookup.cancel()
+            search_stage.set(pages=pages_seen, results=results_seen)
+            search_stage.end()
+
+    def _flight_key(
+        self,
+        query_text: str,
+        page_token: str,
+        filter_str: str,
+        max_pages: Optional[int],
+        max_results: Optional[int],
+        kwargs: dict,
+    ) -> Hashable:
+        """Return the key identifying a search, with everything that changes its pages and entities."""
+        max_pages, max_results = self._resolve_caps(max_pages, max_results)
+        config = self.config
+        return request_key(
+            "discoveryengine.search",
+            config.serving_config,
+            config.branch,
+            config.page_size,
+            config.datastore_kind if config.return_datastore_entities else None,
+            query_text,
+            page_token,
+            filter_str,
+            max_pages,
+            max_results,
+            **kwargs,
+        )
+
+    def collect(
+        self,
+        query_text: str,
+        page_token: str = "",
+        filter_str: str = "",
+        max_pages: Optional[int] = None,
+        max_results: Optional[int] = None,
+        **kwargs,
+    ) -> List[Tuple[SearchResponse, List[Optional[Entity]]]]:
+        """
+        Run ``stream`` to completion and return its pages with their entities.
+
+        With ``single_flight`` set, a call made while an identical one is running
+        on another thread waits for that call's pages, or its exception, instead
+        of searching again. Shared pages are the same objects for every caller,
+        so they must not be modified.
+
+        Parameters:
+          query_text (str): The text to search for
+          page_token (str, optional): Token for retrieving a specific page of results. Defaults to "".
+          filter_str (str, optional): Filter string to narrow down search results. Defaults to "".
+          max_pages (int, optional): Overrides ``config.max_pages``.
+          max_results (int, optional): Overrides ``config.max_results``.
+          **kwargs: Additional keyword arguments to pass to the search method.
+
+        Returns:
+          List[Tuple[SearchResponse, List[Optional[Entity]]]]: The pages ``stream`` yields.
+        """
+
+        def run() -> List[Tuple[SearchResponse, List[Optional[Entity]]]]:
+            return list(
+                self.stream(
+                    query_text, page_token, filter_str, max_pages, max_results, **kwargs
+                )
+            )
+
+        if self.single_flight is None:
+            return run()
+        key = self._flight_key(
+            query_text, page_token, filter_str, max_pages, max_results, kwargs
+        )
+        return self.single_flight.do(key, run)
+
+    async def collect_async(
+        self,
+        query_text: str,
+        page_token: str = "",
+        filter_str: str = "",
+        max_pages: Optional[int] = None,
+        max_results: Optional[int] = None,
+        **kwargs,
+    ) -> List[Tuple[SearchResponse, List[Optional[Entity]]]]:
+        """
+        Asynchronous counterpart of ``collect``.
+
+        Identical concurrent calls on the same event loop share one search. A
+        cancelled caller stops waiting without affecting the others; the shared
+        search is cancelled only when every caller has been.
+
+        Parameters:
+          query_text (str): The text to search for
+          page_token (str, optional): Token for retrieving a specific page of results. Defaults to "".
+          filter_str (str, optional): Filter string to narrow down search results. Defaults to "".
+          max_pages (int, optional): Overrides ``config.max_pages``.
+          max_results (int, optional): Overrides ``config.max_results``.
+          **kwargs: Additional keyword arguments to pass to the search method.
+
+        Returns:
+          List[Tuple[SearchResponse, List[Optional[Entity]]]]: The pages ``stream_async`` yields.
+        """
+
+        async def run() -> List[Tuple[SearchResponse, List[Optional[Entity]]]]:
+            return [
+                page
+                async for page in self.stream_async(
+                    query_text, page_token, filter_str, max_pages, max_results, **kwargs
+                )
+            ]
+
+        if self.single_flight is None:
+            return await run()
+        key = self._flight_key(
+            query_text, page_token, filter_str, max_pages, max_results, kwargs
+        )
+        return await self.single_flight.do_async(key, run)
+
+    def _process_results(
+        self,
+        search_responses_list: List[SearchResponse],
+        entities: List[List[Optional[Entity]]],
+    ) -> Union[Tuple[List[SearchResponse], List[List[Optional[Entity]]]], Any]:
+        """Apply the optional result processor to the raw results."""
+        raw_results: Tuple[List[SearchResponse], List[List[Optional[Entity]]]] = (
+            search_responses_list,
+            entities,
+        )
+
+        # If a processing function is provided, use it.
+        if self.result_processor and callable(self.result_processor):
+            with telemetry.stage("datastore.process_results"):
+                return self.result_processor(raw_results)
+        return raw_results
 
     def __call__(
-        self, query_text: str, page_token: str = "", filter_str: str = "", **kwargs
+        self,
+        query_text: str,
+        page_token: str = "",
+        filter_str: str = "",
+        max_pages: Optional[int] = None,
+        max_results: Optional[int] = None,
+        **kwargs,
     ) -> Union[Tuple[List[SearchResponse], List[List[Optional[Entity]]]], Any]:
         """
         Execute a search query and return the results with optional entity retrieval.
 
         This method performs the main search operation flow:
         1. Executes the search using the provided query text and parameters
-        2. Extracts document IDs from the search results
-        3. Optionally retrieves corresponding Datastore entities if configured
+        2. Extracts document IDs from each search response page as it arrives
+        3. Optionally retrieves corresponding Datastore entities if configured,
+           overlapping each lookup with the request for the next page
         4. Returns either raw results or processed results if a result processor is provided
 
+        With ``single_flight`` set, steps 1-3 are shared with an identical call
+        already running; see ``collect``.
+
         Parameters:
           query_text (str): The text to search for
           page_token (str, optional): Token for retrieving a specific page of results. Defaults to "".
           filter_str (str, optional): Filter string to narrow down search results. Defaults to "".
+          max_pages (int, optional): Overrides ``config.max_pages``.
+          max_results (int, optional): Overrides ``config.max_results``.
           **kwargs: Additional keyword arguments to pass to the search method.
 
         Returns:
           Union[Tuple[List[SearchResponse], List[List[Optional[Entity]]]], Any]:
             - If result_processor is None: A tuple containing (search_responses_list, entities)
               where search_responses_list is a list of SearchResponse objects and
-              entities is a list of optional Entity objects.
+              entities holds one list of optional Entity objects per page.
             - If result_processor is provided: The output of the result processor function
               applied to the raw results.
 
@@ -248,31 +842,274 @@ class DiscoveryDatastoreSearcher:
           Datastore entities are only fetched if self.config.return_datastore_entities is True
           and search results contain document IDs.
         """
-        # Execute the search.
-        search_responses: Iterator[SearchResponse] = self.search(
-            query_text, page_token, filter_str, **kwargs
-        )
+        search_responses_list: List[SearchResponse] = []
+        entities: List[List[Optional[Entity]]] = []
+        for response, page_entities in self.collect(
+            query_text, page_token, filter_str, max_pages, max_results, **kwargs
+        ):
+            search_responses_list.append(response)
+            if self.config.return_datastore_entities:
+                entities.append(page_entities)
 
-        # Extract document IDs from the search results.
-        doc_ids: List[str] = []
-        search_responses_list = list(search_responses)
-        for response in search_responses_list:
-            doc_ids.append([result.id for result in response.results])
+        return self._process_results(search_responses_list, entities)
 
-        # Retrieve corresponding Datastore entities.
-        entities: List[Optional[Entity]] = []
-        if doc_ids and self.config.return_datastore_entities:
-            entities = self.fetch_datastore_entities(doc_ids)
+    async def call_async(
+        self,
+        query_text: str,
+        page_token: str = "",
+        filter_str: str = "",
+        max_pages: Optional[int] = None,
+        max_results: Optional[int] = None,
+        **kwargs,
+    ) -> Union[Tuple[List[SearchResponse], List[List[Optional[Entity]]]], Any]:
+        """
+        Asynchronous counterpart of ``__call__``.
 
-        raw_results: Tuple[List[SearchResponse], List[Optional[Entity]]] = (
-            search_responses_list,
-            entities,
-        )
+        Search pages are fetched with the asyncio Discovery Engine client and the
+        Datastore lookups run on the bounded lookup pool, so concurrent callers on
+        the same event loop do not serialize behind each other.
 
-        # If a processing function is provided, use it.
-        if self.result_processor and callable(self.result_processor):
-            return self.result_processor(raw_results)
-        return raw_results
+        Parameters:
+          query_text (str): The text to search for
+          page_token (str, optional): Token for retrieving a specific page of results. Defaults to "".
+          filter_str (str, optional): Filter string to narrow down search results. Defaults to "".
+          max_pages (int, optional): Overrides ``config.max_pages``.
+          max_results (int, optional): Overrides ``config.max_results``.
+          **kwargs: Additional keyword arguments to pass to the search method.
+
+        Returns:
+          Union[Tuple[List[SearchResponse], List[List[Optional[Entity]]]], Any]:
+            The same value ``__call__`` would return for these arguments.
+        """
+        search_responses_list: List[SearchResponse] = []
+        entities: List[List[Optional[Entity]]] = []
+        for response, page_entities in await self.collect_async(
+            query_text, page_token, filter_str, max_pages, max_results, **kwargs
+        ):
+            search_responses_list.append(response)
+            if self.config.return_datastore_entities:
+                entities.append(page_entities)
+
+        return self._process_results(search_responses_list, entities)
+
+    def _bulk_session(self, linger: float) -> Optional[BatchingHydrationSession]:
+        """Return the hydration session shared by one bulk run, or None without hydration."""
+        if not self.config.return_datastore_entities:
+            return None
+        return BatchingHydrationSession(self.hydrator, linger)
+
+    @staticmethod
+    def _bulk_query(query: BulkQuery) -> Tuple[str, str]:
+        """Split a bulk query into its text and filter."""
+        return (query, "") if isinstance(query, str) else (query[0], query[1])
+
+    def _search_one(
+        self,
+        index: int,
+        query: BulkQuery,
+        session: Optional[HydrationSession],
+        max_pages: Optional[int],
+        max_results: Optional[int],
+        kwargs: dict,
+    ) -> BulkSearchResult:
+        """Run one bulk query, capturing its failure in the result."""
+        query_text, filter_str = self._bulk_query(query)
+        outcome = BulkSearchResult(index, query_text, filter_str)
+        try:
+            pages = list(
+                self.stream(
+                    query_text, "", filter_str, max_pages, max_results, session, **kwargs
+                )
+            )
+            outcome.result = self._process_results(
+                [response for response, _ in pages],
+                [entities for _, entities in pages] if session is not None else [],
+            )
+        except Exception as error:  # reported per query; the batch goes on
+            outcome.error = error
+        return outcome
+
+    async def _search_one_async(
+        self,
+        index: int,
+        query: BulkQuery,
+        session: Optional[HydrationSession],
+        max_pages: Optional[int],
+        max_results: Optional[int],
+        kwargs: dict,
+    ) -> BulkSearchResult:
+        """Asynchronous counterpart of ``_search_one``."""
+        query_text, filter_str = self._bulk_query(query)
+        outcome = BulkSearchResult(index, query_text, filter_str)
+        try:
+            pages = [
+                page
+                async for page in self.stream_async(
+                    query_text, "", filter_str, max_pages, max_results, session, **kwargs
+                )
+            ]
+            outcome.result = self._process_results(
+                [response for response, _ in pages],
+                [entities for _, entities in pages] if session is not None else [],
+            )
+        except Exception as error:  # reported per query; the batch goes on
+            outcome.error = error
+        return outcome
+
+    def search_many(
+        self,
+        queries: Iterable[BulkQuery],
+        concurrency: int = 16,
+        ordered: bool = False,
+        max_pages: Optional[int] = None,
+        max_results: Optional[int] = None,
+        linger: float = 0.01,
+        **kwargs,
+    ) -> Iterator[BulkSearchResult]:
+        """
+        Run many queries with bounded concurrency, e.g. for evals, cache warming or log replay.
+
+        Up to ``concurrency`` queries run at once on a dedicated thread pool, and
+        ``queries`` is read lazily, so it may be a generator over a large file.
+        The Datastore lookups of all running queries go through one
+        ``BatchingHydrationSession``: their document IDs are merged into shared
+        ``get_multi`` batches and each ID is read at most once per call.
+
+        A failed query does not stop the others; its result carries the error.
+
+        Parameters:
+          queries (Iterable[Union[str, Tuple[str, str]]]): Query texts, or
+            ``(query_text, filter_str)`` pairs.
+          concurrency (int, optional): Most queries in flight. Defaults to 16.
+          ordered (bool, optional): Yield results in input order instead of as they
+            complete. Finished results then wait for slower earlier ones, so at most
+            ``4 * concurrency`` queries are started ahead of the oldest unfinished one.
+            Defaults to False.
+          max_pages (int, optional): Overrides ``config.max_pages``.
+          max_results (int, optional): Overrides ``config.max_results``.
+          linger (float, optional): Seconds an ID may wait for other queries' IDs
+            before its lookup is sent. Defaults to 0.01.
+          **kwargs: Additional keyword arguments to pass to every search request.
+
+        Yields:
+          BulkSearchResult: One per query.
+        """
+        session = self._bulk_session(linger)
+        pending = enumerate(queries)
+        order = _ResultOrder(ordered)
+        running: Set[Future] = set()
+        exhausted = False
+        pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bulk-search")
+        try:
+            while True:
+                while (
+                    not exhausted
+                    and len(running) < concurrency
+                    and len(running) + len(order.buffered) < 4 * concurrency
+                ):
+                    item = next(pending, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    running.add(
+                        pool.submit(
+                            contextvars.copy_context().run,
+                            self._search_one,
+                            *item,
+                            session,
+                            max_pages,
+                            max_results,
+                            kwargs,
+                        )
+                    )
+                if not running:
+                    break
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from order.add(future.result())
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            if session is not None:
+                session.close()
+
+    async def search_many_async(
+        self,
+        queries: Iterable[BulkQuery],
+        concurrency: int = 16,
+        ordered: bool = False,
+        max_pages: Optional[int] = None,
+        max_results: Optional[int] = None,
+        linger: float = 0.01,
+        **kwargs,
+    ) -> AsyncIterator[BulkSearchResult]:
+        """
+        Asynchronous counterpart of ``search_many``.
+
+        The queries run as tasks on the running event loop with the asyncio
+        Discovery Engine client; the parameters and results are the same.
+
+        Yields:
+          BulkSearchResult: One per query.
+        """
+        session = self._bulk_session(linger)
+        pending = enumerate(queries)
+        order = _ResultOrder(ordered)
+        running: Set[asyncio.Task] = set()
+        exhausted = False
+        try:
+            while True:
+                while (
+                    not exhausted
+                    and len(running) < concurrency
+                    and len(running) + len(order.buffered) < 4 * concurrency
+                ):
+                    item = next(pending, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    running.add(
+                        asyncio.ensure_future(
+                            self._search_one_async(
+                                *item, session, max_pages, max_results, kwargs
+                            )
+                        )
+                    )
+                if not running:
+                    break
+                done, running = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    for outcome in order.add(task.result()):
+                        yield outcome
+        finally:
+            for task in running:
+                task.cancel()
+            if session is not None:
+                session.close()
+
+    def warm_up(self, timeout: Optional[float] = None) -> None:
+        """
+        Create the shared clients and connect their channels ahead of the first search.
+
+        Raises:
+          grpc.FutureTimeoutError: If a channel is not ready within ``timeout``.
+        """
+        self.discovery_client
+        self.datastore_client
+        warm_up_clients(timeout)
+
+    def close(self) -> None:
+        """
+        Release the lookup thread pool used by the async path.
+
+        The shared clients stay open for other searchers; ``app.utils.clients``
+        closes them at exit.
+        """
+        if self._lookup_executor is not None:
+            self._lookup_executor.shutdown(wait=False)
+            self._lookup_executor = None
+            self._hydrator = None
 
 
 # --- Example usage ---
@@ -0,0 +1,171 @@
+"""
+Local text embedders.
+
+These run on CPU with no network round trip, for uses where a rough notion of
+textual similarity is enough, e.g. spotting near-duplicate queries in a cache.
+Any callable that maps a string to a unit-length ``numpy`` vector can be used
+wherever an ``Embedder`` is expected.
+"""
+
+import inspect
+import re
+import threading
+import unicodedata
+import zlib
+from typing import Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional
+
+import numpy as np
+
+
+Embedder = Callable[[str], np.ndarray]
+
+_TOKEN_RE = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can could do does for from has have how i in is it its me my "
+    "of on or our should that the their this to was we were what when where which who why "
+    "will with would you your".split()
+)
+
+
+def normalize_text(text: str) -> str:
+    """Case-fold, NFKC-normalize and collapse punctuation and whitespace in ``text``."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(_TOKEN_RE.findall(text))
+
+
+def content_terms(text: str) -> FrozenSet[str]:
+    """Return the normalized words of ``text`` other than ``STOPWORDS``, e.g. to compare what two queries ask for."""
+    return frozenset(term for term in normalize_text(text).split() if term not in STOPWORDS)
+
+
+class HashingEmbedder:
+    """
+    Embed text by hashing word unigrams, bigrams and character trigrams into a fixed-size vector.
+
+    Hashes use CRC32, so vectors are stable across processes and runs.
+
+    Attributes:
+      dim (int): Size of the output vectors.
+      char_ngram (int): Length of the character n-grams. 0 disables them.
+    """
+
+    def __init__(self, dim: int = 512, char_ngram: int = 3) -> None:
+        self.dim = dim
+        self.char_ngram = char_ngram
+
+    def _features(self, text: str) -> List[str]:
+        words = normalize_text(text).split()
+        features = list(words)
+        features.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+        if self.char_ngram:
+            n = self.char_ngram
+            for word in words:
+                padded = f"#{word}#"
+                features.extend(padded[i : i + n] for i in range(max(1, len(padded) - n + 1)))
+        return features
+
+    def __call__(self, text: str) -> np.ndarray:
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode("utf-8")) for feature in self._features(text)),
+            dtype=np.uint32,
+        )
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if hashes.size:
+            signs = np.where(hashes & 1, -1.0, 1.0).astype(np.float32)
+            np.add.at(vector, (hashes >> 1) % self.dim, signs)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @property
+    def signature(self) -> str:
+        """Identify the configuration: vectors are only comparable between embedders with the same signature."""
+        return f"HashingEmbedder(dim={self.dim}, char_ngram={self.char_ngram})"
+
+    def embed_many(self, texts: Iterable[str]) -> np.ndarray:
+        """Embed several texts into a ``(len(texts), dim)`` matrix."""
+        rows = [self(text) for text in texts]
+        return np.vstack(rows) if rows else np.zeros((0, self.dim), dtype=np.float32)
+
+
+def embedder_signature(embedder: Embedder) -> str:
+    """
+    Identify ``embedder`` for checking that queries and stored vectors were
+    embedded alike: its ``signature`` attribute if it has one, else its type.
+    """
+    signature = getattr(embedder, "signature", None)
+    if isinstance(signature, str):
+        return signature
+    kind = embedder if inspect.isroutine(embedder) else type(embedder)
+    return f"{kind.__module__}.{kind.__qualname__}"
+
+
+class NearDuplicateIndex:
+    """
+    Embeddings of normalized texts for nearest-neighbour lookup by cosine similarity.
+
+    Texts are grouped, e.g. by the request parameters they were cached with, and
+    a lookup only considers texts in its own group. Thread safe.
+
+    Attributes:
+      threshold (float): Minimum cosine similarity for a text to count as a near duplicate.
+      embedder (Embedder): Embeds the texts.
+    """
+
+    def __init__(self, threshold: float, embedder: Optional[Embedder] = None) -> None:
+        self.threshold = threshold
+        self.embedder: Embedder = embedder or HashingEmbedder()
+        self._vectors: Dict[Hashable, Dict[str, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, group: Hashable, text: str) -> None:
+        vector = self.embedder(text)
+        with self._lock:
+            self._vectors.setdefault(group, {})[text] = vector
+
+    def nearest(self, group: Hashable, text: str, accept: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """
+        Return the most similar text of ``group`` that meets ``threshold`` and,
+        if given, that ``accept`` approves; else None.
+        """
+        with self._lock:
+            vectors = self._vectors.get(group)
+            if not vectors:
+                return None
+            texts = list(vectors)
+            matrix = np.vstack([vectors[t] for t in texts])
+        scores = matrix @ self.embedder(text)
+        for best in np.argsort(-scores, kind="stable"):
+            if scores[best] < self.threshold:
+                break
+            if accept is None or accept(texts[best]):
+                return texts[best]
+        return None
+
+    def discard(self, group: Hashable, text: str) -> None:
+        with self._lock:
+            self._vectors.get(group, {}).pop(text, None)
+
+    def prune(self, group: Hashable, limit: int, keep: Callable[[str], bool]) -> None:
+        """Once ``group`` holds more than ``limit`` texts, drop those ``keep`` rejects."""
+        with self._lock:
+            vectors = self._vectors.get(group, {})
+            if len(vectors) > limit:
+                for stale in [t for t in vectors if not keep(t)]:
+                    del vectors[stale]
+
+    def drop_groups(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Forget every group matching ``predicate``."""
+        with self._lock:
+            for group in [g for g in self._vectors if predicate(g)]:
+                del self._vectors[group]
+
+
+__all__ = [
+    "STOPWORDS",
+    "Embedder",
+    "HashingEmbedder",
+    "NearDuplicateIndex",
+    "content_terms",
+    "embedder_signature",
+    "normalize_text",
+]
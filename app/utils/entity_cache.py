@@ -0,0 +1,314 @@
+"""
+Two-tier cache for Datastore entities keyed by ``(datastore_kind, doc_id)``.
+
+The first tier is an in-process LRU. The optional second tier is a SQLite file
+shared by every process on the same host, so replicas warm each other up and a
+re-index on that host can invalidate all of them at once. Processes on other
+hosts pick up re-indexed documents when their entries' TTL runs out.
+"""
+
+import sqlite3
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from google.cloud import datastore
+from google.cloud.datastore.helpers import entity_from_protobuf, entity_to_protobuf
+from google.cloud.datastore_v1.types import entity as entity_pb2
+
+from .cache import CacheStats, LRUCache
+
+
+Entity = datastore.Entity
+
+# IDs per statement, well under SQLite's bound-parameter limit.
+_SQL_CHUNK = 500
+
+_LIVE_CACHES: "weakref.WeakSet[EntityCache]" = weakref.WeakSet()
+
+
+def serialize_entity(entity: Entity) -> bytes:
+    """Encode an entity as its protobuf wire format."""
+    return entity_pb2.Entity.serialize(entity_to_protobuf(entity))
+
+
+def deserialize_entity(payload: bytes) -> Entity:
+    """Decode an entity encoded with ``serialize_entity``."""
+    return entity_from_protobuf(entity_pb2.Entity.deserialize(payload))
+
+
+class SharedEntityStore:
+    """
+    SQLite-backed entity store shared by the processes on one host.
+
+    Besides the entities, the store keeps a generation counter per kind that is
+    bumped on every invalidation, so in-process tiers can tell that their copies
+    are stale without re-reading each entity.
+
+    Attributes:
+      path (Path): Location of the SQLite database file.
+      ttl (Optional[float]): Seconds an entity stays valid. None keeps entities until invalidated.
+      stats (CacheStats): Hit, miss and expiry counters for this process.
+    """
+
+    def __init__(self, path: Union[str, Path], ttl: Optional[float] = None) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entities ("
+                " kind TEXT NOT NULL, doc_id TEXT NOT NULL, expires_at REAL,"
+                " payload BLOB NOT NULL, PRIMARY KEY (kind, doc_id))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS generations ("
+                " kind TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get_many(self, kind: str, doc_ids: Sequence[str]) -> Dict[str, Entity]:
+        """Return the unexpired entities stored for ``doc_ids``, keyed by document ID."""
+        if not doc_ids:
+            return {}
+        now = time.time()
+        rows = []
+        with self._lock:
+            for start in range(0, len(doc_ids), _SQL_CHUNK):
+                chunk = list(doc_ids[start : start + _SQL_CHUNK])
+                placeholders = ",".join("?" * len(chunk))
+                rows += self._conn.execute(
+                    f"SELECT doc_id, expires_at, payload FROM entities"
+                    f" WHERE kind = ? AND doc_id IN ({placeholders})",
+                    (kind, *chunk),
+                ).fetchall()
+        found: Dict[str, Entity] = {}
+        expired: List[str] = []
+        for doc_id, expires_at, payload in rows:
+            if expires_at is not None and expires_at <= now:
+                expired.append(doc_id)
+            else:
+                found[doc_id] = deserialize_entity(payload)
+        if expired:
+            self._delete(kind, expired)
+            self.stats.expirations += len(expired)
+        self.stats.hits += len(found)
+        self.stats.misses += len(doc_ids) - len(found)
+        return found
+
+    def put_many(self, kind: str, entities: Iterable[Entity]) -> None:
+        """Store ``entities`` under their key names."""
+        expires_at = time.time() + self.ttl if self.ttl else None
+        rows = [
+            (kind, str(entity.key.id_or_name), expires_at, serialize_entity(entity))
+            for entity in entities
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entities (kind, doc_id, expires_at, payload)"
+                " VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def invalidate(self, kind: str, doc_ids: Optional[Sequence[str]] = None) -> int:
+        """
+        Drop the stored entities for ``doc_ids``, or the whole kind if None, and bump its generation.
+
+        Returns:
+          int: Number of entities dropped.
+        """
+        with self._lock:
+            if doc_ids is None:
+                dropped = self._conn.execute(
+                    "DELETE FROM entities WHERE kind = ?", (kind,)
+                ).rowcount
+            else:
+                dropped = self._delete_locked(kind, doc_ids)
+            self._conn.execute(
+                "INSERT INTO generations (kind, generation) VALUES (?, 1)"
+                " ON CONFLICT(kind) DO UPDATE SET generation = generation + 1",
+                (kind,),
+            )
+            self._conn.commit()
+        self.stats.invalidations += dropped
+        return dropped
+
+    def generation(self, kind: str) -> int:
+        """Return how many times ``kind`` has been invalidated."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generation FROM generations WHERE kind = ?", (kind,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _delete(self, kind: str, doc_ids: Sequence[str]) -> int:
+        with self._lock:
+            dropped = self._delete_locked(kind, doc_ids)
+            self._conn.commit()
+        return dropped
+
+    def _delete_locked(self, kind: str, doc_ids: Sequence[str]) -> int:
+        dropped = 0
+        for start in range(0, len(doc_ids), _SQL_CHUNK):
+            chunk = list(doc_ids[start : start + _SQL_CHUNK])
+            placeholders = ",".join("?" * len(chunk))
+            dropped += self._conn.execute(
+                f"DELETE FROM entities WHERE kind = ? AND doc_id IN ({placeholders})",
+                (kind, *chunk),
+            ).rowcount
+        return dropped
+
+
+class EntityCache:
+    """
+    In-process LRU in front of an optional host-wide ``SharedEntityStore``.
+
+    Attributes:
+      memory (LRUCache): The in-process tier, keyed by ``(kind, doc_id)``.
+      shared (Optional[SharedEntityStore]): The host-wide tier, if configured.
+      generation_check_interval (float): Seconds between checks of the shared
+        generation counter, which bounds how long another process's invalidation
+        takes to reach this one.
+
+    Example usage:
+      ```
+      cache = EntityCache(max_entries=2048, ttl=600, shared_path="/tmp/entities.sqlite")
+      searcher = DiscoveryDatastoreSearcher(config, entity_cache=cache)
+      ...
+      print(cache.stats())
+      ```
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = 3600.0,
+        shared_path: Optional[Union[str, Path]] = None,
+        generation_check_interval: float = 5.0,
+    ) -> None:
+        self.memory = LRUCache(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            ttl=ttl,
+            sizeof=lambda item: len(serialize_entity(item[1])),
+        )
+        self.shared: Optional[SharedEntityStore] = (
+            SharedEntityStore(shared_path, ttl=ttl) if shared_path else None
+        )
+        self.generation_check_interval = generation_check_interval
+        self._generations: Dict[str, Tuple[int, float]] = {}
+        _LIVE_CACHES.add(self)
+
+    def _generation(self, kind: str) -> int:
+        """Return the shared generation of ``kind``, re-reading it at most once per interval."""
+        if self.shared is None:
+            return 0
+        now = time.monotonic()
+        generation, checked_at = self._generations.get(kind, (0, float("-inf")))
+        if now - checked_at >= self.generation_check_interval:
+            generation = self.shared.generation(kind)
+            self._generations[kind] = (generation, now)
+        return generation
+
+    def get_many(self, kind: str, doc_ids: Sequence[str]) -> Dict[str, Entity]:
+        """
+        Return the cached entities for ``doc_ids``, keyed by document ID.
+
+        Entities found only in the shared tier are promoted to the in-process tier.
+        """
+        generation = self._generation(kind)
+        found: Dict[str, Entity] = {}
+        misses: List[str] = []
+        for doc_id in doc_ids:
+            item = self.memory.get((kind, doc_id))
+            if item is not None and item[0] != generation:
+                self.memory.delete((kind, doc_id))
+                item = None
+            if item is None:
+                misses.append(doc_id)
+            else:
+                found[doc_id] = item[1]
+        if misses and self.shared is not None:
+            promoted = self.shared.get_many(kind, misses)
+            for doc_id, entity in promoted.items():
+                self.memory.set((kind, doc_id), (generation, entity))
+            found.update(promoted)
+        return found
+
+    def put_many(self, kind: str, entities: Iterable[Entity]) -> None:
+        """Cache ``entities`` in both tiers under their key names."""
+        entities = list(entities)
+        generation = self._generation(kind)
+        for entity in entities:
+            self.memory.set((kind, str(entity.key.id_or_name)), (generation, entity))
+        if self.shared is not None:
+            self.shared.put_many(kind, entities)
+
+    def invalidate(self, kind: str, doc_ids: Optional[Sequence[str]] = None) -> None:
+        """Drop ``doc_ids`` of ``kind``, or the whole kind if None, from both tiers."""
+        if doc_ids is None:
+            self.memory.delete_where(lambda key: key[0] == kind)
+        else:
+            for doc_id in doc_ids:
+                self.memory.delete((kind, doc_id))
+        if self.shared is not None:
+            self.shared.invalidate(kind, doc_ids)
+            self._generations.pop(kind, None)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return the hit/miss/eviction counters of each tier."""
+        stats = {"memory": self.memory.stats.as_dict()}
+        if self.shared is not None:
+            stats["shared"] = self.shared.stats.as_dict()
+        return stats
+
+
+def invalidate_entities(
+    kind: str,
+    doc_ids: Optional[Sequence[str]] = None,
+    shared_path: Optional[Union[str, Path]] = None,
+) -> None:
+    """
+    Invalidate cached entities after a re-index.
+
+    Every live ``EntityCache`` in this process is invalidated directly. If
+    ``shared_path`` is given, the shared store is invalidated too, which reaches
+    the other processes on this host within their ``generation_check_interval``.
+
+    Args:
+      kind (str): Datastore kind that was re-indexed.
+      doc_ids (Optional[Sequence[str]]): Re-indexed document IDs, or None for the whole kind.
+      shared_path (Optional[Union[str, Path]]): Path of the shared SQLite store, if one is used.
+    """
+    for cache in list(_LIVE_CACHES):
+        cache.invalidate(kind, doc_ids)
+    if shared_path and Path(shared_path).exists():
+        store = SharedEntityStore(shared_path)
+        try:
+            store.invalidate(kind, doc_ids)
+        finally:
+            store.close()
+
+
+__all__ = [
+    "EntityCache",
+    "SharedEntityStore",
+    "deserialize_entity",
+    "invalidate_entities",
+    "serialize_entity",
+]
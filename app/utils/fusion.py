@@ -0,0 +1,49 @@
+"""Rank fusion helpers for merging results from several retrieval backends."""
+
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: Sequence[Sequence[T]],
+    key: Callable[[T], Hashable],
+    k: int = 60,
+    weights: Optional[Sequence[float]] = None,
+) -> List[Tuple[T, float, List[int]]]:
+    """
+    Merge ranked lists with reciprocal rank fusion (RRF).
+
+    Each item scores ``weight / (k + rank)`` (rank starting at 1) for every list it
+    appears in, counting only its best rank within a list. Items that share a key
+    are treated as one; the representative kept is the best-ranked occurrence in
+    the earliest list.
+
+    Args:
+      ranked_lists (Sequence[Sequence[T]]): One ranked list per backend, best first.
+      key (Callable[[T], Hashable]): Identifies duplicates across and within lists.
+      k (int): RRF damping constant; larger values flatten the rank contribution.
+      weights (Optional[Sequence[float]]): Per-list weights. Defaults to 1.0 each.
+
+    Returns:
+      List[Tuple[T, float, List[int]]]: ``(item, score, list_indices)`` best first, where
+      ``list_indices`` are the lists the item was found in.
+    """
+    weights = weights or [1.0] * len(ranked_lists)
+    scores: Dict[Hashable, float] = {}
+    items: Dict[Hashable, T] = {}
+    found_in: Dict[Hashable, List[int]] = {}
+    for list_index, (ranked, weight) in enumerate(zip(ranked_lists, weights)):
+        for rank, item in enumerate(ranked, start=1):
+            item_key = key(item)
+            if list_index in found_in.get(item_key, ()):
+                continue
+            scores[item_key] = scores.get(item_key, 0.0) + weight / (k + rank)
+            items.setdefault(item_key, item)
+            found_in.setdefault(item_key, []).append(list_index)
+    ordered = sorted(scores, key=scores.__getitem__, reverse=True)
+    return [(items[item_key], scores[item_key], found_in[item_key]) for item_key in ordered]
+
+
+__all__ = ["reciprocal_rank_fusion"]
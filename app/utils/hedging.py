@@ -0,0 +1,305 @@
+"""
+Time-bounded, hedged execution of blocking backend calls from async code.
+
+``HedgedCaller`` runs a blocking call (e.g. ``rag.retrieval_query``) on a
+bounded thread pool so it never stalls the event loop, and adds three
+tail-latency controls on top:
+
+- a per-call deadline, counted from when the call starts running on a worker,
+- a hedge: once the first attempt has run longer than a configurable latency
+  percentile of recent calls, an identical second attempt is started and the
+  first result to arrive wins,
+- a circuit breaker that fails fast while the backend keeps failing.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Optional, Set
+
+import numpy as np
+
+
+class RetrievalTimeoutError(TimeoutError):
+    """Raised when a call does not complete before its deadline."""
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a backend while its circuit breaker is open."""
+
+
+class LatencyTracker:
+    """
+    Rolling window of successful call latencies.
+
+    Attributes:
+      window (int): Number of most recent samples kept.
+    """
+
+    def __init__(self, window: int = 200) -> None:
+        self.window = window
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        """Add one latency sample, in seconds."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the ``q``-th percentile (0-100) of the window, or None when it is empty."""
+        with self._lock:
+            if not self._samples:
+                return None
+            samples = np.fromiter(self._samples, dtype=np.float64)
+        return float(np.percentile(samples, q))
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and calls
+    fail fast for ``reset_timeout`` seconds. Then a single trial call is let
+    through: success closes the circuit, failure opens it again.
+
+    Attributes:
+      failure_threshold (int): Consecutive failures that open the circuit.
+      reset_timeout (float): Seconds the circuit stays open before a trial call.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Return ``"closed"``, ``"open"`` or ``"half-open"``."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._clock() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def check(self) -> None:
+        """
+        Admit a call or fail fast.
+
+        Raises:
+          CircuitOpenError: If the circuit is open, or half-open with a trial already in flight.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self._clock() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                raise CircuitOpenError(
+                    f"backend circuit open after {self._failures} consecutive failures"
+                )
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        """Close the circuit and reset the failure count."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """
+        End an admitted call that neither succeeded nor failed, e.g. a cancelled
+        one: it says nothing about the backend, but frees the half-open trial slot.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the circuit once the threshold is reached."""
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+
+
+class HedgedCaller:
+    """
+    Run blocking calls off the event loop with a deadline, hedging and circuit breaking.
+
+    Attributes:
+      timeout (Optional[float]): Seconds before a call fails with ``RetrievalTimeoutError``.
+        None waits indefinitely.
+      hedge_percentile (Optional[float]): Latency percentile (0-100) of recent calls after
+        which a hedge request is sent. None disables hedging.
+      initial_hedge_delay (Optional[float]): Hedge delay used until ``min_samples`` latencies
+        have been recorded. None disables hedging until then.
+      min_hedge_delay (float): Lower bound on the hedge delay, so a fast backend is not
+        sent every request twice.
+      min_samples (int): Samples needed before the percentile is trusted.
+      latencies (LatencyTracker): Latencies of recent successful calls.
+      breaker (CircuitBreaker): Circuit breaker shared by every call made through this caller.
+
+    Example usage:
+      ```
+      caller = HedgedCaller(timeout=8.0, hedge_percentile=95)
+      response = await caller.call(rag.retrieval_query, text=query, ...)
+      ```
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[float] = 10.0,
+        hedge_percentile: Optional[float] = None,
+        initial_hedge_delay: Optional[float] = None,
+        min_hedge_delay: float = 0.05,
+        min_samples: int = 20,
+        max_workers: int = 16,
+        breaker: Optional[CircuitBreaker] = None,
+        latencies: Optional[LatencyTracker] = None,
+    ) -> None:
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = latencies or LatencyTracker()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Return the bounded pool the blocking calls run on, creating it on first use."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="hedged-call"
+            )
+        return self._executor
+
+    def hedge_delay(self) -> Optional[float]:
+        """Return how long to wait before sending a hedge request, or None for no hedge."""
+        if self.hedge_percentile is None:
+            return None
+        if len(self.latencies) < self.min_samples:
+            return self.initial_hedge_delay
+        return max(self.min_hedge_delay, self.latencies.percentile(self.hedge_percentile))
+
+    async def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Call ``fn(*args, **kwargs)`` on the pool and await its result.
+
+        The deadline and the hedge delay count from when the call starts running
+        on a worker, not from when it was queued. A call still queued when the
+        deadline would have passed gives up without counting as a backend failure:
+        the pool is busy, e.g. with attempts that outlived their callers, since a
+        blocking call already running on a worker cannot be interrupted.
+
+        Returns:
+          Any: The result of whichever attempt completed successfully first.
+
+        Raises:
+          CircuitOpenError: If the circuit breaker is open.
+          RetrievalTimeoutError: If no attempt succeeds before the deadline.
+          Exception: Whatever the last attempt raised, if every attempt failed.
+        """
+        self.breaker.check()
+        loop = asyncio.get_running_loop()
+        queued = loop.time()
+        # Resolves with the loop time at which the first attempt began running.
+        running: asyncio.Future = loop.create_future()
+
+        def mark_running() -> None:
+            if not running.done():
+                running.set_result(loop.time())
+
+        def attempt() -> Any:
+            try:
+                loop.call_soon_threadsafe(mark_running)
+            except RuntimeError:
+                pass  # The loop closed while this attempt was queued; nobody waits for it.
+            return fn(*args, **kwargs)
+
+        attempts: Set[asyncio.Future] = {loop.run_in_executor(self.executor, attempt)}
+        delay = self.hedge_delay()
+        hedged = delay is None
+        last_error: Optional[BaseException] = None
+        try:
+            while attempts:
+                began = running.result() if running.done() else queued
+                deadline = began + self.timeout if self.timeout is not None else None
+                # Hedge only an attempt that is running; a queued one would just queue a second.
+                hedge_at = began + delay if running.done() and not hedged else None
+                wake_times = [t for t in (deadline, hedge_at) if t is not None]
+                wait = max(0.0, min(wake_times) - loop.time()) if wake_times else None
+                # Until an attempt runs, also wake when one starts, which moves the deadline.
+                waiting = attempts if running.done() else attempts | {running}
+                done, _ = await asyncio.wait(waiting, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done - {running}:
+                    attempts.discard(finished)
+                    if finished.exception() is None:
+                        self.latencies.record(loop.time() - running.result())
+                        self.breaker.record_success()
+                        return finished.result()
+                    last_error = finished.exception()
+
+                now = loop.time()
+                began = running.result() if running.done() else queued
+                if self.timeout is not None and now >= began + self.timeout:
+                    if not running.done():
+                        raise RetrievalTimeoutError(
+                            f"backend call did not start within {self.timeout:.2f}s: the worker pool is busy"
+                        )
+                    raise RetrievalTimeoutError(
+                        f"backend call did not complete within {self.timeout:.2f}s"
+                    )
+                if running.done() and not hedged and attempts and now >= began + delay:
+                    # One hedge per call. Whichever attempt loses keeps its worker until
+                    # the blocking call returns; only attempts still queued are cancelled.
+                    hedged = True
+                    attempts.add(loop.run_in_executor(self.executor, attempt))
+            raise last_error
+        except Exception:
+            if running.done():
+                self.breaker.record_failure()
+            else:
+                # The backend was never called, so this says nothing about it.
+                self.breaker.release()
+            raise
+        except BaseException:
+            # Cancelled: a half-open trial must not hold its slot forever.
+            self.breaker.release()
+            raise
+        finally:
+            running.cancel()
+            for pending in attempts:
+                pending.cancel()
+
+    def close(self) -> None:
+        """Release the worker pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+__all__ = [
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "HedgedCaller",
+    "LatencyTracker",
+    "RetrievalTimeoutError",
+]
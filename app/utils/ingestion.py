@@ -0,0 +1,348 @@
+"""
+Local preprocessing of documents before they are indexed.
+
+The pipeline is a chain of generators, so documents are read, cleaned and
+chunked one at a time and the corpus is never held in memory:
+
+1. ``read_documents`` yields documents from a directory and a metadata file,
+2. ``preprocess_document`` converts HTML to markdown, strips boilerplate and
+   splits on headings and code blocks (run on a process pool by ``iter_chunks``),
+3. ``MinHashDeduplicator`` drops chunks that nearly duplicate an earlier one.
+
+``iter_chunks`` wires the stages together and is what the indexing scripts use.
+"""
+
+import json
+import os
+import re
+import zlib
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from bs4 import BeautifulSoup
+from markdownify import markdownify
+
+from .embeddings import normalize_text
+from .tokens import estimate_tokens
+
+
+_HTML_SUFFIXES = {".html", ".htm"}
+_HTML_NOISE_TAGS = ["script", "style", "nav", "header", "footer", "aside", "form", "noscript", "iframe"]
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_BOILERPLATE_RE = re.compile(
+    r"^\s*(?:"
+    r"(?:©|\(c\)|copyright\b).*"
+    r"|all rights reserved\.?"
+    r"|(?:skip to (?:main )?content|back to top|table of contents|print this page)"
+    r"|(?:share|follow us)(?: on| this)?\b.{0,40}"
+    r"|.*\bcookies?\b.*\b(?:accept|consent|policy)\b.*"
+    r"|!\[[^\]]*\]\([^)]*\)"  # image-only line
+    r"|(?:\[[^\]]*\]\([^)]*\)\s*[|·•-]?\s*)+"  # line of links only
+    r")\s*$",
+    re.IGNORECASE,
+)
+# Largest prime below 2**32: with 32-bit shingle hashes and coefficients, a * x + b fits in a uint64.
+_PRIME = 4294967291
+
+
+@dataclass
+class ChunkingConfig:
+    """
+    Settings for ``preprocess_document`` and ``iter_chunks``.
+
+    Attributes:
+      max_tokens (int): Estimated token limit per chunk. Sections longer than this
+        are split on paragraphs; a single code block is never split.
+      min_tokens (int): Sections shorter than this are merged into the next one
+        under the same top-level heading.
+      dedup_threshold (Optional[float]): Estimated Jaccard similarity above which a
+        chunk counts as a near duplicate of an earlier one. None keeps duplicates.
+      num_perm (int): MinHash permutations per signature.
+      bands (int): LSH bands; ``num_perm`` must be divisible by it.
+      shingle_size (int): Words per shingle hashed into the signature.
+      workers (Optional[int]): Processes used to preprocess documents. 0 runs in
+        the calling process; None lets the pool pick.
+    """
+
+    max_tokens: int = 512
+    min_tokens: int = 64
+    dedup_threshold: Optional[float] = 0.85
+    num_perm: int = 128
+    bands: int = 32
+    shingle_size: int = 5
+    workers: Optional[int] = None
+
+
+def read_documents(md_dir: Path, metadata_file: Path, skip: Optional[Set[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield ``{"id", "text", "format", "metadata"}`` per file listed in ``metadata_file``.
+
+    Args:
+      md_dir (Path): Directory containing the markdown or HTML files.
+      metadata_file (Path): JSON list of ``{"filename", "metadata"}`` items.
+      skip (Optional[Set[str]]): File names to leave out.
+    """
+    with metadata_file.open("r", encoding="utf-8") as f:
+        items = json.load(f)
+
+    for item in items:
+        if skip and item["filename"] in skip:
+            continue
+        file_path = md_dir / item["filename"]
+        yield {
+            "id": item["filename"],
+            "text": file_path.read_text(encoding="utf-8"),
+            "format": "html" if file_path.suffix.lower() in _HTML_SUFFIXES else "markdown",
+            "metadata": item.get("metadata", {}),
+        }
+
+
+def html_to_markdown(html: str) -> str:
+    """Convert an HTML page to markdown, dropping scripts, navigation and other page chrome."""
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(_HTML_NOISE_TAGS):
+        tag.decompose()
+    body = soup.find("main") or soup.find("article") or soup.body or soup
+    return markdownify(str(body), heading_style="ATX", code_language_callback=lambda el: el.get("data-lang") or "")
+
+
+def strip_boilerplate(markdown: str) -> str:
+    """Remove boilerplate lines (copyright, cookie banners, link bars, bare images) outside code blocks."""
+    kept: List[str] = []
+    in_code = False
+    for line in markdown.splitlines():
+        if _FENCE_RE.match(line):
+            in_code = not in_code
+        elif not in_code and _BOILERPLATE_RE.match(line):
+            continue
+        kept.append(line.rstrip())
+    # Collapse runs of blank lines left behind.
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip()
+
+
+def _blocks(markdown: str) -> Iterator[Tuple[int, str, str]]:
+    """Yield ``(level, heading, block)``: headings (level > 0), whole code blocks and paragraphs (level 0)."""
+    paragraph: List[str] = []
+    code: Optional[List[str]] = None
+    for line in markdown.splitlines():
+        if code is not None:
+            code.append(line)
+            if _FENCE_RE.match(line):
+                yield 0, "", "\n".join(code)
+                code = None
+            continue
+        if _FENCE_RE.match(line):
+            if paragraph:
+                yield 0, "", "\n".join(paragraph)
+                paragraph = []
+            code = [line]
+            continue
+        heading = _HEADING_RE.match(line)
+        if heading or not line.strip():
+            if paragraph:
+                yield 0, "", "\n".join(paragraph)
+                paragraph = []
+            if heading:
+                yield len(heading.group(1)), heading.group(2), line
+            continue
+        paragraph.append(line)
+    if code is not None:
+        # Unterminated fence: keep what was read.
+        paragraph = code + paragraph
+    if paragraph:
+        yield 0, "", "\n".join(paragraph)
+
+
+def _split_long(block: str, max_tokens: int) -> List[str]:
+    """Split an oversized paragraph between sentences; code blocks are left whole."""
+    if _FENCE_RE.match(block) or estimate_tokens(block) <= max_tokens:
+        return [block]
+    pieces: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_RE.split(block):
+        if current and estimate_tokens(current + " " + sentence) > max_tokens:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_markdown(markdown: str, max_tokens: int = 512, min_tokens: int = 64) -> List[Tuple[str, str]]:
+    """
+    Split markdown on its structure.
+
+    Every heading starts a new section. A section over ``max_tokens`` is split
+    between paragraphs and code blocks, and long paragraphs between sentences; a
+    section under ``min_tokens`` is merged into the following section of the same
+    top-level heading.
+
+    Returns:
+      List[Tuple[str, str]]: ``(heading path, text)`` per chunk, e.g.
+      ``("Setup > Install", "## Install\\n...")``.
+    """
+    sections: List[Tuple[Tuple[str, ...], List[str]]] = []
+    path: List[Tuple[int, str]] = []
+    for level, heading, block in _blocks(markdown):
+        if level:
+            while path and path[-1][0] >= level:
+                path.pop()
+            path.append((level, heading))
+            sections.append((tuple(h for _, h in path), [block]))
+        elif sections:
+            sections[-1][1].append(block)
+        else:
+            sections.append(((), [block]))
+
+    chunks: List[Tuple[str, str]] = []
+    carry: List[str] = []
+    carry_root: Optional[str] = None
+    for headings, blocks in sections:
+        root = headings[0] if headings else None
+        if carry and root != carry_root:
+            chunks.append((" > ".join(previous), "\n\n".join(carry)))
+            carry = []
+        pieces = carry + [piece for block in blocks for piece in _split_long(block, max_tokens)]
+        carry = []
+        title = " > ".join(headings)
+        current: List[str] = []
+        for block in pieces:
+            if current and estimate_tokens("\n\n".join(current + [block])) > max_tokens:
+                chunks.append((title, "\n\n".join(current)))
+                current = []
+            current.append(block)
+        if current:
+            if estimate_tokens("\n\n".join(current)) < min_tokens:
+                carry, carry_root, previous = current, root, headings
+            else:
+                chunks.append((title, "\n\n".join(current)))
+    if carry:
+        chunks.append((" > ".join(previous), "\n\n".join(carry)))
+    return chunks
+
+
+class MinHashDeduplicator:
+    """
+    Streaming near-duplicate filter based on MinHash signatures and LSH banding.
+
+    Each text is reduced to ``num_perm`` minimum hashes of its word shingles. Two
+    texts whose signatures agree on every row of any band become candidates, and a
+    candidate whose estimated Jaccard similarity reaches ``threshold`` is reported
+    as a duplicate. Only signatures are kept, never the texts.
+    """
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 128, bands: int = 32, shingle_size: int = 5, seed: int = 1) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self._signatures: List[np.ndarray] = []
+
+    def signature(self, text: str) -> np.ndarray:
+        """Return the MinHash signature of ``text``."""
+        words = normalize_text(text).split()
+        size = min(self.shingle_size, max(len(words), 1))
+        shingles = {" ".join(words[i : i + size]) for i in range(max(len(words) - size + 1, 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        # One universal hash (a * x + b) mod p per permutation.
+        permuted = (np.outer(hashes, self._a) + self._b) % _PRIME
+        return permuted.min(axis=0)
+
+    def is_duplicate(self, signature: np.ndarray) -> bool:
+        """Return whether ``signature`` nearly matches a kept one; otherwise keep it."""
+        bands = [signature[i * self.rows : (i + 1) * self.rows].tobytes() for i in range(self.bands)]
+        candidates = {index for band, key in zip(self._buckets, bands) for index in band.get(key, ())}
+        for index in candidates:
+            if np.mean(self._signatures[index] == signature) >= self.threshold:
+                return True
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for band, key in zip(self._buckets, bands):
+            band.setdefault(key, []).append(index)
+        return False
+
+
+def preprocess_document(document: Dict[str, Any], config: ChunkingConfig) -> List[Dict[str, Any]]:
+    """
+    Convert, clean and chunk one document.
+
+    Returns:
+      List[Dict[str, Any]]: ``{"id", "doc_id", "title", "content", "metadata"}``
+      per chunk, ids being ``"<doc id>#<n>"``.
+    """
+    text = document["text"]
+    if document.get("format") == "html":
+        text = html_to_markdown(text)
+    text = strip_boilerplate(text)
+    return [
+        {
+            "id": f"{document['id']}#{index}",
+            "doc_id": document["id"],
+            "title": title,
+            "content": content,
+            "metadata": document.get("metadata", {}),
+        }
+        for index, (title, content) in enumerate(chunk_markdown(text, config.max_tokens, config.min_tokens))
+    ]
+
+
+def iter_chunks(documents: Iterable[Dict[str, Any]], config: Optional[ChunkingConfig] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Preprocess ``documents`` on a process pool and yield their deduplicated chunks in order.
+
+    At most a few documents per worker are in flight, so memory stays bounded
+    however large the corpus is.
+    """
+    config = config or ChunkingConfig()
+    dedup = (
+        MinHashDeduplicator(config.dedup_threshold, config.num_perm, config.bands, config.shingle_size)
+        if config.dedup_threshold is not None
+        else None
+    )
+
+    def unique(chunks: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for chunk in chunks:
+            if dedup is None or not dedup.is_duplicate(dedup.signature(chunk["content"])):
+                yield chunk
+
+    if config.workers == 0:
+        for document in documents:
+            yield from unique(preprocess_document(document, config))
+        return
+
+    window = 4 * (config.workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=config.workers) as executor:
+        pending: Deque[Future] = deque()
+        for document in documents:
+            pending.append(executor.submit(preprocess_document, document, config))
+            if len(pending) >= window:
+                yield from unique(pending.popleft().result())
+        while pending:
+            yield from unique(pending.popleft().result())
+
+
+__all__ = [
+    "ChunkingConfig",
+    "MinHashDeduplicator",
+    "chunk_markdown",
+    "html_to_markdown",
+    "iter_chunks",
+    "preprocess_document",
+    "read_documents",
+    "strip_boilerplate",
+]
@@ -0,0 +1,201 @@
+"""
+Speculative retrieval that overlaps the model's first call of a turn.
+
+Without it a turn runs model -> retrieval -> model strictly in sequence: the
+first model call has to decide to search before any search starts.
+``RetrievalPrefetcher.before_model_callback`` starts each tracked tool's
+retrieval for the user's raw message as that first call goes out. When the
+model then calls the tool, ``take`` hands over the in-flight or finished result
+instead of searching again, provided the model's query asks for the same thing
+as the message: by default the same words once stopwords are ignored, or
+optionally a cosine similarity of their local embeddings above a threshold.
+Results for a different question must not be served, so the default is strict.
+Otherwise the tool
+searches as usual, and the speculative result is dropped when the turn ends,
+or once it is ``ttl`` old for turns that never end normally.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+from . import telemetry
+from .embeddings import Embedder, HashingEmbedder, content_terms
+
+logger = logging.getLogger(__name__)
+
+
+def _called_as_function(tool: Any) -> bool:
+    """
+    Return False for a ``VertexAiRagRetrieval`` that keeps ADK's Gemini 2 routing
+    to built-in retrieval: the model never calls it, so a prefetch would be wasted.
+    """
+    from google.adk.tools.retrieval.vertex_ai_rag_retrieval import VertexAiRagRetrieval
+
+    return not (
+        isinstance(tool, VertexAiRagRetrieval)
+        and type(tool).process_llm_request is VertexAiRagRetrieval.process_llm_request
+    )
+
+
+@dataclass
+class _Prefetch:
+    text: str
+    terms: FrozenSet[str]
+    started: float
+    tasks: Dict[str, "asyncio.Task[Any]"] = field(default_factory=dict)
+    finished: Dict[str, float] = field(default_factory=dict)
+
+
+class RetrievalPrefetcher:
+    """
+    Starts retrieval for each turn's user message ahead of the model's tool call.
+
+    Attributes:
+      similarity_threshold (Optional[float]): Minimum cosine similarity between the
+        model's query and the user's message for the prefetched result to be used.
+        None, the default, requires both to have the same content words instead:
+        hashed-token embeddings rate e.g. "refund policy US customers" close to a
+        question about EU customers.
+      embedder (Embedder): Embeds both for the comparison when ``similarity_threshold`` is set.
+      retrievers (List[Any]): Tools to prefetch for, each with a ``name`` and an
+        async ``retrieve(query)``; see ``track``.
+      max_turns (int): Most turns with prefetches kept; the oldest are dropped first.
+      ttl (float): Seconds after which a turn's unclaimed prefetches are dropped,
+        for turns that fail or are abandoned before ``after_agent_callback``.
+
+    Example usage:
+      ```
+      prefetcher = RetrievalPrefetcher()
+      tool = RagEngineQueryTool(corpus, prefetcher=prefetcher)
+      prefetcher.track([tool])
+      agent = Agent(
+          ...,
+          tools=[tool],
+          before_model_callback=prefetcher.before_model_callback,
+          after_agent_callback=prefetcher.after_agent_callback,
+      )
+      ```
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: Optional[float] = None,
+        embedder: Optional[Embedder] = None,
+        max_turns: int = 1024,
+        ttl: float = 300.0,
+    ) -> None:
+        self.similarity_threshold = similarity_threshold
+        self.embedder: Embedder = embedder or HashingEmbedder()
+        self.retrievers: List[Any] = []
+        self.max_turns = max_turns
+        self.ttl = ttl
+        # Invocation id -> the turn's speculative retrievals.
+        self._turns: Dict[str, _Prefetch] = {}
+        self._lock = threading.Lock()
+
+    def track(self, tools: Iterable[Any]) -> None:
+        """Prefetch for those of ``tools`` that were built with this prefetcher and that the model calls as functions."""
+        self.retrievers = [
+            tool for tool in tools if getattr(tool, "prefetcher", None) is self and _called_as_function(tool)
+        ]
+
+    def start(self, invocation_id: str, text: str) -> None:
+        """Start every tracked retriever on ``text`` for turn ``invocation_id``, unless already started."""
+        with self._lock:
+            if invocation_id in self._turns or not self.retrievers:
+                return
+            prefetch = _Prefetch(text, content_terms(text), time.perf_counter())
+            stale = self._evict_locked(prefetch.started)
+            self._turns[invocation_id] = prefetch
+        for old in stale:
+            self._cancel(old)
+        for retriever in self.retrievers:
+            task = asyncio.ensure_future(retriever.retrieve(text))
+            task.add_done_callback(lambda t, name=retriever.name: self._done(prefetch, name, t))
+            prefetch.tasks[retriever.name] = task
+
+    @staticmethod
+    def _done(prefetch: _Prefetch, name: str, task: "asyncio.Task[Any]") -> None:
+        prefetch.finished[name] = time.perf_counter()
+        if not task.cancelled():
+            # Retrieve the error so that one no tool call claims is not logged as unhandled.
+            task.exception()
+
+    async def take(self, invocation_id: str, tool_name: str, query: str) -> Optional[Any]:
+        """
+        Return the prefetched result of ``tool_name`` for this turn if ``query``
+        matches the prefetched message, waiting for it if it is still running;
+        None when there is no usable result and the tool should retrieve itself.
+
+        A result is handed out once per turn.
+        """
+        with self._lock:
+            prefetch = self._turns.get(invocation_id)
+            task = prefetch.tasks.get(tool_name) if prefetch else None
+            if task is None:
+                return None
+            if not self.matches(query, prefetch):
+                telemetry.record_cache("prefetch", 0, 1)
+                return None
+            del prefetch.tasks[tool_name]
+        asked = time.perf_counter()
+        try:
+            result = await asyncio.shield(task)
+        except Exception as error:
+            logger.debug("Prefetch for %s failed, retrieving again: %s", tool_name, error)
+            telemetry.record_cache("prefetch", 0, 1)
+            return None
+        # The retrieval ran (or had already finished) before the tool asked for it: latency hidden.
+        saved = min(asked, prefetch.finished.get(tool_name, asked)) - prefetch.started
+        telemetry.record_cache("prefetch", 1, 0, saved * 1000)
+        return result
+
+    def matches(self, query: str, prefetch: _Prefetch) -> bool:
+        """Return whether ``query`` asks for what the prefetch was started for."""
+        if self.similarity_threshold is None:
+            return bool(prefetch.terms) and content_terms(query) == prefetch.terms
+        return float(self.embedder(query) @ self.embedder(prefetch.text)) >= self.similarity_threshold
+
+    def _evict_locked(self, now: float) -> List[_Prefetch]:
+        """Remove turns older than ``ttl`` and the oldest beyond ``max_turns - 1``; return them. Called with the lock held."""
+        evicted: List[_Prefetch] = []
+        # Turns are inserted in start order, so the oldest come first.
+        for invocation_id, prefetch in list(self._turns.items()):
+            if now - prefetch.started < self.ttl and len(self._turns) < self.max_turns:
+                break
+            evicted.append(self._turns.pop(invocation_id))
+        return evicted
+
+    @staticmethod
+    def _cancel(prefetch: _Prefetch) -> None:
+        for task in prefetch.tasks.values():
+            task.cancel()
+
+    def finish(self, invocation_id: str) -> None:
+        """Cancel and forget turn ``invocation_id``'s unclaimed prefetches."""
+        with self._lock:
+            prefetch = self._turns.pop(invocation_id, None)
+        if prefetch is not None:
+            self._cancel(prefetch)
+
+    def before_model_callback(self, callback_context: Any, llm_request: Any) -> None:
+        """ADK ``before_model_callback``: start prefetching on the turn's first model call."""
+        content = callback_context.user_content
+        if content is None or not content.parts:
+            return None
+        text = "".join(part.text or "" for part in content.parts).strip()
+        if text:
+            self.start(callback_context.invocation_id, text)
+        return None
+
+    def after_agent_callback(self, callback_context: Any) -> None:
+        """ADK ``after_agent_callback``: drop the turn's unclaimed prefetches."""
+        self.finish(callback_context.invocation_id)
+        return None
+
+
+__all__ = ["RetrievalPrefetcher"]
@@ -1,17 +1,43 @@
 """Load prompts from YAML configuration."""
 
+import functools
 from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict
+
 import yaml
 
 _CONFIG_DIR = Path(__file__).resolve().parent.parent / "config"
 
-with (_CONFIG_DIR / "prompts.yaml").open() as f:
-    _PROMPTS = yaml.safe_load(f) or {}
+
+@functools.cache
+def _load_prompts() -> Dict[str, Any]:
+    """Read prompts.yaml on first use rather than at import."""
+    with (_CONFIG_DIR / "prompts.yaml").open() as f:
+        return yaml.safe_load(f) or {}
+
 
 def get_prompt(name: str) -> str:
     """Retrieve a prompt by name."""
-    prompt = _PROMPTS.get(name)
+    prompt = _load_prompts().get(name)
     assert prompt, f"Prompt '{name}' not found in prompts.yaml"
     return prompt
 
-__all__ = ["get_prompt"]
+
+def prompt_provider(name: str) -> Callable[[Any], Awaitable[str]]:
+    """
+    Return an ADK instruction provider for the prompt ``name``.
+
+    The prompt is read on the agent's first model call instead of when the agent
+    module is imported, and session state is injected into it as ADK does for a
+    plain string instruction.
+    """
+
+    async def provide(context: Any) -> str:
+        from google.adk.utils.instructions_utils import inject_session_state
+
+        return await inject_session_state(get_prompt(name), context)
+
+    return provide
+
+
+__all__ = ["get_prompt", "prompt_provider"]
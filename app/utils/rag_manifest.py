@@ -0,0 +1,100 @@
+"""
+Local record of what has been uploaded to a RAG Engine corpus.
+
+The manifest maps each document's display name to the hash of the content it
+was uploaded with and the resource name of the resulting RAG file. Comparing it
+with the documents on disk tells an ingestion script which files are new,
+changed or gone, so only those are uploaded or deleted.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(path: Path, extra: str = "", chunk_size: int = 1 << 20) -> str:
+    """
+    Hash a file's bytes, plus ``extra`` (e.g. its serialized metadata), with SHA-256.
+
+    The file is read in chunks, so large files are not loaded into memory.
+    """
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    digest.update(b"\0" + extra.encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass
+class ManifestEntry:
+    """
+    One uploaded document.
+
+    Attributes:
+      sha256 (str): Hash of the content the document was uploaded with.
+      rag_file (str): Resource name of the RAG file holding it.
+    """
+
+    sha256: str
+    rag_file: str
+
+
+class RagManifest:
+    """
+    Content hashes and RAG file names of the documents uploaded to one corpus.
+
+    Args:
+      path (Path): JSON file the manifest is loaded from and saved to.
+      corpus (str): Corpus the manifest describes. A manifest saved for another
+        corpus is ignored, so every document counts as new.
+    """
+
+    def __init__(self, path: Path, corpus: str) -> None:
+        self.path = path
+        self.corpus = corpus
+        self.files: Dict[str, ManifestEntry] = {}
+        if path.exists():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("corpus") == corpus:
+                self.files = {name: ManifestEntry(**entry) for name, entry in data.get("files", {}).items()}
+            else:
+                logger.warning("Manifest %s belongs to corpus %s; starting empty", path, data.get("corpus"))
+
+    def diff(self, current: Dict[str, str]) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Compare the manifest with the documents on disk.
+
+        Args:
+          current (Dict[str, str]): Content hash per display name of every local document.
+
+        Returns:
+          Tuple[List[str], List[str], List[str]]: Display names that are new,
+          changed, and removed (in the manifest but no longer on disk).
+        """
+        new = [name for name in current if name not in self.files]
+        changed = [name for name, sha in current.items() if name in self.files and self.files[name].sha256 != sha]
+        removed = [name for name in self.files if name not in current]
+        return new, changed, removed
+
+    def set(self, name: str, sha256: str, rag_file: str) -> None:
+        self.files[name] = ManifestEntry(sha256=sha256, rag_file=rag_file)
+
+    def remove(self, name: str) -> Optional[ManifestEntry]:
+        return self.files.pop(name, None)
+
+    def save(self) -> None:
+        """Write the manifest atomically, so an interrupted run never leaves it half written."""
+        data = {"corpus": self.corpus, "files": {name: asdict(entry) for name, entry in sorted(self.files.items())}}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+__all__ = ["ManifestEntry", "RagManifest", "content_hash"]
@@ -0,0 +1,181 @@
+"""
+Local rerankers applied to retrieved chunks before they reach the model.
+
+Retrieval over-fetches candidates; a reranker rescores them against the query
+on CPU and ``rerank`` keeps only the best ``top_n`` (or a token budget's worth),
+so the model reads fewer, more relevant chunks.
+"""
+
+from typing import Callable, List, Optional, Protocol, Sequence, TypeVar
+
+import numpy as np
+
+from .embeddings import normalize_text
+from .tokens import estimate_tokens
+
+
+T = TypeVar("T")
+
+
+class Reranker(Protocol):
+    """Scores candidate texts against a query; higher is more relevant."""
+
+    def score(self, query: str, texts: Sequence[str]) -> np.ndarray: ...
+
+
+class BM25Reranker:
+    """
+    Okapi BM25 over the candidate set, vectorized with NumPy.
+
+    Term statistics (IDF, average length) come from the candidates themselves, so
+    no corpus-wide index is needed.
+
+    Attributes:
+      k1 (float): Term-frequency saturation.
+      b (float): Length normalization strength.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+
+    def score(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        query_terms = list(dict.fromkeys(normalize_text(query).split()))
+        if not texts or not query_terms:
+            return np.zeros(len(texts), dtype=np.float32)
+        vocabulary = {term: column for column, term in enumerate(query_terms)}
+
+        # Term frequencies of the query terms only: shape (documents, query terms).
+        tf = np.zeros((len(texts), len(query_terms)), dtype=np.float32)
+        lengths = np.empty(len(texts), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = normalize_text(text).split()
+            lengths[row] = len(tokens)
+            for token in tokens:
+                column = vocabulary.get(token)
+                if column is not None:
+                    tf[row, column] += 1
+
+        document_frequency = np.count_nonzero(tf, axis=0)
+        idf = np.log1p((len(texts) - document_frequency + 0.5) / (document_frequency + 0.5))
+        average_length = max(float(lengths.mean()), 1.0)
+        norm = self.k1 * (1 - self.b + self.b * lengths / average_length)
+        saturated = tf * (self.k1 + 1) / (tf + norm[:, None])
+        return saturated @ idf
+
+
+class CrossEncoderReranker:
+    """
+    Batched cross-encoder scoring on CPU with ``sentence-transformers``.
+
+    ``sentence-transformers`` is not a dependency of this project; install it to use
+    this reranker. The model is loaded on first use.
+
+    Attributes:
+      model_name (str): Hugging Face cross-encoder checkpoint.
+      batch_size (int): Query/passage pairs scored per forward pass.
+      max_length (int): Token limit per pair; longer passages are truncated.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        batch_size: int = 32,
+        max_length: int = 512,
+    ) -> None:
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError as exc:
+                raise ImportError(
+                    "CrossEncoderReranker requires sentence-transformers: pip install sentence-transformers"
+                ) from exc
+            self._model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+        return self._model
+
+    def score(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        pairs = [(query, text) for text in texts]
+        return np.asarray(
+            self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False),
+            dtype=np.float32,
+        )
+
+
+def build_reranker(name: Optional[str], **kwargs) -> Optional[Reranker]:
+    """
+    Build a reranker by name.
+
+    Args:
+      name (Optional[str]): ``"bm25"``, ``"cross-encoder"`` or None for no reranking.
+      **kwargs: Passed to the reranker's constructor.
+
+    Raises:
+      ValueError: If ``name`` is not a known reranker.
+    """
+    if name is None:
+        return None
+    if name == "bm25":
+        return BM25Reranker(**kwargs)
+    if name == "cross-encoder":
+        return CrossEncoderReranker(**kwargs)
+    raise ValueError(f"Unknown reranker '{name}'; expected 'bm25' or 'cross-encoder'")
+
+
+def rerank(
+    query: str,
+    items: Sequence[T],
+    text: Callable[[T], str],
+    reranker: Reranker,
+    top_n: Optional[int] = None,
+    token_budget: Optional[int] = None,
+) -> List[T]:
+    """
+    Reorder ``items`` by relevance to ``query`` and keep the best of them.
+
+    Args:
+      query (str): The retrieval query.
+      items (Sequence[T]): Retrieved candidates, e.g. RAG contexts.
+      text (Callable[[T], str]): Returns the text of a candidate.
+      reranker (Reranker): Scores the candidates.
+      top_n (Optional[int]): Keep at most this many candidates.
+      token_budget (Optional[int]): Keep candidates, best first, while their estimated
+        tokens fit in this budget. The best candidate is always kept.
+
+    Returns:
+      List[T]: The kept candidates, most relevant first. Ties keep retrieval order.
+    """
+    if not items:
+        return []
+    texts = [text(item) for item in items]
+    scores = reranker.score(query, texts)
+    order = np.argsort(-scores, kind="stable")
+    if top_n is not None:
+        order = order[:top_n]
+
+    kept: List[T] = []
+    used = 0
+    for index in order:
+        cost = estimate_tokens(texts[index])
+        if token_budget is not None and kept and used + cost > token_budget:
+            break
+        kept.append(items[index])
+        used += cost
+    return kept
+
+
+__all__ = [
+    "BM25Reranker",
+    "CrossEncoderReranker",
+    "Reranker",
+    "build_reranker",
+    "rerank",
+]
@@ -0,0 +1,187 @@
+"""
+Cache for RAG Engine retrieval responses.
+
+Entries are keyed on the normalized query text together with the corpora,
+``similarity_top_k`` and ``vector_distance_threshold`` of the request. An
+optional near-duplicate mode also answers queries whose local embedding lies
+within a cosine-similarity threshold of a cached query with the same parameters.
+
+Entries of a corpus are dropped when it is re-indexed: in the indexing process
+through ``invalidate_corpus``, and in other processes, such as the agent's,
+when the corpus's generation in a shared ``CorpusGenerations`` document changes.
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from . import telemetry
+from .cache import LRUCache
+from .corpus_generation import CorpusGenerations
+from .embeddings import Embedder, HashingEmbedder, NearDuplicateIndex, normalize_text
+
+
+_LIVE_CACHES: "weakref.WeakSet[RetrievalCache]" = weakref.WeakSet()
+
+RetrievalParams = Tuple[Tuple[str, ...], Optional[int], Optional[float]]
+
+
+class RetrievalCache:
+    """
+    LRU/TTL cache of retrieval responses with optional near-duplicate matching.
+
+    Attributes:
+      entries (LRUCache): Cached responses keyed by ``(normalized_query, params)``.
+      similarity_threshold (Optional[float]): Minimum cosine similarity for a
+        near-duplicate hit. None restricts hits to exact normalized matches.
+      embedder (Embedder): Embeds queries for near-duplicate matching.
+      generations (Optional[CorpusGenerations]): Corpus generations bumped by the
+        indexing scripts. A corpus's entries are dropped when its generation changes.
+
+    Example usage:
+      ```
+      cache = RetrievalCache(max_entries=1024, ttl=600, similarity_threshold=0.9)
+      response = cache.get_or_fetch(
+          query, [corpus], 10, 0.6,
+          lambda: rag.retrieval_query(text=query, ...),
+      )
+      ```
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = 600.0,
+        similarity_threshold: Optional[float] = None,
+        embedder: Optional[Embedder] = None,
+        generations: Optional[CorpusGenerations] = None,
+    ) -> None:
+        self.entries = LRUCache(max_entries=max_entries, ttl=ttl)
+        self.generations = generations
+        # Generation per corpus the entries were cached under; None until the first read.
+        self._seen_generations: Optional[Dict[str, str]] = None
+        self._generations_lock = threading.Lock()
+        self.similarity_threshold = similarity_threshold
+        self.embedder: Embedder = embedder or HashingEmbedder()
+        self._index = (
+            NearDuplicateIndex(similarity_threshold, self.embedder) if similarity_threshold is not None else None
+        )
+        _LIVE_CACHES.add(self)
+
+    @staticmethod
+    def params(
+        corpora: Iterable[str],
+        similarity_top_k: Optional[int],
+        vector_distance_threshold: Optional[float],
+    ) -> RetrievalParams:
+        """Return the hashable request parameters that, with the query, identify a response."""
+        return (tuple(sorted(corpora)), similarity_top_k, vector_distance_threshold)
+
+    def get(
+        self,
+        query: str,
+        corpora: Iterable[str],
+        similarity_top_k: Optional[int] = None,
+        vector_distance_threshold: Optional[float] = None,
+    ) -> Optional[Any]:
+        """Return the cached response for an equivalent request, or None."""
+        params = self.params(corpora, similarity_top_k, vector_distance_threshold)
+        normalized = normalize_text(query)
+        response = self.entries.get((normalized, params))
+        if response is not None or self._index is None:
+            return response
+        neighbour = self._index.nearest(params, normalized)
+        if neighbour is None:
+            return None
+        response = self.entries.get((neighbour, params))
+        if response is None:
+            self._index.discard(params, neighbour)
+        return response
+
+    def set(
+        self,
+        query: str,
+        response: Any,
+        corpora: Iterable[str],
+        similarity_top_k: Optional[int] = None,
+        vector_distance_threshold: Optional[float] = None,
+    ) -> None:
+        """Cache ``response`` for the request."""
+        params = self.params(corpora, similarity_top_k, vector_distance_threshold)
+        normalized = normalize_text(query)
+        self.entries.set((normalized, params), response)
+        if self._index is not None:
+            self._index.add(params, normalized)
+            # Keep the near-duplicate index from outgrowing the LRU it points into.
+            self._index.prune(params, 2 * self.entries.max_entries, lambda q: (q, params) in self.entries)
+
+    def _apply_generations(self, generations: Dict[str, str]) -> None:
+        """Drop the entries of every corpus whose generation changed since the last read."""
+        with self._generations_lock:
+            seen, self._seen_generations = self._seen_generations, generations
+        if seen is None:
+            return
+        for corpus in seen.keys() | generations.keys():
+            if seen.get(corpus) != generations.get(corpus):
+                self.invalidate_corpus(corpus)
+
+    def get_or_fetch(
+        self,
+        query: str,
+        corpora: Iterable[str],
+        similarity_top_k: Optional[int],
+        vector_distance_threshold: Optional[float],
+        fetch: Callable[[], Any],
+    ) -> Any:
+        """Return the cached response for the request, calling ``fetch`` and caching its result on a miss."""
+        if self.generations is not None:
+            self._apply_generations(self.generations.current())
+        corpora = list(corpora)
+        response = self.get(query, corpora, similarity_top_k, vector_distance_threshold)
+        telemetry.record_cache("retrieval", int(response is not None), int(response is None))
+        if response is None:
+            response = fetch()
+            self.set(query, response, corpora, similarity_top_k, vector_distance_threshold)
+        return response
+
+    async def get_or_fetch_async(
+        self,
+        query: str,
+        corpora: Iterable[str],
+        similarity_top_k: Optional[int],
+        vector_distance_threshold: Optional[float],
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Asynchronous counterpart of ``get_or_fetch`` for an awaitable ``fetch``."""
+        if self.generations is not None:
+            # Reading the generations may be a GCS request; keep it off the event loop.
+            if self.generations.due():
+                self._apply_generations(await asyncio.to_thread(self.generations.refresh))
+            else:
+                self._apply_generations(self.generations.current())
+        corpora = list(corpora)
+        response = self.get(query, corpora, similarity_top_k, vector_distance_threshold)
+        telemetry.record_cache("retrieval", int(response is not None), int(response is None))
+        if response is None:
+            response = await fetch()
+            self.set(query, response, corpora, similarity_top_k, vector_distance_threshold)
+        return response
+
+    def invalidate_corpus(self, corpus: str) -> int:
+        """Drop every cached response that involves ``corpus`` and return how many were dropped."""
+        if self._index is not None:
+            self._index.drop_groups(lambda params: corpus in params[0])
+        return self.entries.delete_where(lambda key: corpus in key[1][0])
+
+
+def invalidate_corpus(corpus: str) -> None:
+    """
+    Invalidate ``corpus`` in every live ``RetrievalCache`` of this process, e.g.
+    after a re-index. Caches in other processes see ``CorpusGenerations.bump`` instead.
+    """
+    for cache in list(_LIVE_CACHES):
+        cache.invalidate_corpus(corpus)
+
+
+__all__ = ["RetrievalCache", "invalidate_corpus"]
@@ -0,0 +1,129 @@
+"""
+Keep retrieval tools from pasting the same text into a conversation twice.
+
+In a multi-turn conversation the model tends to search again with near
+identical queries, and every result it gets back stays in the context for the
+rest of the session. ``SessionDeduplicator`` records in the session state the
+sentences a session has actually been given. Later results carry only the
+sentences the model has not seen yet, and a short reference for each chunk it
+has already seen in full.
+
+Sentences rather than whole chunks are remembered because a ``ContextPacker``
+may have trimmed a chunk to the sentences matching the query: the rest of the
+chunk was never shown and must stay available to later queries.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, MutableMapping, Optional, Sequence, Tuple
+
+from .context_packing import ContextPacker
+from .embeddings import normalize_text
+
+
+def sentence_fingerprints(document: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """
+    Return ``(sentence, fingerprint)`` for every sentence of a chunk. The
+    fingerprint is the chunk's ``id``, or else its source, and a hash of the
+    normalized sentence, since one source file yields many chunks.
+    """
+    origin = document.get("id") or document.get("source_uri") or document.get("title") or ""
+    fingerprints = []
+    for sentence in ContextPacker.sentences(document.get("content") or ""):
+        digest = hashlib.sha1(normalize_text(sentence).encode("utf-8")).hexdigest()[:16]
+        fingerprints.append((sentence, f"{origin}#{digest}"))
+    return fingerprints
+
+
+@dataclass
+class SessionDeduplicator:
+    """
+    Remember the text returned in a session and leave it out of later results.
+
+    Attributes:
+      state_key (str): Session state key holding ``{fingerprint: citation}`` of the
+        sentences returned so far.
+      max_remembered (int): Most sentences remembered per session; the oldest are
+        forgotten first, which bounds the state and lets long-gone text return.
+    """
+
+    state_key: str = "retrieval_seen_sentences"
+    max_remembered: int = 2000
+
+    def split(
+        self, state: MutableMapping[str, Any], documents: Sequence[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Return the documents with text the session has not seen, cut down to
+        that text, and one reference per source of the documents seen in full.
+        """
+        seen: Dict[str, str] = state.get(self.state_key) or {}
+        new: List[Dict[str, Any]] = []
+        references: List[Dict[str, Any]] = []
+        referenced = set()
+        for document in documents:
+            fingerprints = sentence_fingerprints(document)
+            unseen = [sentence for sentence, fingerprint in fingerprints if fingerprint not in seen]
+            if unseen and len(unseen) == len(fingerprints):
+                new.append(document)
+            elif unseen:
+                new.append({**document, "content": " ".join(unseen)})
+            elif fingerprints:
+                source = seen[fingerprints[0][1]]
+                if source not in referenced:
+                    referenced.add(source)
+                    references.append({"source": source, "already_provided": True})
+        return new, references
+
+    def remember(
+        self,
+        state: MutableMapping[str, Any],
+        documents: Sequence[Dict[str, Any]],
+        texts: Optional[Sequence[str]] = None,
+    ) -> None:
+        """
+        Record ``documents`` as returned in the session. With ``texts``, the text
+        emitted for each document, only the sentences that made it into that text
+        are recorded.
+        """
+        if not documents:
+            return
+        seen = dict(state.get(self.state_key) or {})
+        for position, document in enumerate(documents):
+            source = ContextPacker.source(document)
+            for sentence, fingerprint in sentence_fingerprints(document):
+                if texts is not None and sentence not in texts[position]:
+                    continue
+                seen.pop(fingerprint, None)
+                seen[fingerprint] = source
+        if len(seen) > self.max_remembered:
+            seen = dict(list(seen.items())[-self.max_remembered :])
+        # Assign rather than mutate, so the session service records the change.
+        state[self.state_key] = seen
+
+    def present(
+        self,
+        query: str,
+        documents: Sequence[Dict[str, Any]],
+        state: MutableMapping[str, Any],
+        packer: Optional[ContextPacker] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Build a tool result from ranked ``documents``: their unseen text, packed
+        with ``packer`` if given, followed by references to the seen ones.
+
+        Only text that makes it into the result is remembered, so a document or
+        sentence the packer dropped can still be returned later.
+        """
+        new, references = self.split(state, documents)
+        if packer is None:
+            self.remember(state, new)
+            result = list(new)
+        else:
+            packed = packer.pack_indexed(query, new)
+            self.remember(state, [new[index] for index, _ in packed], [item["text"] for _, item in packed])
+            result = [item for _, item in packed]
+        return result + references
+
+
+__all__ = ["SessionDeduplicator", "sentence_fingerprints"]
@@ -0,0 +1,189 @@
+"""
+Request coalescing for identical concurrent backend calls.
+
+During a traffic spike many sessions send the same query at the same moment,
+and each would become its own backend call. ``SingleFlight`` lets the first
+caller for a key run the call while later callers with the same key wait for
+its outcome: they all get the same result or the same exception. Nothing is
+kept once the call completes, so a request made after that goes to the
+backend again; repeated requests over time are the caches' job.
+
+The key must describe the whole request. ``request_key`` builds one from call
+arguments, including lists, dicts, dataclasses and unhashable messages.
+"""
+
+import asyncio
+import dataclasses
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+from . import telemetry
+
+T = TypeVar("T")
+
+
+def _freeze(value: Any) -> Hashable:
+    """Return a hashable value that is equal for equal request arguments."""
+    if value is None or isinstance(value, (str, bytes, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted(((repr(k), _freeze(v)) for k, v in value.items()), key=lambda item: item[0]))
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        fields = tuple((field.name, _freeze(getattr(value, field.name))) for field in dataclasses.fields(value))
+        return (type(value).__qualname__, fields)
+    try:
+        hash(value)
+    except TypeError:
+        # e.g. proto messages, which compare by value but are unhashable; their repr lists every set field.
+        return (type(value).__qualname__, repr(value))
+    return value
+
+
+def request_key(*args: Any, **kwargs: Any) -> Hashable:
+    """Return a hashable key identifying a call with these arguments."""
+    return (_freeze(args), tuple(sorted((name, _freeze(value)) for name, value in kwargs.items())))
+
+
+@dataclass
+class FlightStats:
+    """
+    Counters describing how much coalescing happens.
+
+    Attributes:
+      calls (int): Calls that went to the backend.
+      shared (int): Calls that waited for an identical call in flight instead.
+    """
+
+    calls: int = 0
+    shared: int = 0
+
+    @property
+    def shared_ratio(self) -> float:
+        """Return the share of requests served by another caller's call."""
+        requests = self.calls + self.shared
+        return self.shared / requests if requests else 0.0
+
+
+@dataclass
+class _AsyncFlight:
+    task: "asyncio.Task[Any]"
+    waiters: int = 0
+
+
+class SingleFlight:
+    """
+    Share one in-flight call among concurrent callers with the same key.
+
+    Blocking calls made with ``do`` are coalesced across threads, and coroutines
+    run with ``do_async`` across the tasks of an event loop. The two paths never
+    share a call.
+
+    When the call fails, every caller waiting for it gets the exception. An
+    async caller that is cancelled stops waiting without disturbing the others;
+    the shared call itself is cancelled only once no caller waits for it.
+
+    Attributes:
+      name (str): Label of the coalesced calls in telemetry.
+      stats (FlightStats): Calls made and calls shared.
+
+    Example usage:
+      ```
+      flights = SingleFlight("rag.retrieval_query")
+      key = request_key(text=query, rag_resources=resources, similarity_top_k=10)
+      response = await flights.do_async(key, lambda: caller.call(rag.retrieval_query, ...))
+      ```
+    """
+
+    def __init__(self, name: str = "backend") -> None:
+        self.name = name
+        self.stats = FlightStats()
+        self._calls: Dict[Hashable, Future] = {}
+        self._async_calls: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], _AsyncFlight] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, shared: bool) -> None:
+        with self._lock:
+            if shared:
+                self.stats.shared += 1
+            else:
+                self.stats.calls += 1
+        telemetry.record_cache(f"single_flight.{self.name}", int(shared), int(not shared))
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """
+        Return ``fn()``, or the outcome of an identical call already running on another thread.
+
+        Raises:
+          Exception: Whatever ``fn`` raised, in the caller that ran it and in every caller that waited for it.
+        """
+        with self._lock:
+            flight = self._calls.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._calls[key] = Future()
+        self._count(shared=not leader)
+        if not leader:
+            return flight.result()
+        try:
+            result = fn()
+        except BaseException as error:
+            self._land(key, flight)
+            flight.set_exception(error)
+            raise
+        self._land(key, flight)
+        flight.set_result(result)
+        return result
+
+    def _land(self, key: Hashable, flight: Future) -> None:
+        # Forget the call before publishing its outcome, so later requests start a new one.
+        with self._lock:
+            if self._calls.get(key) is flight:
+                del self._calls[key]
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await ``fn()``, or an identical call already in flight on this event loop.
+
+        Raises:
+          asyncio.CancelledError: If this caller was cancelled, or the shared call was.
+          Exception: Whatever ``fn()`` raised, in every caller waiting for it.
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        with self._lock:
+            flight = self._async_calls.get(flight_key)
+            shared = flight is not None
+            if not shared:
+                flight = _AsyncFlight(loop.create_task(fn()))
+                self._async_calls[flight_key] = flight
+                flight.task.add_done_callback(lambda task: self._land_async(flight_key, flight))
+            flight.waiters += 1
+        self._count(shared)
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            with self._lock:
+                flight.waiters -= 1
+                abandoned = flight.waiters == 0 and not flight.task.done()
+                if abandoned and self._async_calls.get(flight_key) is flight:
+                    del self._async_calls[flight_key]
+            if abandoned:
+                # Every caller was cancelled; nobody is left to use the result.
+                flight.task.cancel()
+
+    def _land_async(self, flight_key: Tuple[asyncio.AbstractEventLoop, Hashable], flight: _AsyncFlight) -> None:
+        with self._lock:
+            if self._async_calls.get(flight_key) is flight:
+                del self._async_calls[flight_key]
+        if not flight.task.cancelled():
+            # Retrieve the error so that a call whose callers all left is not logged as unhandled.
+            flight.task.exception()
+
+
+__all__ = ["FlightStats", "SingleFlight", "request_key"]
@@ -0,0 +1,317 @@
+"""
+Per-stage latency and volume instrumentation for retrieval and indexing.
+
+Instrumentation is off until ``configure(enabled=True)``. While off, ``stage``
+returns a shared no-op object and ``record_cache`` returns at once, so the
+instrumented code pays one flag check per stage; OpenTelemetry is not even
+imported. The no-op stage is falsy, so callers can skip computing costly
+attributes with ``if stage: stage.set(...)``.
+
+When on, every stage becomes an OpenTelemetry span, exported wherever the
+process's tracer provider sends spans (e.g. Cloud Trace when the ``AdkApp`` is
+deployed with tracing), and feeds these instruments:
+
+- ``rag.stage.duration`` (histogram, ms), by ``stage``
+- ``rag.stage.results`` (histogram), by ``stage``: results, entities or files handled
+- ``rag.stage.payload_bytes`` (histogram), by ``stage``
+- ``rag.cache.lookups`` (counter), by ``cache`` and ``hit``
+- ``rag.cache.saved_duration`` (histogram, ms), by ``cache``: work a hit skipped
+
+Stages finished inside a ``turn`` (an agent invocation, or one indexing run) are
+also collected locally; when the turn ends a one-line breakdown is logged and,
+with ``breakdown_path`` set, appended to that file as a JSON line.
+"""
+
+import contextvars
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+_enabled = False
+_breakdown_path: Optional[Path] = None
+_tracer: Any = None
+_instruments: Dict[str, Any] = {}
+_turn: contextvars.ContextVar[Optional["Turn"]] = contextvars.ContextVar("telemetry_turn", default=None)
+
+
+def configure(enabled: bool = True, breakdown_path: Optional[Union[str, Path]] = None) -> None:
+    """
+    Turn instrumentation on or off.
+
+    Args:
+      enabled (bool): Record spans, metrics and turn breakdowns.
+      breakdown_path (Optional[Union[str, Path]]): JSON lines file each finished
+        turn's breakdown is appended to. None only logs it.
+    """
+    global _enabled, _breakdown_path, _tracer
+    if enabled and _tracer is None:
+        from opentelemetry import metrics, trace
+
+        _tracer = trace.get_tracer(__name__)
+        meter = metrics.get_meter(__name__)
+        _instruments.update(
+            duration=meter.create_histogram("rag.stage.duration", unit="ms", description="Stage latency"),
+            results=meter.create_histogram("rag.stage.results", description="Results handled by a stage"),
+            payload_bytes=meter.create_histogram("rag.stage.payload_bytes", unit="By", description="Bytes handled by a stage"),
+            cache=meter.create_counter("rag.cache.lookups", description="Cache lookups by outcome"),
+            saved=meter.create_histogram("rag.cache.saved_duration", unit="ms", description="Latency saved by a cache hit"),
+        )
+    _enabled = enabled
+    _breakdown_path = Path(breakdown_path) if breakdown_path else None
+
+
+def enabled() -> bool:
+    """Return whether instrumentation is on."""
+    return _enabled
+
+
+class _NoopStage:
+    """Stand-in returned by ``stage`` while instrumentation is off."""
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __enter__(self) -> "_NoopStage":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
+        return False
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+class Stage:
+    """
+    One timed stage: an OpenTelemetry span plus its duration and volume metrics.
+
+    Use it as a context manager to make it the parent of stages started inside
+    it, or call ``end`` for a stage timed from an explicit ``start``.
+
+    Attributes:
+      name (str): Stage name, e.g. ``"datastore.search_page"``.
+      attributes (Dict[str, Any]): Span attributes. ``results`` and
+        ``payload_bytes`` also feed their histograms.
+    """
+
+    def __init__(self, name: str, attributes: Dict[str, Any], start: Optional[float] = None) -> None:
+        self.name = name
+        self.attributes = attributes
+        self._start = time.perf_counter() if start is None else start
+        start_ns = time.time_ns() - int((time.perf_counter() - self._start) * 1e9)
+        self._span = _tracer.start_span(name, start_time=start_ns)
+        self._token: Optional[Any] = None
+
+    def __bool__(self) -> bool:
+        return True
+
+    def __enter__(self) -> "Stage":
+        from opentelemetry import context, trace
+
+        self._token = context.attach(trace.set_span_in_context(self._span))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
+        if exc_val is not None:
+            self._span.record_exception(exc_val)
+            self.attributes["error"] = type(exc_val).__name__
+        if self._token is not None:
+            from opentelemetry import context
+
+            context.detach(self._token)
+        self.end()
+        return False
+
+    def set(self, **attributes: Any) -> None:
+        """Add attributes, e.g. ``results`` or ``payload_bytes`` once they are known."""
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        """Finish the stage and record it."""
+        duration_ms = (time.perf_counter() - self._start) * 1000
+        labels = {"stage": self.name}
+        self._span.set_attributes(self.attributes)
+        self._span.end()
+        _instruments["duration"].record(duration_ms, labels)
+        for key in ("results", "payload_bytes"):
+            if key in self.attributes:
+                _instruments[key].record(self.attributes[key], labels)
+        turn = _turn.get()
+        if turn is not None:
+            turn.add(self.name, duration_ms, self.attributes)
+
+
+def stage(name: str, start: Optional[float] = None, **attributes: Any) -> Union[Stage, _NoopStage]:
+    """
+    Start timing stage ``name``.
+
+    Args:
+      name (str): Stage name.
+      start (Optional[float]): ``time.perf_counter()`` value the stage began at,
+        for work that was already under way. Defaults to now.
+      **attributes: Initial span attributes.
+
+    Returns:
+      Union[Stage, _NoopStage]: A ``Stage``, or a falsy no-op while instrumentation is off.
+    """
+    if not _enabled:
+        return _NOOP_STAGE
+    return Stage(name, attributes, start)
+
+
+def record_cache(cache: str, hits: int, misses: int, saved_ms: float = 0.0) -> None:
+    """Count ``hits`` and ``misses`` of ``cache`` towards its hit ratio, and the ``saved_ms`` the hits skipped."""
+    if not _enabled:
+        return
+    if hits:
+        _instruments["cache"].add(hits, {"cache": cache, "hit": True})
+    if misses:
+        _instruments["cache"].add(misses, {"cache": cache, "hit": False})
+    if saved_ms:
+        _instruments["saved"].record(saved_ms, {"cache": cache})
+    turn = _turn.get()
+    if turn is not None:
+        turn.add_cache(cache, hits, misses, saved_ms)
+
+
+class Turn:
+    """
+    Stages and cache lookups collected during one turn, for the local breakdown.
+
+    Stages may finish on worker threads that inherited the turn's context, so
+    updates are locked.
+
+    Attributes:
+      name (str): Turn label, e.g. the ADK invocation id.
+      stages (Dict[str, Dict[str, float]]): Per stage name: ``count``, ``total_ms``,
+        ``max_ms`` and summed ``results`` and ``payload_bytes``.
+      caches (Dict[str, Dict[str, float]]): Per cache name: ``hits``, ``misses``
+        and, once a hit reported it, ``saved_ms``.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.caches: Dict[str, Dict[str, float]] = {}
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        # Restores the enclosing turn, if any, when this one ends.
+        self._token: Optional[contextvars.Token] = None
+
+    def add(self, name: str, duration_ms: float, attributes: Dict[str, Any]) -> None:
+        with self._lock:
+            totals = self.stages.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            totals["count"] += 1
+            totals["total_ms"] += duration_ms
+            totals["max_ms"] = max(totals["max_ms"], duration_ms)
+            for key in ("results", "payload_bytes"):
+                if key in attributes:
+                    totals[key] = totals.get(key, 0) + attributes[key]
+
+    def add_cache(self, cache: str, hits: int, misses: int, saved_ms: float = 0.0) -> None:
+        with self._lock:
+            counts = self.caches.setdefault(cache, {"hits": 0, "misses": 0})
+            counts["hits"] += hits
+            counts["misses"] += misses
+            if saved_ms:
+                counts["saved_ms"] = counts.get("saved_ms", 0.0) + saved_ms
+
+    def breakdown(self) -> Dict[str, Any]:
+        """Return the turn as a JSON-serializable dict."""
+        with self._lock:
+            return {
+                "turn": self.name,
+                "total_ms": round((time.perf_counter() - self._start) * 1000, 3),
+                "stages": {
+                    name: {key: round(value, 3) for key, value in totals.items()}
+                    for name, totals in self.stages.items()
+                },
+                "caches": {
+                    name: {**counts, "hit_ratio": counts["hits"] / max(1, counts["hits"] + counts["misses"])}
+                    for name, counts in self.caches.items()
+                },
+            }
+
+
+def in_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wrap ``fn`` to run in a copy of the caller's context, so stages it records on
+    a worker thread join the caller's trace and turn.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+def start_turn(name: str) -> Optional[Turn]:
+    """Start collecting the stages of turn ``name`` in the current context; None while off."""
+    if not _enabled:
+        return None
+    turn = Turn(name)
+    turn._token = _turn.set(turn)
+    return turn
+
+
+def end_turn() -> Optional[Dict[str, Any]]:
+    """
+    Stop collecting the current turn, log and export its breakdown, and return it.
+    A turn that enclosed it becomes current again.
+    """
+    turn = _turn.get()
+    if turn is None:
+        return None
+    try:
+        _turn.reset(turn._token)
+    except ValueError:
+        # Ended in another context than it started in, e.g. a copy: restore by value.
+        previous = turn._token.old_value
+        _turn.set(None if previous is contextvars.Token.MISSING else previous)
+    breakdown = turn.breakdown()
+    logger.info(
+        "turn %s %.0fms: %s",
+        turn.name,
+        breakdown["total_ms"],
+        ", ".join(
+            f"{name} {totals['total_ms']:.0f}ms x{int(totals['count'])}"
+            for name, totals in sorted(breakdown["stages"].items(), key=lambda item: -item[1]["total_ms"])
+        ),
+    )
+    if _breakdown_path is not None:
+        with _breakdown_path.open("a") as f:
+            f.write(json.dumps(breakdown) + "\n")
+    return breakdown
+
+
+def start_turn_callback(callback_context: Any) -> None:
+    """ADK ``before_agent_callback`` that starts a turn per agent invocation."""
+    start_turn(callback_context.invocation_id)
+
+
+def end_turn_callback(callback_context: Any) -> None:
+    """ADK ``after_agent_callback`` that ends the turn started by ``start_turn_callback``."""
+    end_turn()
+
+
+__all__ = [
+    "Stage",
+    "Turn",
+    "configure",
+    "enabled",
+    "end_turn",
+    "in_context",
+    "end_turn_callback",
+    "record_cache",
+    "stage",
+    "start_turn",
+    "start_turn_callback",
+]
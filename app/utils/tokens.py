@@ -0,0 +1,14 @@
+"""Cheap token-count estimates for budgeting what goes into the model context."""
+
+import math
+
+# Gemini tokenizers average roughly four characters of English text per token.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate how many model tokens ``text`` costs, without calling a tokenizer."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+__all__ = ["CHARS_PER_TOKEN", "estimate_tokens"]
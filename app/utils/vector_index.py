@@ -0,0 +1,287 @@
+"""
+Local approximate nearest-neighbour index over chunk embeddings.
+
+The index is an inverted file (IVF): vectors are clustered with spherical
+k-means, and a query only scores the vectors of its ``nprobe`` closest
+clusters. Everything lives in one directory and is memory-mapped on open, so a
+million-chunk index starts instantly and shares pages between processes:
+
+- ``meta.json``: dimensions, counts and the signature of the embedder that
+  built the index, which queries must be embedded with,
+- ``centroids.npy``: one unit vector per cluster,
+- ``vectors.npy``: unit-length embeddings, grouped by cluster,
+- ``offsets.npy``: where each cluster's rows start in ``vectors.npy``,
+- ``documents.jsonl`` and ``document_offsets.npy``: the documents, row-aligned.
+
+``VectorIndexBuilder`` streams documents in, embedding them in batches, and
+writes the directory; ``VectorIndex`` answers top-k queries.
+"""
+
+import json
+import math
+import mmap
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .embeddings import Embedder, embedder_signature
+
+
+def _embed_batch(embedder: Embedder, texts: List[str]) -> np.ndarray:
+    embed_many = getattr(embedder, "embed_many", None)
+    if embed_many is not None:
+        return np.asarray(embed_many(texts), dtype=np.float32)
+    return np.vstack([embedder(text) for text in texts]).astype(np.float32)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _spherical_kmeans(sample: np.ndarray, nlist: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity and return unit centroids."""
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        empty = ~sums.any(axis=1)
+        # Re-seed empty clusters with random sample points.
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+        centroids = _normalize_rows(sums)
+    return centroids
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+    assignment = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), batch_size):
+        block = np.asarray(vectors[start : start + batch_size])
+        assignment[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignment
+
+
+class VectorIndex:
+    """
+    Memory-mapped IVF index opened from a directory written by ``VectorIndexBuilder``.
+
+    Attributes:
+      path (Path): Index directory.
+      dim (int): Embedding dimensions.
+      nprobe (int): Clusters scored per query unless ``search`` is told otherwise.
+      meta (Dict[str, Any]): Contents of ``meta.json``.
+    """
+
+    def __init__(self, path: Path, nprobe: int = 16) -> None:
+        self.path = Path(path)
+        self.meta: Dict[str, Any] = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        self.dim = int(self.meta["dim"])
+        self.nprobe = nprobe
+        self.centroids = np.load(self.path / "centroids.npy")
+        self.offsets = np.load(self.path / "offsets.npy")
+        self.vectors = np.load(self.path / "vectors.npy", mmap_mode="r")
+        self._document_offsets = np.load(self.path / "document_offsets.npy", mmap_mode="r")
+        self._documents_file = (self.path / "documents.jsonl").open("rb")
+        size = os.fstat(self._documents_file.fileno()).st_size
+        self._documents = mmap.mmap(self._documents_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    @property
+    def embedder(self) -> str:
+        """Return the signature of the embedder that built the index."""
+        recorded = self.meta.get("embedder", "")
+        if recorded == "HashingEmbedder":
+            # Indexes written before signatures were recorded; the scripts only ever set ``dim``.
+            return f"HashingEmbedder(dim={self.dim}, char_ngram=3)"
+        return recorded
+
+    def search(self, query: np.ndarray, k: int = 5, nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Find the rows most similar to ``query``.
+
+        Args:
+          query (np.ndarray): Query embedding; normalized here if it is not unit length.
+          k (int): Number of results.
+          nprobe (Optional[int]): Clusters to score; defaults to ``self.nprobe``.
+
+        Returns:
+          List[Tuple[int, float]]: ``(row, cosine similarity)`` pairs, best first.
+        """
+        if len(self) == 0:
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        if query.shape != (self.dim,):
+            raise ValueError(f"Query has shape {query.shape}; the index expects ({self.dim},)")
+        norm = float(np.linalg.norm(query))
+        if norm:
+            query = query / norm
+
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe] if nprobe < len(self.centroids) else np.arange(len(self.centroids))
+
+        rows: List[np.ndarray] = []
+        scores: List[np.ndarray] = []
+        for cluster in probe:
+            start, end = int(self.offsets[cluster]), int(self.offsets[cluster + 1])
+            if start == end:
+                continue
+            rows.append(np.arange(start, end))
+            scores.append(self.vectors[start:end] @ query)
+        if not rows:
+            return []
+        all_rows = np.concatenate(rows)
+        all_scores = np.concatenate(scores)
+        k = min(k, len(all_scores))
+        top = np.argpartition(-all_scores, k - 1)[:k]
+        top = top[np.argsort(-all_scores[top], kind="stable")]
+        return [(int(all_rows[i]), float(all_scores[i])) for i in top]
+
+    def document(self, row: int) -> Dict[str, Any]:
+        """Return the document stored for ``row``."""
+        start, end = int(self._document_offsets[row]), int(self._document_offsets[row + 1])
+        return json.loads(self._documents[start:end])
+
+    def close(self) -> None:
+        if isinstance(self._documents, mmap.mmap):
+            self._documents.close()
+        self._documents_file.close()
+
+
+class VectorIndexBuilder:
+    """
+    Stream documents into a new ``VectorIndex`` directory.
+
+    Documents are embedded ``batch_size`` at a time and spooled to disk, so memory
+    use does not grow with the corpus until ``build`` clusters a sample of it.
+
+    Args:
+      path (Path): Directory to write; replaced if it exists.
+      embedder (Embedder): Embeds the ``content`` of each document. Queries must
+        later be embedded with the same embedder.
+      batch_size (int): Documents embedded per call.
+    """
+
+    def __init__(self, path: Path, embedder: Embedder, batch_size: int = 256) -> None:
+        self.path = Path(path)
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.count = 0
+        self.dim: Optional[int] = None
+        self._staging = self.path.with_name(self.path.name + ".building")
+        shutil.rmtree(self._staging, ignore_errors=True)
+        self._staging.mkdir(parents=True)
+        self._raw = (self._staging / "vectors.raw").open("wb")
+        self._docs = (self._staging / "documents.raw.jsonl").open("wb")
+        self._pending: List[Dict[str, Any]] = []
+
+    def add(self, document: Dict[str, Any]) -> None:
+        """Queue ``document`` (``content`` plus fields such as ``title`` and ``source_uri``) for indexing."""
+        self._pending.append(document)
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+
+    def tap(self, documents: Iterable[Dict[str, Any]], to_document=lambda item: item) -> Iterator[Dict[str, Any]]:
+        """Yield ``documents`` unchanged while adding ``to_document(item)`` of each to the index."""
+        for item in documents:
+            self.add(to_document(item))
+            yield item
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        vectors = _normalize_rows(_embed_batch(self.embedder, [d.get("content") or "" for d in self._pending]))
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        self._raw.write(vectors.astype(np.float32).tobytes())
+        for document in self._pending:
+            self._docs.write(json.dumps(document, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.count += len(self._pending)
+        self._pending = []
+
+    def build(
+        self,
+        nlist: Optional[int] = None,
+        iterations: int = 10,
+        sample_size: Optional[int] = None,
+        seed: int = 0,
+        nprobe: int = 16,
+    ) -> VectorIndex:
+        """
+        Cluster the spooled vectors, write the index directory and open it.
+
+        Args:
+          nlist (Optional[int]): Number of clusters; defaults to ``4 * sqrt(count)``.
+            More, smaller clusters mean fewer vectors read per probe, which is
+            what bounds query latency once the index outgrows the CPU caches.
+          iterations (int): k-means iterations.
+          sample_size (Optional[int]): Vectors k-means is trained on; defaults to
+            40 per cluster, at least 100,000.
+          seed (int): Seed for sampling and initialization.
+          nprobe (int): Default ``nprobe`` of the returned index.
+        """
+        self._flush()
+        self._raw.close()
+        self._docs.close()
+        dim = self.dim or 1
+        raw = (
+            np.memmap(self._staging / "vectors.raw", dtype=np.float32, mode="r", shape=(self.count, dim))
+            if self.count
+            else np.zeros((0, dim), dtype=np.float32)
+        )
+
+        rng = np.random.default_rng(seed)
+        nlist = max(1, min(nlist or int(4 * math.sqrt(self.count)), self.count or 1))
+        sample_size = sample_size or max(100_000, 40 * nlist)
+        if self.count:
+            sample_rows = np.sort(rng.choice(self.count, min(sample_size, self.count), replace=False))
+            centroids = _spherical_kmeans(np.asarray(raw[sample_rows]), nlist, iterations, rng)
+            assignment = _assign(raw, centroids)
+        else:
+            centroids = np.zeros((nlist, dim), dtype=np.float32)
+            assignment = np.zeros(0, dtype=np.int32)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assignment, minlength=nlist))
+
+        vectors = np.lib.format.open_memmap(self._staging / "vectors.npy", mode="w+", dtype=np.float32, shape=(self.count, dim))
+        for start in range(0, self.count, 65536):
+            vectors[start : start + 65536] = raw[order[start : start + 65536]]
+        vectors.flush()
+        del vectors, raw
+        self._write_documents(order)
+
+        np.save(self._staging / "centroids.npy", centroids.astype(np.float32))
+        np.save(self._staging / "offsets.npy", offsets)
+        meta = {"dim": dim, "count": self.count, "nlist": nlist, "embedder": embedder_signature(self.embedder)}
+        (self._staging / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        (self._staging / "vectors.raw").unlink()
+        (self._staging / "documents.raw.jsonl").unlink()
+
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self._staging, self.path)
+        return VectorIndex(self.path, nprobe=nprobe)
+
+    def _write_documents(self, order: np.ndarray) -> None:
+        """Rewrite the spooled documents in cluster order, recording byte offsets."""
+        source_offsets = np.zeros(self.count + 1, dtype=np.int64)
+        with (self._staging / "documents.raw.jsonl").open("rb") as f:
+            for row, line in enumerate(f):
+                source_offsets[row + 1] = source_offsets[row] + len(line)
+        offsets = np.zeros(self.count + 1, dtype=np.int64)
+        with (self._staging / "documents.raw.jsonl").open("rb") as src, (self._staging / "documents.jsonl").open("wb") as dst:
+            for new_row, old_row in enumerate(order):
+                src.seek(int(source_offsets[old_row]))
+                line = src.read(int(source_offsets[old_row + 1] - source_offsets[old_row]))
+                dst.write(line)
+                offsets[new_row + 1] = offsets[new_row] + len(line)
+        np.save(self._staging / "document_offsets.npy", offsets)
+
+
+__all__ = ["VectorIndex", "VectorIndexBuilder"]
@@ -0,0 +1 @@
+"""Local benchmarks for the retrieval tools, run against in-process fake backends."""
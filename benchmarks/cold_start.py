@@ -0,0 +1,183 @@
+"""Cold-start benchmark: how long a fresh interpreter takes to import the agent.
+
+Each run imports ``--module`` (``app.agent`` by default) in a new Python
+process, as an Agent Engine replica or ``adk web`` does on startup, and times
+it. The import tree of the last run comes from ``python -X importtime``: every
+module whose cumulative import time reaches ``--min-ms`` is listed under the
+module that first imported it, so a regression can be traced to the import
+that caused it. Nothing connects to Google Cloud: tools build their clients on
+first use.
+
+With ``--output`` the median and the cumulative time per module are written as
+JSON; with ``--baseline`` the run is compared to such a file, listing the
+modules that got slower or newly appeared, and exits non-zero when the median
+regressed by more than ``--tolerance``.
+
+Usage:
+  python -m benchmarks.cold_start --runs 10 --min-ms 50
+  python -m benchmarks.cold_start --output cold_start.json
+  python -m benchmarks.cold_start --baseline cold_start.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+@dataclass
+class ImportNode:
+    """
+    One module in an ``-X importtime`` report.
+
+    Attributes:
+      name (str): Module name.
+      self_us (int): Time spent in the module itself, in microseconds.
+      cumulative_us (int): Time including the modules it imported first.
+      children (List[ImportNode]): Modules first imported while importing it, in import order.
+    """
+
+    name: str
+    self_us: int
+    cumulative_us: int
+    children: List["ImportNode"] = field(default_factory=list)
+
+
+def import_once(module: str) -> Tuple[float, str]:
+    """Import ``module`` in a fresh interpreter; return the wall time and the ``-X importtime`` report."""
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        sys.exit(completed.stderr)
+    return elapsed, completed.stderr
+
+
+def import_tree(report: str) -> List[ImportNode]:
+    """
+    Parse an ``-X importtime`` report into the trees of its top-level imports.
+
+    The report lists a module after the modules it imported, indented one level
+    less than them, so children are collected until their parent's line appears.
+    """
+    pending: List[Tuple[int, ImportNode]] = []
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        node = ImportNode(name.strip(), int(self_us), int(cumulative_us))
+        while pending and pending[-1][0] > depth:
+            node.children.insert(0, pending.pop()[1])
+        pending.append((depth, node))
+    return [node for _, node in pending]
+
+
+def walk(nodes: List[ImportNode], depth: int = 0) -> Iterator[Tuple[int, ImportNode]]:
+    """Yield ``(depth, node)`` for every module of the trees, parents first."""
+    for node in nodes:
+        yield depth, node
+        yield from walk(node.children, depth + 1)
+
+
+def slowest_imports(report: str, min_ms: float) -> List[Tuple[int, ImportNode]]:
+    """Return ``(depth, node)`` for every module whose cumulative import time is at least ``min_ms``, in tree order."""
+    threshold = min_ms * 1000
+    selected: List[Tuple[int, ImportNode]] = []
+
+    def visit(nodes: List[ImportNode], depth: int) -> None:
+        for node in nodes:
+            if node.cumulative_us >= threshold:
+                selected.append((depth, node))
+                visit(node.children, depth + 1)
+
+    visit(import_tree(report), 0)
+    return selected
+
+
+def module_times(report: str) -> Dict[str, float]:
+    """Return the cumulative import time of every module in ``report``, in milliseconds."""
+    return {node.name: node.cumulative_us / 1000 for _, node in walk(import_tree(report))}
+
+
+def compare(
+    baseline: Dict[str, object], current: Dict[str, object], tolerance: float, min_ms: float
+) -> Tuple[Optional[str], List[str]]:
+    """
+    Compare two runs.
+
+    Returns:
+      Tuple[Optional[str], List[str]]: A line if the median regressed by more than
+      ``tolerance`` (a fraction), and a line per module of at least ``min_ms``
+      that is new or grew by more than ``tolerance``, slowest first.
+    """
+    old_p50, new_p50 = baseline["p50_ms"], current["p50_ms"]
+    change = (new_p50 - old_p50) / old_p50
+    regression = (
+        f"p50: {old_p50:.0f}ms -> {new_p50:.0f}ms ({change:+.0%})" if change > tolerance else None
+    )
+    modules = []
+    old_modules = baseline["modules"]
+    for name, ms in sorted(current["modules"].items(), key=lambda item: -item[1]):
+        if ms < min_ms:
+            continue
+        old = old_modules.get(name)
+        if old is None:
+            modules.append(f"{name}: new, {ms:.1f}ms")
+        elif ms > old * (1 + tolerance):
+            modules.append(f"{name}: {old:.1f}ms -> {ms:.1f}ms")
+    return regression, modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark agent import time")
+    parser.add_argument("--module", default="app.agent", help="Module to import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument("--min-ms", type=float, default=100.0, help="List imports with at least this cumulative time")
+    parser.add_argument("--output", type=Path, default=None, help="Write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, default=None, help="Compare against this results file")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed slowdown against the baseline, as a fraction")
+    args = parser.parse_args()
+
+    timings = []
+    for _ in range(args.runs):
+        elapsed, report = import_once(args.module)
+        timings.append(elapsed)
+
+    p50_ms = statistics.median(timings) * 1000
+    print(
+        f"import {args.module}: p50={p50_ms:.0f}ms "
+        f"min={min(timings) * 1000:.0f}ms max={max(timings) * 1000:.0f}ms over {args.runs} runs"
+    )
+    for depth, node in slowest_imports(report, args.min_ms):
+        print(f"{node.cumulative_us / 1000:>9.1f}ms  {'  ' * depth}{node.name}")
+
+    results = {"module": args.module, "p50_ms": p50_ms, "modules": module_times(report)}
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        regression, modules = compare(json.loads(args.baseline.read_text()), results, args.tolerance, args.min_ms)
+        if modules:
+            print("Slower or new imports against the baseline:")
+            for line in modules:
+                print(f"  {line}")
+        if regression:
+            print(f"Regression: {regression}")
+            sys.exit(1)
+        print("No regression against the baseline")
+
+
+if __name__ == "__main__":
+    main()
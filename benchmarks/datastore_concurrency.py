@@ -0,0 +1,101 @@
+"""Concurrency benchmark for ``DiscoveryDatastoreSearcher`` against a local fake backend.
+
+Compares the blocking path (calling ``searcher(query)`` from a coroutine, as
+``DatastoreSearchTool`` used to) with ``searcher.call_async`` as the number of
+in-flight sessions on one event loop grows.
+
+Usage:
+  python -m benchmarks.datastore_concurrency --concurrency 1 8 32 64
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, List
+
+from app.utils.discover_datastore_searcher import (
+    DiscoveryDatastoreSearcher,
+    DiscoveryDatastoreSearcherConfig,
+)
+
+from .fakes import (
+    FakeBackend,
+    FakeDatastoreClient,
+    FakeSearchServiceAsyncClient,
+    FakeSearchServiceClient,
+)
+
+
+def build_searcher(backend: FakeBackend, lookup_workers: int) -> DiscoveryDatastoreSearcher:
+    config = DiscoveryDatastoreSearcherConfig(
+        project_id="bench-project",
+        location="global",
+        data_store_id="bench-datastore",
+        datastore_kind="Document",
+        page_size=backend.page_size,
+        max_concurrent_lookups=lookup_workers,
+    )
+    return DiscoveryDatastoreSearcher(
+        config=config,
+        discovery_client=FakeSearchServiceClient(backend),
+        async_discovery_client=FakeSearchServiceAsyncClient(backend),
+        datastore_client=FakeDatastoreClient(backend),
+    )
+
+
+async def run_sessions(
+    call: Callable[[str], Awaitable[object]], concurrency: int, calls_per_session: int
+) -> float:
+    """Run ``concurrency`` sessions of sequential tool calls and return calls per second."""
+
+    async def session(session_id: int) -> None:
+        for turn in range(calls_per_session):
+            await call(f"session {session_id} query {turn}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return concurrency * calls_per_session / elapsed
+
+
+async def benchmark(args: argparse.Namespace) -> None:
+    backend = FakeBackend(
+        num_pages=args.pages,
+        page_size=args.page_size,
+        search_latency=args.search_latency_ms / 1000,
+        lookup_latency=args.lookup_latency_ms / 1000,
+    )
+    searcher = build_searcher(backend, args.lookup_workers)
+
+    async def blocking_call(query: str) -> object:
+        return searcher(query)
+
+    modes: List[tuple] = [("blocking", blocking_call), ("async", searcher.call_async)]
+    print(f"{'sessions':>8} {'mode':>9} {'calls/s':>10} {'speedup':>8}")
+    for concurrency in args.concurrency:
+        baseline = None
+        for mode, call in modes:
+            throughput = await run_sessions(call, concurrency, args.calls_per_session)
+            baseline = baseline or throughput
+            print(
+                f"{concurrency:>8} {mode:>9} {throughput:>10.1f} "
+                f"{throughput / baseline:>7.1f}x"
+            )
+    searcher.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark concurrent datastore searches")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64], help="In-flight sessions to test")
+    parser.add_argument("--calls-per-session", type=int, default=2, help="Sequential tool calls per session")
+    parser.add_argument("--pages", type=int, default=2, help="Search pages per query")
+    parser.add_argument("--page-size", type=int, default=10, help="Results per page")
+    parser.add_argument("--search-latency-ms", type=float, default=20.0, help="Latency per search page")
+    parser.add_argument("--lookup-latency-ms", type=float, default=10.0, help="Latency per Datastore lookup")
+    parser.add_argument("--lookup-workers", type=int, default=8, help="Datastore lookup pool size")
+    args = parser.parse_args()
+    asyncio.run(benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
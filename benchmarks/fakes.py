@@ -0,0 +1,135 @@
+"""In-process fakes for the Discovery Engine and Datastore clients.
+
+The fakes mimic the small surface of the real clients that
+``DiscoveryDatastoreSearcher`` uses and add a fixed latency to every round
+trip, so benchmarks measure how the searcher schedules I/O rather than how
+fast the network is.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from google.cloud import datastore
+
+
+@dataclass
+class FakeSearchResult:
+    id: str
+
+
+@dataclass
+class FakeSearchResponse:
+    results: List[FakeSearchResult]
+    next_page_token: str = ""
+
+
+@dataclass
+class FakeBackend:
+    """Shared corpus and latency settings for the fake clients.
+
+    Attributes:
+      num_pages (int): Pages returned for every query.
+      page_size (int): Results per page.
+      search_latency (float): Seconds spent per search page round trip.
+      lookup_latency (float): Seconds spent per Datastore ``get_multi`` call.
+      deferred_rate (float): Fraction of keys Datastore defers to a later lookup.
+    """
+
+    num_pages: int = 2
+    page_size: int = 10
+    search_latency: float = 0.02
+    lookup_latency: float = 0.01
+    deferred_rate: float = 0.0
+    calls: Dict[str, int] = field(default_factory=lambda: {"search": 0, "get_multi": 0})
+
+    def page(self, query: str, index: int) -> FakeSearchResponse:
+        start = index * self.page_size
+        results = [
+            FakeSearchResult(id=f"{abs(hash(query)) % 1000}-{start + i}")
+            for i in range(self.page_size)
+        ]
+        token = str(index + 1) if index + 1 < self.num_pages else ""
+        return FakeSearchResponse(results=results, next_page_token=token)
+
+
+class _FakeSearchPager:
+    def __init__(self, backend: FakeBackend, query: str) -> None:
+        self._backend = backend
+        self._query = query
+
+    @property
+    def pages(self) -> Iterator[FakeSearchResponse]:
+        for index in range(self._backend.num_pages):
+            self._backend.calls["search"] += 1
+            time.sleep(self._backend.search_latency)
+            yield self._backend.page(self._query, index)
+
+
+class _FakeSearchAsyncPager:
+    def __init__(self, backend: FakeBackend, query: str) -> None:
+        self._backend = backend
+        self._query = query
+
+    @property
+    async def pages(self) -> AsyncIterator[FakeSearchResponse]:
+        for index in range(self._backend.num_pages):
+            self._backend.calls["search"] += 1
+            await asyncio.sleep(self._backend.search_latency)
+            yield self._backend.page(self._query, index)
+
+
+class FakeSearchServiceClient:
+    """Blocking stand-in for ``discoveryengine.SearchServiceClient``."""
+
+    def __init__(self, backend: FakeBackend) -> None:
+        self._backend = backend
+
+    def search(self, request: Any) -> _FakeSearchPager:
+        return _FakeSearchPager(self._backend, request.query)
+
+
+class FakeSearchServiceAsyncClient:
+    """asyncio stand-in for ``discoveryengine.SearchServiceAsyncClient``."""
+
+    def __init__(self, backend: FakeBackend) -> None:
+        self._backend = backend
+
+    async def search(self, request: Any) -> _FakeSearchAsyncPager:
+        return _FakeSearchAsyncPager(self._backend, request.query)
+
+
+class FakeDatastoreClient:
+    """Blocking stand-in for ``datastore.Client`` with a latency per ``get_multi``.
+
+    Like the real service, entities come back in no particular order and a
+    share of the keys can be deferred when ``deferred`` is passed.
+    """
+
+    def __init__(self, backend: FakeBackend, project: str = "bench-project") -> None:
+        self._backend = backend
+        self.project = project
+
+    def key(self, kind: str, name: Any) -> datastore.Key:
+        return datastore.Key(kind, name, project=self.project)
+
+    def get_multi(
+        self,
+        keys: List[datastore.Key],
+        missing: Optional[List[Any]] = None,
+        deferred: Optional[List[Any]] = None,
+    ) -> List[datastore.Entity]:
+        self._backend.calls["get_multi"] += 1
+        time.sleep(self._backend.lookup_latency)
+        entities: List[datastore.Entity] = []
+        for key in keys:
+            if deferred is not None and random.random() < self._backend.deferred_rate:
+                deferred.append(key)
+                continue
+            entity = datastore.Entity(key=key)
+            entity["content"] = f"content of {key.name}"
+            entities.append(entity)
+        random.shuffle(entities)
+        return entities
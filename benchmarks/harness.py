@@ -0,0 +1,220 @@
+"""Measurement helpers shared by the benchmark suite.
+
+A ``Case`` wraps one operation, blocking or async. ``run_case`` measures its
+latency percentiles over sequential calls, its throughput at several
+concurrency levels and the memory it allocates per call, and returns a plain
+dict so results can be written to JSON and compared across runs.
+"""
+
+import asyncio
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+@dataclass
+class Case:
+    """
+    One benchmarked operation.
+
+    Attributes:
+      name (str): Key of the case in the results.
+      call (Callable[[int], Any]): Performs one operation; gets the call number,
+        e.g. to pick a query. Returns an awaitable when ``is_async``.
+      is_async (bool): Whether ``call`` is a coroutine function.
+      ops_per_call (int): Operations one call performs, e.g. documents indexed;
+        throughput is reported in operations per second.
+      concurrency (Optional[Sequence[int]]): Overrides the suite's concurrency levels.
+      scale (Optional[Callable[[int], Callable[[int], Any]]]): For operations that
+        parallelize internally (e.g. an indexer's worker count): returns the call
+        to time at a given concurrency, which then runs alone.
+    """
+
+    name: str
+    call: Callable[[int], Any]
+    is_async: bool = False
+    ops_per_call: int = 1
+    concurrency: Optional[Sequence[int]] = None
+    scale: Optional[Callable[[int], Callable[[int], Any]]] = None
+
+
+def percentiles(samples: Sequence[float]) -> Dict[str, float]:
+    """Return p50/p95/p99 and mean of latencies in seconds, in milliseconds."""
+    values = np.asarray(samples) * 1000
+    return {
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "mean_ms": float(values.mean()),
+    }
+
+
+def _timed_sync(call: Callable[[int], Any], calls: int) -> List[float]:
+    latencies: List[float] = []
+    for i in range(calls):
+        start = time.perf_counter()
+        call(i)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def _timed_async(call: Callable[[int], Awaitable[Any]], calls: int) -> List[float]:
+    latencies: List[float] = []
+    for i in range(calls):
+        start = time.perf_counter()
+        await call(i)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _throughput_sync(call: Callable[[int], Any], concurrency: int, calls: int) -> float:
+    """Run ``calls`` calls from ``concurrency`` threads and return calls per second."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, range(calls)))
+    return calls / (time.perf_counter() - start)
+
+
+async def _throughput_async(call: Callable[[int], Awaitable[Any]], concurrency: int, calls: int) -> float:
+    """Run ``calls`` calls as ``concurrency`` concurrent sessions and return calls per second."""
+    counter = iter(range(calls))
+
+    async def session() -> None:
+        for i in counter:
+            await call(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session() for _ in range(concurrency)))
+    return calls / (time.perf_counter() - start)
+
+
+def _allocations(case: Case, calls: int) -> Dict[str, float]:
+    """
+    Trace allocations over ``calls`` sequential calls.
+
+    ``peak_kib_per_call`` is the mean high-water mark of memory allocated during
+    a call; ``retained_bytes_per_call`` is what each call leaves allocated
+    (caches, leaks).
+    """
+
+    def measure(run_one: Callable[[int], Any]) -> Dict[str, float]:
+        run_one(0)  # warm lazily built pools and caches outside the trace
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            peaks: List[int] = []
+            for i in range(calls):
+                before = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                run_one(i)
+                peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            retained = tracemalloc.get_traced_memory()[0] - baseline
+        finally:
+            tracemalloc.stop()
+        return {
+            "peak_kib_per_call": float(np.mean(peaks)) / 1024,
+            "retained_bytes_per_call": retained / calls,
+        }
+
+    if case.is_async:
+        loop = asyncio.new_event_loop()
+        try:
+            return measure(lambda i: loop.run_until_complete(case.call(i)))
+        finally:
+            loop.close()
+    return measure(case.call)
+
+
+def run_case(case: Case, calls: int, concurrency: Sequence[int]) -> Dict[str, Any]:
+    """
+    Measure ``case``: latency over ``calls`` sequential calls, throughput at each
+    level of ``concurrency`` and allocations per call.
+    """
+    levels = list(case.concurrency or concurrency)
+    if case.is_async:
+        latencies = asyncio.run(_timed_async(case.call, calls))
+        throughput = {
+            str(level): asyncio.run(_throughput_async(case.call, level, max(calls, level))) * case.ops_per_call
+            for level in levels
+        }
+    else:
+        latencies = _timed_sync(case.call, calls)
+        if case.scale is not None:
+            throughput = {
+                str(level): case.ops_per_call / float(np.mean(_timed_sync(case.scale(level), max(1, calls // 4))))
+                for level in levels
+            }
+        else:
+            throughput = {
+                str(level): _throughput_sync(case.call, level, max(calls, level)) * case.ops_per_call
+                for level in levels
+            }
+    return {
+        "latency": percentiles(latencies),
+        "throughput_ops_per_s": throughput,
+        "allocations": _allocations(case, max(1, min(calls, 20))),
+    }
+
+
+def metadata(**settings: Any) -> Dict[str, Any]:
+    """Describe the run: time, commit, interpreter and the suite settings."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        **settings,
+    }
+
+
+def write_results(path: Path, results: Dict[str, Any]) -> None:
+    path.write_text(json.dumps(results, indent=1, sort_keys=True), encoding="utf-8")
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.1) -> List[str]:
+    """
+    Return a line per metric of ``current`` that regressed by more than
+    ``tolerance`` (a fraction) against ``baseline``.
+
+    Latencies and allocations regress when they grow, throughput when it drops.
+    Cases or levels missing from either run are skipped.
+    """
+    regressions: List[str] = []
+
+    def check(label: str, old: float, new: float, higher_is_better: bool) -> None:
+        if old <= 0:
+            return
+        change = (new - old) / old
+        if (change < -tolerance) if higher_is_better else (change > tolerance):
+            regressions.append(f"{label}: {old:.3f} -> {new:.3f} ({change:+.0%})")
+
+    for name, case in current.get("cases", {}).items():
+        old_case = baseline.get("cases", {}).get(name)
+        if old_case is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            check(f"{name} {metric}", old_case["latency"][metric], case["latency"][metric], False)
+        for level, value in case["throughput_ops_per_s"].items():
+            if level in old_case["throughput_ops_per_s"]:
+                check(f"{name} ops/s @{level}", old_case["throughput_ops_per_s"][level], value, True)
+        check(
+            f"{name} peak KiB/call",
+            old_case["allocations"]["peak_kib_per_call"],
+            case["allocations"]["peak_kib_per_call"],
+            False,
+        )
+    return regressions
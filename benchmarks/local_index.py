@@ -0,0 +1,107 @@
+"""Latency and recall benchmark for the local IVF vector index.
+
+Builds an index over synthetic clustered embeddings (``--count`` rows) and
+compares top-k search against exact brute force on recall@k and per-query
+latency, for several ``nprobe`` settings. The build runs once and is reused
+while ``--index-dir`` holds a matching index.
+
+Usage:
+  python -m benchmarks.local_index --count 1000000 --dim 256 --nprobe 4 8 16 32
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from app.utils.vector_index import VectorIndex, VectorIndexBuilder
+
+
+class RowEmbedder:
+    """Embedder for the benchmark: a document's ``content`` is its row number in a precomputed matrix."""
+
+    def __init__(self, matrix: np.ndarray) -> None:
+        self.matrix = matrix
+
+    def embed_many(self, texts: Iterable[str]) -> np.ndarray:
+        return self.matrix[[int(text) for text in texts]]
+
+
+def synthetic_vectors(count: int, dim: int, topics: int, seed: int, sample_seed: int) -> np.ndarray:
+    """Unit vectors drawn around ``topics`` random centres, like embeddings of a topical corpus.
+
+    ``seed`` fixes the centres and ``sample_seed`` the points drawn around them,
+    so queries can come from the same topics as the indexed vectors.
+    """
+    centres = np.random.default_rng(seed).standard_normal((topics, dim)).astype(np.float32)
+    rng = np.random.default_rng(sample_seed)
+    vectors = centres[rng.integers(0, topics, count)] + 1.5 * rng.standard_normal((count, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def build(path: Path, vectors: np.ndarray) -> VectorIndex:
+    builder = VectorIndexBuilder(path, RowEmbedder(vectors), batch_size=8192)
+    for row in range(len(vectors)):
+        builder.add({"id": str(row), "content": str(row)})
+    return builder.build()
+
+
+def evaluate(index: VectorIndex, queries: np.ndarray, k: int, nprobe: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    results: List[List[int]] = []
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.search(query, k, nprobe)
+        latencies.append(time.perf_counter() - start)
+        results.append([row for row, _ in hits])
+
+    # Exact search in a separate pass: its full scan would evict the caches the timed searches rely on.
+    vectors = np.asarray(index.vectors)
+    recalls = [
+        len(set(np.argpartition(-(vectors @ query), k)[:k].tolist()) & set(found)) / k
+        for query, found in zip(queries, results)
+    ]
+    return {
+        f"recall@{k}": float(np.mean(recalls)),
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the local vector index")
+    parser.add_argument("--count", type=int, default=200_000, help="Indexed vectors")
+    parser.add_argument("--dim", type=int, default=256, help="Embedding dimensions")
+    parser.add_argument("--topics", type=int, default=2000, help="Clusters in the synthetic data")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per setting")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32], help="nprobe settings to compare")
+    parser.add_argument("--index-dir", type=Path, default=Path(tempfile.gettempdir()) / "bench_local_index", help="Where to build the index")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic data")
+    args = parser.parse_args()
+
+    meta_path = args.index_dir / "meta.json"
+    meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+    if (meta.get("dim"), meta.get("count")) == (args.dim, args.count):
+        index = VectorIndex(args.index_dir)
+        print(f"Reusing index at {args.index_dir}")
+    else:
+        vectors = synthetic_vectors(args.count, args.dim, args.topics, args.seed, args.seed)
+        start = time.perf_counter()
+        index = build(args.index_dir, vectors)
+        print(f"Built index of {len(index)} x {args.dim} ({index.meta['nlist']} lists) in {time.perf_counter() - start:.1f}s")
+        del vectors
+
+    queries = synthetic_vectors(args.queries, args.dim, args.topics, args.seed, args.seed + 1)
+    for nprobe in args.nprobe:
+        metrics = evaluate(index, queries, args.k, nprobe)
+        print(f"nprobe={nprobe:>3} " + " ".join(f"{key}={value:.3f}" for key, value in metrics.items()))
+
+
+if __name__ == "__main__":
+    main()
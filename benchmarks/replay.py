@@ -0,0 +1,333 @@
+"""Recorded-replay fakes for the Discovery Engine, Datastore and RAG Engine backends.
+
+A ``Recording`` holds real backend responses: the search result pages and
+Datastore entities for a set of queries, and the RAG Engine contexts retrieved
+for them. The replay clients serve those responses deterministically, with a
+latency drawn from a seeded ``LatencyModel`` added to every round trip, so
+benchmarks exercise realistic payloads without touching the network.
+
+Record from live services (needs credentials and the agent config):
+  python -m benchmarks.replay record --output recording.json
+
+Or build a synthetic recording from the ``eval/data`` conversations:
+  python -m benchmarks.replay synthesize --output recording.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+
+from google.cloud import datastore
+
+from .fakes import FakeSearchResponse, FakeSearchResult
+
+_EVAL_DATA = Path(__file__).resolve().parent.parent / "eval" / "data" / "conversation.test.json"
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+class LatencyModel:
+    """
+    Seeded log-normal latency: ``median_ms`` scaled by ``exp(sigma * z)``.
+
+    ``sigma=0`` gives a fixed latency; around 0.5 gives the long tail typical of
+    cloud RPCs. Sampling is thread safe, so replay clients can be shared by workers.
+    """
+
+    def __init__(self, median_ms: float = 20.0, sigma: float = 0.0, seed: int = 0) -> None:
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        """Return the next latency in seconds."""
+        if self.sigma == 0:
+            return self.median_ms / 1000
+        with self._lock:
+            z = self._rng.gauss(0.0, 1.0)
+        return self.median_ms * math.exp(self.sigma * z) / 1000
+
+
+@dataclass
+class Recording:
+    """
+    Backend responses keyed by query.
+
+    Attributes:
+      searches (Dict[str, List[List[str]]]): Document ids of each search page, per query.
+      entities (Dict[str, Dict[str, Any]]): Datastore entity properties, per document id.
+      retrievals (Dict[str, List[Dict[str, Any]]]): RAG Engine contexts (``text``,
+        ``source_uri``, ``source_display_name``, ``distance``), best first, per query.
+    """
+
+    searches: Dict[str, List[List[str]]] = field(default_factory=dict)
+    entities: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    retrievals: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path) -> "Recording":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        return cls(data.get("searches", {}), data.get("entities", {}), data.get("retrievals", {}))
+
+    def save(self, path: Path) -> None:
+        payload = {"searches": self.searches, "entities": self.entities, "retrievals": self.retrievals}
+        Path(path).write_text(json.dumps(payload, indent=1), encoding="utf-8")
+
+    @property
+    def queries(self) -> List[str]:
+        return sorted(set(self.searches) | set(self.retrievals))
+
+    @staticmethod
+    def _match(responses: Dict[str, Any], query: str) -> Any:
+        """Return the responses for ``query``, or for a recorded query picked by its hash."""
+        if query in responses:
+            return responses[query]
+        keys = sorted(responses)
+        return responses[keys[zlib.crc32(query.encode("utf-8")) % len(keys)]]
+
+    def search_pages(self, query: str) -> List[List[str]]:
+        return self._match(self.searches, query)
+
+    def contexts(self, query: str) -> List[Dict[str, Any]]:
+        return self._match(self.retrievals, query)
+
+    @classmethod
+    def synthetic(cls, path: Path = _EVAL_DATA, pages: int = 2, page_size: int = 10) -> "Recording":
+        """
+        Build a recording from the eval conversations: their queries, with the
+        sentences of all reference answers as the documents.
+
+        Each query's own reference sentences rank first, followed by other
+        documents, so payload sizes and ranking look like a real retrieval.
+        """
+        cases = json.loads(Path(path).read_text(encoding="utf-8"))
+        documents: List[Dict[str, Any]] = []
+        owners: List[int] = []
+        queries: List[tuple] = []
+        for index, case in enumerate(cases):
+            queries.append((case["query"], index))
+            for tool_use in case.get("expected_tool_use") or []:
+                queries.append((tool_use["tool_input"]["query"], index))
+            for sentence in _SENTENCE_RE.split(case["reference"]):
+                if sentence.strip():
+                    documents.append({
+                        "id": f"doc-{len(documents)}",
+                        "title": f"reference {index}",
+                        "content": sentence.strip(),
+                        "source_uri": f"gs://bench/reference-{index}.md",
+                    })
+                    owners.append(index)
+
+        recording = cls(entities={document["id"]: document for document in documents})
+        wanted = pages * page_size
+        for query, case in queries:
+            rng = random.Random(zlib.crc32(query.encode("utf-8")))
+            own = [i for i, owner in enumerate(owners) if owner == case]
+            others = [i for i, owner in enumerate(owners) if owner != case]
+            rng.shuffle(others)
+            ranked = (own + others)[:wanted]
+            ids = [documents[i]["id"] for i in ranked]
+            recording.searches[query] = [ids[start : start + page_size] for start in range(0, len(ids), page_size)]
+            recording.retrievals[query] = [
+                {
+                    "text": documents[i]["content"],
+                    "source_uri": documents[i]["source_uri"],
+                    "source_display_name": documents[i]["title"],
+                    "distance": round(0.1 + 0.05 * rank, 3),
+                }
+                for rank, i in enumerate(ranked)
+            ]
+        return recording
+
+
+class _ReplaySearchPager:
+    def __init__(self, recording: Recording, latency: LatencyModel, query: str) -> None:
+        self._recording = recording
+        self._latency = latency
+        self._query = query
+
+    def _response(self, pages: List[List[str]], index: int) -> FakeSearchResponse:
+        token = str(index + 1) if index + 1 < len(pages) else ""
+        return FakeSearchResponse(results=[FakeSearchResult(id=doc_id) for doc_id in pages[index]], next_page_token=token)
+
+    @property
+    def pages(self) -> Iterator[FakeSearchResponse]:
+        pages = self._recording.search_pages(self._query)
+        for index in range(len(pages)):
+            time.sleep(self._latency.sample())
+            yield self._response(pages, index)
+
+
+class _ReplaySearchAsyncPager(_ReplaySearchPager):
+    @property
+    async def pages(self) -> AsyncIterator[FakeSearchResponse]:
+        pages = self._recording.search_pages(self._query)
+        for index in range(len(pages)):
+            await asyncio.sleep(self._latency.sample())
+            yield self._response(pages, index)
+
+
+class ReplaySearchServiceClient:
+    """Blocking stand-in for ``discoveryengine.SearchServiceClient`` serving recorded pages."""
+
+    def __init__(self, recording: Recording, latency: LatencyModel) -> None:
+        self._recording = recording
+        self._latency = latency
+
+    def search(self, request: Any) -> _ReplaySearchPager:
+        return _ReplaySearchPager(self._recording, self._latency, request.query)
+
+
+class ReplaySearchServiceAsyncClient(ReplaySearchServiceClient):
+    """asyncio stand-in for ``discoveryengine.SearchServiceAsyncClient`` serving recorded pages."""
+
+    async def search(self, request: Any) -> _ReplaySearchAsyncPager:
+        return _ReplaySearchAsyncPager(self._recording, self._latency, request.query)
+
+
+class ReplayDatastoreClient:
+    """
+    Blocking stand-in for ``datastore.Client`` serving recorded entities.
+
+    ``put_multi`` only waits out its latency and counts the entities, so the
+    indexing scripts can run against it too.
+    """
+
+    def __init__(self, recording: Recording, latency: LatencyModel, project: str = "bench-project") -> None:
+        self._recording = recording
+        self._latency = latency
+        self.project = project
+        self.written = 0
+        self._lock = threading.Lock()
+
+    def key(self, kind: str, name: Any) -> datastore.Key:
+        return datastore.Key(kind, name, project=self.project)
+
+    def get_multi(
+        self,
+        keys: List[datastore.Key],
+        missing: Optional[List[Any]] = None,
+        deferred: Optional[List[Any]] = None,
+    ) -> List[datastore.Entity]:
+        time.sleep(self._latency.sample())
+        entities: List[datastore.Entity] = []
+        for key in keys:
+            properties = self._recording.entities.get(key.name)
+            if properties is None:
+                if missing is not None:
+                    missing.append(datastore.Entity(key=key))
+                continue
+            entity = datastore.Entity(key=key)
+            entity.update(properties)
+            entities.append(entity)
+        return entities
+
+    def put_multi(self, entities: Sequence[datastore.Entity]) -> None:
+        time.sleep(self._latency.sample())
+        with self._lock:
+            self.written += len(entities)
+
+
+class ReplayRagEngine:
+    """
+    Stand-in for the ``vertexai.preview.rag`` calls the tools and scripts make.
+
+    ``retrieval_query`` returns the recorded contexts in the response shape the
+    RAG tools read (``response.contexts.contexts``).
+    """
+
+    def __init__(self, recording: Recording, latency: LatencyModel) -> None:
+        self._recording = recording
+        self._latency = latency
+        self._files = 0
+        self._lock = threading.Lock()
+
+    def retrieval_query(
+        self,
+        text: str,
+        rag_resources: Any = None,
+        rag_corpora: Any = None,
+        similarity_top_k: Optional[int] = 10,
+        vector_distance_threshold: Optional[float] = None,
+    ) -> Any:
+        time.sleep(self._latency.sample())
+        contexts = [
+            SimpleNamespace(**context)
+            for context in self._recording.contexts(text)[: similarity_top_k or None]
+            if vector_distance_threshold is None or context["distance"] <= vector_distance_threshold
+        ]
+        return SimpleNamespace(contexts=SimpleNamespace(contexts=contexts))
+
+    def upload_file(self, corpus_name: str, path: str, display_name: Optional[str] = None, **kwargs: Any) -> Any:
+        time.sleep(self._latency.sample())
+        with self._lock:
+            self._files += 1
+            return SimpleNamespace(name=f"{corpus_name}/ragFiles/{self._files}", display_name=display_name)
+
+    def delete_file(self, name: str) -> None:
+        time.sleep(self._latency.sample())
+
+
+def record(queries: Sequence[str]) -> Recording:
+    """Record live search, entity and RAG Engine responses for ``queries`` with the agent's configuration."""
+    from vertexai.preview import rag
+
+    from app.config import agent_config
+    from app.tools.datastore_tool import get_searcher
+
+    recording = Recording()
+    searcher = get_searcher()
+    for query in queries:
+        pages: List[List[str]] = []
+        for response, entities in searcher.stream(query):
+            pages.append([result.id for result in response.results])
+            for result, entity in zip(response.results, entities or []):
+                if entity is not None:
+                    recording.entities[result.id] = {key: value for key, value in entity.items() if isinstance(value, (str, int, float, bool))}
+        recording.searches[query] = pages
+        if agent_config.rag_corpus:
+            response = rag.retrieval_query(
+                text=query,
+                rag_resources=[rag.RagResource(rag_corpus=agent_config.rag_corpus)],
+                similarity_top_k=20,
+            )
+            recording.retrievals[query] = [
+                {
+                    "text": context.text,
+                    "source_uri": context.source_uri,
+                    "source_display_name": context.source_display_name,
+                    "distance": context.distance,
+                }
+                for context in response.contexts.contexts
+            ]
+    return recording
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record or synthesize backend responses for the replay fakes")
+    parser.add_argument("mode", choices=["record", "synthesize"], help="Record live responses or build them from eval/data")
+    parser.add_argument("--output", type=Path, required=True, help="Recording file to write")
+    parser.add_argument("--pages", type=int, default=2, help="Search pages per query when synthesizing")
+    parser.add_argument("--page-size", type=int, default=10, help="Results per page when synthesizing")
+    args = parser.parse_args()
+
+    if args.mode == "synthesize":
+        recording = Recording.synthetic(pages=args.pages, page_size=args.page_size)
+    else:
+        recording = record(Recording.synthetic().queries)
+    recording.save(args.output)
+    print(f"Wrote {len(recording.queries)} queries and {len(recording.entities)} entities to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Latency and quality benchmark for the local rerankers on the ``eval/data`` set.
+
+The eval set has no retrieved chunks, so the benchmark builds a candidate pool
+from the reference answers: each reference is split into sentence chunks, and
+for every query the chunks of its own reference are the relevant ones. Each
+query's candidates are the whole pool in a random order, which stands in for an
+over-fetched, noisily ordered retrieval. Rerankers are compared with that order
+on MRR, recall@N, estimated prompt tokens kept, and latency per query.
+
+Usage:
+  python -m benchmarks.reranking_quality --top-n 5 --rerankers none bm25 cross-encoder
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.reranking import Reranker, build_reranker, rerank
+from app.utils.tokens import estimate_tokens
+
+_DATA = Path(__file__).resolve().parent.parent / "eval" / "data" / "conversation.test.json"
+_CITATION_RE = re.compile(r"\[Citation:[^\]]*\]")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def load_cases(path: Path) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]:
+    """Return ``(queries, chunks)``, each paired with the index of the case it belongs to."""
+    cases = json.loads(path.read_text(encoding="utf-8"))
+    queries: List[Tuple[str, int]] = []
+    chunks: List[Tuple[str, int]] = []
+    for index, case in enumerate(cases):
+        if not case.get("expected_tool_use"):
+            continue
+        queries.append((case["query"], index))
+        for tool_use in case["expected_tool_use"]:
+            queries.append((tool_use["tool_input"]["query"], index))
+        reference = _CITATION_RE.sub("", case["reference"])
+        chunks.extend((sentence, index) for sentence in _SENTENCE_RE.split(reference) if sentence.strip())
+    return queries, chunks
+
+
+def evaluate(
+    reranker: Optional[Reranker],
+    queries: Sequence[Tuple[str, int]],
+    chunks: Sequence[Tuple[str, int]],
+    top_n: int,
+    seed: int,
+) -> Dict[str, float]:
+    rng = random.Random(seed)
+    reciprocal_ranks: List[float] = []
+    recalls: List[float] = []
+    tokens: List[int] = []
+    latencies: List[float] = []
+    for query, case in queries:
+        candidates = list(chunks)
+        rng.shuffle(candidates)
+        start = time.perf_counter()
+        if reranker is None:
+            ranked = candidates
+        else:
+            ranked = rerank(query, candidates, lambda chunk: chunk[0], reranker)
+        latencies.append(time.perf_counter() - start)
+
+        relevant = sum(1 for _, owner in candidates if owner == case)
+        first = next(rank for rank, (_, owner) in enumerate(ranked, start=1) if owner == case)
+        reciprocal_ranks.append(1.0 / first)
+        recalls.append(sum(1 for _, owner in ranked[:top_n] if owner == case) / relevant)
+        tokens.append(sum(estimate_tokens(text) for text, _ in ranked[:top_n]))
+    return {
+        "mrr": float(np.mean(reciprocal_ranks)),
+        f"recall@{top_n}": float(np.mean(recalls)),
+        "tokens_kept": float(np.mean(tokens)),
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark local rerankers on the eval set")
+    parser.add_argument("--data", type=Path, default=_DATA, help="Eval conversation file")
+    parser.add_argument("--top-n", type=int, default=5, help="Chunks kept after reranking")
+    parser.add_argument("--rerankers", nargs="+", default=["none", "bm25"], help="Rerankers to compare: none, bm25, cross-encoder")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the candidate order")
+    args = parser.parse_args()
+
+    queries, chunks = load_cases(args.data)
+    pool_tokens = sum(estimate_tokens(text) for text, _ in chunks)
+    print(f"{len(queries)} queries, {len(chunks)} candidate chunks ({pool_tokens} tokens) per query")
+    for name in args.rerankers:
+        reranker = build_reranker(None if name == "none" else name)
+        if reranker is not None:
+            # Warm up (model load for the cross-encoder) outside the timed loop.
+            rerank("warm up", chunks[:2], lambda chunk: chunk[0], reranker)
+        metrics = evaluate(reranker, queries, chunks, args.top_n, args.seed)
+        print(f"{name:>14} " + " ".join(f"{key}={value:.3f}" for key, value in metrics.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""Retrieval and indexing micro-benchmarks against recorded-replay backends.
+
+Covers ``DiscoveryDatastoreSearcher.__call__``, ``call_async`` and
+``search_many``, ``RagEngineQueryTool.run_async`` and the two indexing scripts. Every backend is
+a replay fake from ``benchmarks.replay`` serving a ``Recording`` (synthesized
+from ``eval/data`` unless ``--recording`` is given) with seeded, injected
+latency, so runs are repeatable and need no credentials.
+
+Each case reports p50/p95/p99 latency, throughput at each ``--concurrency``
+level (worker count for the indexing scripts) and allocations per call. Results
+are written to ``--output`` as JSON; with ``--baseline`` the run is compared to
+an earlier results file and exits non-zero when a metric regressed by more than
+``--tolerance``.
+
+Usage:
+  python -m benchmarks.suite --output results.json
+  python -m benchmarks.suite --baseline results.json --output current.json
+  python -m benchmarks.suite --suites searcher --latency-ms 40 --sigma 0.5
+"""
+
+import argparse
+import collections
+import contextlib
+import io
+import json
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from unittest import mock
+
+from .harness import Case, compare, metadata, run_case, write_results
+from .replay import (
+    LatencyModel,
+    Recording,
+    ReplayDatastoreClient,
+    ReplayRagEngine,
+    ReplaySearchServiceAsyncClient,
+    ReplaySearchServiceClient,
+)
+
+CORPUS = "projects/bench-project/locations/us-central1/ragCorpora/bench"
+INDEX_DOCUMENTS = 1000
+INDEX_BATCH_SIZE = 100
+SYNC_FILES = 40
+BULK_QUERIES = 200
+
+
+def _searcher(recording: Recording, latency: LatencyModel):
+    from app.utils.discover_datastore_searcher import (
+        DiscoveryDatastoreSearcher,
+        DiscoveryDatastoreSearcherConfig,
+    )
+
+    config = DiscoveryDatastoreSearcherConfig(
+        project_id="bench-project",
+        location="global",
+        data_store_id="bench-datastore",
+        datastore_kind="Document",
+        page_size=max(len(page) for pages in recording.searches.values() for page in pages),
+    )
+    return DiscoveryDatastoreSearcher(
+        config=config,
+        discovery_client=ReplaySearchServiceClient(recording, latency),
+        async_discovery_client=ReplaySearchServiceAsyncClient(recording, latency),
+        datastore_client=ReplayDatastoreClient(recording, latency),
+    )
+
+
+def searcher_cases(recording: Recording, latency: LatencyModel, workdir: Path) -> List[Case]:
+    searcher = _searcher(recording, latency)
+    queries = recording.queries
+    pick = lambda i: queries[i % len(queries)]
+    return [
+        Case("searcher.__call__", lambda i: searcher(pick(i))),
+        Case("searcher.call_async", lambda i: searcher.call_async(pick(i)), is_async=True),
+    ]
+
+
+def bulk_search_cases(recording: Recording, latency: LatencyModel, workdir: Path) -> List[Case]:
+    searcher = _searcher(recording, latency)
+    queries = recording.queries
+    batch = lambda i: (queries[(i + j) % len(queries)] for j in range(BULK_QUERIES))
+
+    def run(concurrency: int) -> Callable[[int], None]:
+        return lambda i: collections.deque(searcher.search_many(batch(i), concurrency=concurrency), maxlen=0)
+
+    return [Case("searcher.search_many", run(8), ops_per_call=BULK_QUERIES, scale=run)]
+
+
+def rag_engine_cases(recording: Recording, latency: LatencyModel, workdir: Path) -> List[Case]:
+    from app.tools.ragengine_tool import RagEngineQueryTool
+
+    queries = recording.queries
+    tool = RagEngineQueryTool(CORPUS, retrieval_query=ReplayRagEngine(recording, latency).retrieval_query)
+    return [
+        Case(
+            "rag_engine_tool.run_async",
+            lambda i: tool.run_async(args={"query": queries[i % len(queries)]}, tool_context=None),
+            is_async=True,
+        )
+    ]
+
+
+def index_datastore_cases(recording: Recording, latency: LatencyModel, workdir: Path) -> List[Case]:
+    from scripts.index_datastore import index_to_datastore
+
+    documents = list(recording.entities.values())
+    entries = [
+        {
+            "id": f"{documents[i % len(documents)]['id']}-{i}",
+            "content": documents[i % len(documents)]["content"],
+            "metadata": {key: value for key, value in documents[i % len(documents)].items() if key not in ("id", "content")},
+        }
+        for i in range(INDEX_DOCUMENTS)
+    ]
+    client = ReplayDatastoreClient(recording, latency)
+
+    def run(workers: int) -> Callable[[int], None]:
+        def call(i: int) -> None:
+            with contextlib.redirect_stdout(io.StringIO()):
+                index_to_datastore(client, "Document", entries, batch_size=INDEX_BATCH_SIZE, workers=workers)
+
+        return call
+
+    return [Case("index_datastore", run(8), ops_per_call=INDEX_DOCUMENTS, scale=run)]
+
+
+def index_rag_engine_cases(recording: Recording, latency: LatencyModel, workdir: Path) -> List[Case]:
+    import scripts.index_rag_engine as index_rag_engine
+    from app.utils.rag_manifest import RagManifest
+
+    markdown_dir = workdir / "markdown"
+    markdown_dir.mkdir()
+    documents = list(recording.entities.values())
+    entries = []
+    for i in range(SYNC_FILES):
+        document = documents[i % len(documents)]
+        path = markdown_dir / f"{document['id']}-{i}.md"
+        path.write_text(f"# {document['title']}\n\n{document['content']}\n", encoding="utf-8")
+        entries.append({"path": path, "display_name": path.name, "metadata": {"source_uri": document["source_uri"]}})
+    engine = ReplayRagEngine(recording, latency)
+    manifest_path = workdir / "manifest.json"
+
+    def run(workers: int) -> Callable[[int], None]:
+        def call(i: int) -> None:
+            # A fresh manifest each call, so every file counts as new and is uploaded.
+            manifest_path.unlink(missing_ok=True)
+            with (
+                mock.patch.object(index_rag_engine, "vertexai"),
+                mock.patch.object(index_rag_engine.rag, "upload_file", engine.upload_file),
+                mock.patch.object(index_rag_engine.rag, "delete_file", engine.delete_file),
+                mock.patch.object(index_rag_engine, "invalidate_corpus"),
+                contextlib.redirect_stdout(io.StringIO()),
+            ):
+                index_rag_engine.sync_to_rag(
+                    CORPUS, "bench-project", "us-central1", entries, RagManifest(manifest_path, CORPUS), workers
+                )
+
+        return call
+
+    return [Case("index_rag_engine.sync", run(4), ops_per_call=SYNC_FILES, scale=run)]
+
+
+SUITES = {
+    "searcher": searcher_cases,
+    "bulk_search": bulk_search_cases,
+    "rag_engine": rag_engine_cases,
+    "index_datastore": index_datastore_cases,
+    "index_rag_engine": index_rag_engine_cases,
+}
+
+
+def build_cases(recording: Recording, latency: LatencyModel, workdir: Path, suites: List[str]) -> List[Case]:
+    """Build the cases of ``suites``; each suite imports what it benchmarks only when selected."""
+    return [case for name in suites for case in SUITES[name](recording, latency, workdir)]
+
+
+def print_table(results: Dict[str, Dict]) -> None:
+    print(f"{'case':<28}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'KiB/call':>10}  ops/s by concurrency")
+    for name, result in results.items():
+        latency = result["latency"]
+        throughput = "  ".join(f"{level}:{value:.1f}" for level, value in result["throughput_ops_per_s"].items())
+        print(
+            f"{name:<28}{latency['p50_ms']:>9.1f}{latency['p95_ms']:>9.1f}{latency['p99_ms']:>9.1f}"
+            f"{result['allocations']['peak_kib_per_call']:>10.1f}  {throughput}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark retrieval and indexing against recorded-replay backends")
+    parser.add_argument("--recording", type=Path, default=None, help="Recording to replay (default: synthesized from eval/data)")
+    parser.add_argument("--suites", nargs="+", choices=sorted(SUITES), default=list(SUITES), help="Suites to run")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Median injected latency per backend round trip")
+    parser.add_argument("--sigma", type=float, default=0.3, help="Log-normal spread of the injected latency (0 = fixed)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the injected latency")
+    parser.add_argument("--calls", type=int, default=50, help="Sequential calls per case for the latency percentiles")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Concurrency levels for throughput")
+    parser.add_argument("--output", type=Path, default=None, help="Write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, default=None, help="Results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression against --baseline")
+    args = parser.parse_args(argv)
+
+    recording = Recording.load(args.recording) if args.recording else Recording.synthetic()
+    latency = LatencyModel(args.latency_ms, args.sigma, args.seed)
+    workdir = Path(tempfile.mkdtemp(prefix="rag-bench-"))
+    try:
+        results = {
+            case.name: run_case(case, args.calls, args.concurrency)
+            for case in build_cases(recording, latency, workdir, args.suites)
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(results)
+    run = {
+        "metadata": metadata(
+            recording=str(args.recording) if args.recording else "synthetic",
+            latency_ms=args.latency_ms,
+            sigma=args.sigma,
+            seed=args.seed,
+            calls=args.calls,
+            concurrency=args.concurrency,
+        ),
+        "cases": results,
+    }
+    if args.output:
+        write_results(args.output, run)
+    if args.baseline:
+        regressions = compare(json.loads(args.baseline.read_text(encoding="utf-8")), run, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
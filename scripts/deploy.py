@@ -3,13 +3,12 @@ import os
 
 import vertexai
 from vertexai import agent_engines
-from vertexai.preview.reasoning_engines import AdkApp
 from dotenv import set_key
 
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from app.agent import root_agent
+from app.agent_engine import AgentApp, root_agent
 from app.config import deployment_config
 
 logging.basicConfig(level=logging.INFO)
@@ -24,7 +23,7 @@ vertexai.init(
 )
 
 logger.info("Deploying agent to Vertex AI Agent Engine...")
-app = AdkApp(agent=root_agent, enable_tracing=True)
+app = AgentApp(agent=root_agent, enable_tracing=True)
 remote_app = agent_engines.create(
     app,
     requirements=[
@@ -1,46 +1,232 @@
-"""Index Markdown documents with metadata into Google Cloud Datastore."""
+"""Index Markdown documents with metadata into Google Cloud Datastore.
+
+Documents are read lazily and written with ``put_multi`` in batches spread over
+a pool of worker threads. Every written batch is appended to a checkpoint file,
+so an interrupted run started again with the same ``--checkpoint`` skips the
+documents that are already indexed.
+"""
 
 import argparse
 import json
 import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
 
 from dotenv import load_dotenv
+from google.api_core import exceptions as api_exceptions
 from google.cloud import datastore
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import telemetry
+from app.utils.clients import datastore_client
+from app.utils.entity_cache import invalidate_entities
+from app.utils.embeddings import HashingEmbedder
+from app.utils.ingestion import ChunkingConfig, iter_chunks, read_documents
+from app.utils.vector_index import VectorIndexBuilder
+
+# Datastore accepts at most 500 entities per commit.
+MAX_ENTITIES_PER_COMMIT = 500
+
+RETRYABLE_ERRORS = (
+    api_exceptions.Aborted,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.InternalServerError,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.TooManyRequests,
+)
 
-def load_entries(md_dir: Path, metadata_file: Path) -> List[Dict[str, Any]]:
-    """Load markdown content and metadata."""
+
+def load_entries(md_dir: Path, metadata_file: Path, skip: Optional[Set[str]] = None) -> Iterator[Dict[str, Any]]:
+    """Yield markdown content and metadata one document at a time.
+
+    Args:
+      md_dir (Path): Directory containing the markdown files.
+      metadata_file (Path): JSON list of ``{"filename", "metadata"}`` items.
+      skip (Optional[Set[str]]): Document ids to leave out, e.g. already indexed ones.
+    """
     with metadata_file.open("r", encoding="utf-8") as f:
         items = json.load(f)
 
-    entries: List[Dict[str, Any]] = []
     for item in items:
+        if skip and item["filename"] in skip:
+            continue
         file_path = md_dir / item["filename"]
         with file_path.open("r", encoding="utf-8") as f:
             content = f.read()
-        entries.append(
-            {
-                "id": item["filename"],
-                "content": content,
-                "metadata": item.get("metadata", {}),
-            }
-        )
-    return entries
-
-
-def index_to_datastore(project: str, kind: str, entries: List[Dict[str, Any]]) -> None:
-    """Write the entries to Datastore."""
-    client = datastore.Client(project=project)
-    for entry in entries:
-        key = client.key(kind, entry["id"])
-        entity = datastore.Entity(key=key)
-        entity["content"] = entry["content"]
-        for k, v in entry["metadata"].items():
-            entity[k] = v
-        client.put(entity)
-    print(f"Indexed {len(entries)} documents to Datastore kind '{kind}'")
+        yield {
+            "id": item["filename"],
+            "content": content,
+            "metadata": item.get("metadata", {}),
+        }
+
+
+def load_chunks(
+    md_dir: Path, metadata_file: Path, config: ChunkingConfig, skip: Optional[Set[str]] = None
+) -> Iterator[Dict[str, Any]]:
+    """Yield the locally chunked, cleaned and deduplicated documents as entries, one per chunk.
+
+    Chunk ids are ``"<filename>#<n>"``; the source file and section heading are
+    added to the metadata as ``doc_id`` and ``section``.
+    """
+    for chunk in iter_chunks(read_documents(md_dir, metadata_file), config):
+        if skip and chunk["id"] in skip:
+            continue
+        yield {
+            "id": chunk["id"],
+            "content": chunk["content"],
+            "metadata": {**chunk["metadata"], "doc_id": chunk["doc_id"], "section": chunk["title"]},
+        }
+
+
+def to_index_document(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape an entry for the local vector index."""
+    metadata = entry["metadata"]
+    return {
+        "id": entry["id"],
+        "title": metadata.get("title") or metadata.get("section") or entry["id"],
+        "content": entry["content"],
+        "source_uri": metadata.get("source_uri") or metadata.get("doc_id") or entry["id"],
+    }
+
+
+def batched(entries: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group ``entries`` into lists of at most ``size`` items."""
+    iterator = iter(entries)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Checkpoint:
+    """Append-only record of the document ids already written.
+
+    Attributes:
+      path (Optional[Path]): Checkpoint file, one JSON list of ids per written
+        batch. None disables checkpointing.
+    """
+
+    def __init__(self, path: Optional[Path]) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> Set[str]:
+        """Return the ids recorded by earlier runs."""
+        done: Set[str] = set()
+        if self.path is None or not self.path.exists():
+            return done
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    done.update(json.loads(line))
+                except json.JSONDecodeError:
+                    # A run killed mid-write leaves a partial last line; that batch is redone.
+                    continue
+        return done
+
+    def record(self, ids: List[str]) -> None:
+        if self.path is None:
+            return
+        with self._lock, self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(ids) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def to_entity(client: datastore.Client, kind: str, entry: Dict[str, Any]) -> datastore.Entity:
+    entity = datastore.Entity(key=client.key(kind, entry["id"]))
+    entity["content"] = entry["content"]
+    for k, v in entry["metadata"].items():
+        entity[k] = v
+    return entity
+
+
+def put_batch(
+    client: datastore.Client,
+    kind: str,
+    batch: List[Dict[str, Any]],
+    max_retries: int = 5,
+    retry_backoff: float = 0.5,
+) -> List[str]:
+    """Write one batch with ``put_multi``, retrying transient errors with jittered exponential backoff.
+
+    Returns:
+      List[str]: The ids of the written documents.
+    """
+    entities = [to_entity(client, kind, entry) for entry in batch]
+    with telemetry.stage("index.put_multi", results=len(entities)) as stage:
+        for attempt in range(max_retries + 1):
+            try:
+                client.put_multi(entities)
+                stage.set(attempts=attempt + 1)
+                return [entry["id"] for entry in batch]
+            except RETRYABLE_ERRORS:
+                if attempt == max_retries:
+                    raise
+                time.sleep(retry_backoff * 2**attempt * (0.5 + random.random()))
+    raise AssertionError("unreachable")
+
+
+def index_to_datastore(
+    client: datastore.Client,
+    kind: str,
+    entries: Iterable[Dict[str, Any]],
+    batch_size: int = MAX_ENTITIES_PER_COMMIT,
+    workers: int = 8,
+    checkpoint: Optional[Checkpoint] = None,
+    report_every: float = 5.0,
+) -> List[str]:
+    """Write the entries to Datastore in concurrent ``put_multi`` batches.
+
+    At most ``2 * workers`` batches are read ahead, so memory stays bounded
+    however many documents ``entries`` yields.
+
+    Args:
+      client (datastore.Client): Datastore client, shared by the workers.
+      kind (str): Datastore kind to write.
+      entries (Iterable[Dict[str, Any]]): Documents, as yielded by ``load_entries``.
+      batch_size (int): Entities per ``put_multi`` call, at most 500.
+      workers (int): Concurrent writes.
+      checkpoint (Optional[Checkpoint]): Where to record written batches.
+      report_every (float): Seconds between progress lines.
+
+    Returns:
+      List[str]: The ids written by this run.
+    """
+    batch_size = min(batch_size, MAX_ENTITIES_PER_COMMIT)
+    checkpoint = checkpoint or Checkpoint(None)
+    written: List[str] = []
+    start = last_report = time.monotonic()
+
+    def collect(future: Future) -> None:
+        nonlocal last_report
+        ids = future.result()
+        checkpoint.record(ids)
+        written.extend(ids)
+        now = time.monotonic()
+        if now - last_report >= report_every:
+            last_report = now
+            print(f"Indexed {len(written)} documents ({len(written) / (now - start):.1f} docs/sec)", flush=True)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending: Set[Future] = set()
+        for batch in batched(entries, batch_size):
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future)
+            pending.add(executor.submit(telemetry.in_context(put_batch), client, kind, batch))
+        for future in wait(pending).done:
+            collect(future)
+
+    elapsed = max(time.monotonic() - start, 1e-9)
+    print(f"Indexed {len(written)} documents to Datastore kind '{kind}' in {elapsed:.1f}s ({len(written) / elapsed:.1f} docs/sec)")
+    return written
 
 
 def main() -> None:
@@ -50,12 +236,48 @@ def main() -> None:
     parser.add_argument("--metadata-file", type=Path, default=Path("docs/metadata.json"), help="JSON file with metadata")
     parser.add_argument("--project", default=os.getenv("GOOGLE_CLOUD_PROJECT"), help="GCP project id")
     parser.add_argument("--kind", default=os.getenv("DATASTORE_KIND", "Document"), help="Datastore kind")
+    parser.add_argument("--entity-cache-path", default=os.getenv("ENTITY_CACHE_PATH"), help="Shared entity cache to invalidate after indexing")
+    parser.add_argument("--batch-size", type=int, default=MAX_ENTITIES_PER_COMMIT, help="Entities per put_multi call (max 500)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent put_multi calls")
+    parser.add_argument("--checkpoint", type=Path, default=None, help="File recording indexed documents; rerun with the same file to resume")
+    parser.add_argument("--chunk", action="store_true", help="Chunk, clean and deduplicate documents locally and index one entity per chunk")
+    parser.add_argument("--max-chunk-tokens", type=int, default=512, help="Estimated token limit per chunk with --chunk")
+    parser.add_argument("--chunk-workers", type=int, default=None, help="Processes used by --chunk (0 runs in-process)")
+    parser.add_argument("--local-index", type=Path, default=None, help="Also build a local vector index of the written entries in this directory")
+    parser.add_argument("--embedding-dim", type=int, default=512, help="Dimensions of the local index's hashing embedder")
+    parser.add_argument("--telemetry", type=Path, default=None, help="Record per-stage timings and append the run's breakdown to this JSON lines file")
     args = parser.parse_args()
+    if args.telemetry:
+        telemetry.configure(breakdown_path=args.telemetry)
+        telemetry.start_turn("index_datastore")
 
-    entries = load_entries(args.markdown_dir, args.metadata_file)
     if not args.project:
         raise ValueError("GCP project must be specified via --project or environment variable")
-    index_to_datastore(args.project, args.kind, entries)
+    checkpoint = Checkpoint(args.checkpoint)
+    done = checkpoint.load()
+    if done:
+        print(f"Resuming: skipping {len(done)} documents already indexed")
+    # The local index is rebuilt from every document, so it also covers those written by earlier runs.
+    skip = None if args.local_index else done
+    if args.chunk:
+        config = ChunkingConfig(max_tokens=args.max_chunk_tokens, workers=args.chunk_workers)
+        entries = load_chunks(args.markdown_dir, args.metadata_file, config, skip=skip)
+    else:
+        entries = load_entries(args.markdown_dir, args.metadata_file, skip=skip)
+    builder = None
+    if args.local_index:
+        builder = VectorIndexBuilder(args.local_index, HashingEmbedder(dim=args.embedding_dim))
+        entries = builder.tap(entries, to_index_document)
+        if done:
+            entries = (entry for entry in entries if entry["id"] not in done)
+    # The global endpoint, over a pooled channel shared by the writer threads.
+    client = datastore_client(args.project, "global")
+    written = index_to_datastore(client, args.kind, entries, args.batch_size, args.workers, checkpoint)
+    if builder is not None:
+        index = builder.build()
+        print(f"Built local index of {len(index)} entries at {args.local_index}")
+    invalidate_entities(args.kind, written, args.entity_cache_path)
+    telemetry.end_turn()
 
 
 if __name__ == "__main__":
@@ -1,15 +1,38 @@
-"""Upload markdown documents with metadata to a Vertex AI RAG Engine corpus."""
+"""Upload markdown documents with metadata to a Vertex AI RAG Engine corpus.
+
+With ``--sync`` only new or changed documents are uploaded and documents that
+disappeared from ``--markdown-dir`` are deleted from the corpus; a local
+manifest of content hashes and RAG file names tracks what the corpus holds.
+
+After changing the corpus the script bumps its generation in the
+``--generations`` document (``corpus_generations_path`` in ``agent.yaml`` by
+default), so running agents drop their cached retrieval results for it.
+"""
 
 import argparse
 import json
 import os
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from dotenv import load_dotenv
 import vertexai
 from vertexai.preview import rag
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import agent_config
+from app.utils import telemetry
+from app.utils.corpus_generation import CorpusGenerations
+from app.utils.embeddings import HashingEmbedder
+from app.utils.ingestion import ChunkingConfig, iter_chunks, read_documents
+from app.utils.rag_manifest import RagManifest, content_hash
+from app.utils.retrieval_cache import invalidate_corpus
+from app.utils.vector_index import VectorIndexBuilder
+
 
 def load_entries(md_dir: Path, metadata_file: Path) -> List[Dict[str, Any]]:
     """Load file paths and metadata."""
@@ -29,21 +52,168 @@ def load_entries(md_dir: Path, metadata_file: Path) -> List[Dict[str, Any]]:
     return entries
 
 
-def upload_to_rag(corpus: str, project: str, location: str, entries: List[Dict[str, Any]]) -> None:
+def write_chunks(md_dir: Path, metadata_file: Path, chunk_dir: Path, config: ChunkingConfig) -> List[Dict[str, Any]]:
+    """Preprocess the documents locally and write one file per chunk to ``chunk_dir``.
+
+    Returns:
+      List[Dict[str, Any]]: Upload entries for the chunk files, shaped like ``load_entries``.
+    """
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+    entries: List[Dict[str, Any]] = []
+    for chunk in iter_chunks(read_documents(md_dir, metadata_file), config):
+        path = chunk_dir / (chunk["id"].replace("/", "_").replace("#", "__") + ".md")
+        path.write_text(chunk["content"], encoding="utf-8")
+        entries.append(
+            {
+                "path": path,
+                "display_name": chunk["id"],
+                "metadata": {**chunk["metadata"], "doc_id": chunk["doc_id"], "section": chunk["title"]},
+            }
+        )
+    return entries
+
+
+def build_local_index(path: Path, entries: List[Dict[str, Any]], embedding_dim: int = 512) -> None:
+    """Build a local vector index over the files that are uploaded to the corpus."""
+    builder = VectorIndexBuilder(path, HashingEmbedder(dim=embedding_dim))
+    for entry in entries:
+        builder.add(
+            {
+                "id": entry["display_name"],
+                "title": entry["metadata"].get("title") or entry["metadata"].get("section") or entry["display_name"],
+                "content": entry["path"].read_text(encoding="utf-8"),
+                "source_uri": entry["metadata"].get("doc_id") or entry["display_name"],
+            }
+        )
+    index = builder.build()
+    print(f"Built local index of {len(index)} entries at {path}")
+
+
+def mark_reindexed(corpus: str, generations: Optional[CorpusGenerations]) -> None:
+    """Invalidate cached retrieval results for ``corpus`` in this process and in the agents reading ``generations``."""
+    invalidate_corpus(corpus)
+    if generations is None:
+        print("No --generations document: running agents keep serving cached results until they expire")
+        return
+    print(f"Corpus '{corpus}' is now at generation {generations.bump(corpus)} in {generations.location}")
+
+
+def upload_to_rag(
+    corpus: str,
+    project: str,
+    location: str,
+    entries: List[Dict[str, Any]],
+    transformation_config: Optional[rag.TransformationConfig] = None,
+    generations: Optional[CorpusGenerations] = None,
+) -> None:
     """Upload the files to an existing RAG corpus."""
     vertexai.init(project=project, location=location)
     for entry in entries:
         description = json.dumps(entry["metadata"])
         print(entry)
-        rag.upload_file(
-            corpus_name=corpus,
-            path=str(entry["path"]),
-            display_name=entry["display_name"],
-            description=description,
-        )
+        with telemetry.stage("index.upload_file", payload_bytes=entry["path"].stat().st_size):
+            rag.upload_file(
+                corpus_name=corpus,
+                path=str(entry["path"]),
+                display_name=entry["display_name"],
+                description=description,
+                transformation_config=transformation_config,
+            )
+    mark_reindexed(corpus, generations)
     print(f"Uploaded {len(entries)} files to corpus '{corpus}'")
 
 
+def sync_to_rag(
+    corpus: str,
+    project: str,
+    location: str,
+    entries: List[Dict[str, Any]],
+    manifest: RagManifest,
+    workers: int = 4,
+    transformation_config: Optional[rag.TransformationConfig] = None,
+    generations: Optional[CorpusGenerations] = None,
+) -> Dict[str, Exception]:
+    """Bring the corpus in line with ``entries``, touching only what changed since the manifest was saved.
+
+    Changed documents are uploaded before their old RAG file is deleted, so they
+    stay retrievable throughout. Each upload is recorded in the manifest as soon
+    as it finishes, and the manifest is saved after every change, so an
+    interrupted sync resumes where it stopped without uploading a file twice.
+    A failed upload or deletion is reported and left for the next sync instead
+    of stopping the others.
+
+    Returns:
+      Dict[str, Exception]: The error per display name that could not be synced.
+    """
+    vertexai.init(project=project, location=location)
+    start = time.monotonic()
+    present = {entry["display_name"]: entry for entry in entries if entry["path"].exists()}
+    hashes = {name: content_hash(entry["path"], json.dumps(entry["metadata"], sort_keys=True)) for name, entry in present.items()}
+    new, changed, removed = manifest.diff(hashes)
+    failures: Dict[str, Exception] = {}
+    recorded = set()
+
+    def upload(name: str):
+        entry = present[name]
+        with telemetry.stage("index.upload_file", payload_bytes=entry["path"].stat().st_size):
+            return rag.upload_file(
+                corpus_name=corpus,
+                path=str(entry["path"]),
+                display_name=name,
+                description=json.dumps(entry["metadata"]),
+                transformation_config=transformation_config,
+            )
+
+    def record(name: str, future: Future) -> None:
+        recorded.add(name)
+        try:
+            rag_file = future.result()
+        except Exception as error:
+            failures[name] = error
+            print(f"Uploading {name} failed: {error}")
+            return
+        previous = manifest.files.get(name)
+        manifest.set(name, hashes[name], rag_file.name)
+        manifest.save()
+        if previous is not None:
+            try:
+                rag.delete_file(name=previous.rag_file)
+            except Exception as error:
+                failures[name] = error
+                print(f"Deleting {previous.rag_file}, the previous RAG file of {name}, failed: {error}")
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = {executor.submit(telemetry.in_context(upload), name): name for name in new + changed}
+    try:
+        for future in as_completed(futures):
+            record(futures[future], future)
+    finally:
+        # When interrupted, let the running uploads finish and record them too, so
+        # the next sync does not upload them again.
+        executor.shutdown(wait=True, cancel_futures=True)
+        for future, name in futures.items():
+            if name not in recorded and future.done() and not future.cancelled():
+                record(name, future)
+
+    for name in removed:
+        try:
+            rag.delete_file(name=manifest.files[name].rag_file)
+        except Exception as error:
+            failures[name] = error
+            print(f"Deleting {name} failed: {error}")
+            continue
+        manifest.remove(name)
+        manifest.save()
+
+    if len(failures) < len(new) + len(changed) + len(removed):
+        mark_reindexed(corpus, generations)
+    print(
+        f"Synced corpus '{corpus}' in {time.monotonic() - start:.1f}s: {len(new)} new, {len(changed)} changed, "
+        f"{len(removed)} removed, {len(present) - len(new) - len(changed)} unchanged, {len(failures)} failed"
+    )
+    return failures
+
+
 def main() -> None:
     load_dotenv()
     parser = argparse.ArgumentParser(description="Upload markdown files to a RAG corpus")
@@ -52,15 +222,55 @@ def main() -> None:
     parser.add_argument("--corpus", default=os.getenv("RAG_CORPUS"), help="RAG corpus name")
     parser.add_argument("--project", default=os.getenv("GOOGLE_CLOUD_PROJECT"), help="GCP project id")
     parser.add_argument("--location", default=os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1"), help="GCP region")
+    parser.add_argument("--sync", action="store_true", help="Upload only new or changed files and delete removed ones")
+    parser.add_argument("--manifest", type=Path, default=Path(".rag_manifest.json"), help="Manifest of uploaded files used by --sync")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent uploads in --sync mode")
+    parser.add_argument("--chunk", action="store_true", help="Chunk, clean and deduplicate documents locally and upload one file per chunk")
+    parser.add_argument("--chunk-dir", type=Path, default=Path(".rag_chunks"), help="Where --chunk writes the chunk files")
+    parser.add_argument("--max-chunk-tokens", type=int, default=512, help="Estimated token limit per chunk with --chunk")
+    parser.add_argument("--chunk-workers", type=int, default=None, help="Processes used by --chunk (0 runs in-process)")
+    parser.add_argument("--local-index", type=Path, default=None, help="Also build a local vector index of the uploaded files in this directory")
+    parser.add_argument("--embedding-dim", type=int, default=512, help="Dimensions of the local index's hashing embedder")
+    parser.add_argument(
+        "--generations",
+        default=os.getenv("RAG_CORPUS_GENERATIONS", agent_config.corpus_generations_path),
+        help="Path or gs:// URI of the corpus generations document the agent reads, bumped after changes",
+    )
+    parser.add_argument("--telemetry", type=Path, default=None, help="Record per-stage timings and append the run's breakdown to this JSON lines file")
     args = parser.parse_args()
+    if args.telemetry:
+        telemetry.configure(breakdown_path=args.telemetry)
+        telemetry.start_turn("index_rag_engine")
 
     if not args.corpus:
         raise ValueError("RAG corpus must be specified via --corpus or environment variable")
     if not args.project:
         raise ValueError("GCP project must be specified via --project or environment variable")
 
-    entries = load_entries(args.markdown_dir, args.metadata_file)
-    upload_to_rag(args.corpus, args.project, args.location, entries)
+    transformation_config = None
+    if args.chunk:
+        config = ChunkingConfig(max_tokens=args.max_chunk_tokens, workers=args.chunk_workers)
+        entries = write_chunks(args.markdown_dir, args.metadata_file, args.chunk_dir, config)
+        # Chunks are already sized; make the server-side chunk large enough to keep each one whole.
+        transformation_config = rag.TransformationConfig(
+            chunking_config=rag.ChunkingConfig(chunk_size=2 * args.max_chunk_tokens, chunk_overlap=0)
+        )
+    else:
+        entries = load_entries(args.markdown_dir, args.metadata_file)
+    if args.local_index:
+        build_local_index(args.local_index, entries, args.embedding_dim)
+    generations = CorpusGenerations(args.generations) if args.generations else None
+    if args.sync:
+        manifest = RagManifest(args.manifest, args.corpus)
+        failures = sync_to_rag(
+            args.corpus, args.project, args.location, entries, manifest, args.workers, transformation_config, generations
+        )
+    else:
+        failures = {}
+        upload_to_rag(args.corpus, args.project, args.location, entries, transformation_config, generations)
+    telemetry.end_turn()
+    if failures:
+        sys.exit(f"{len(failures)} files could not be synced; rerun --sync to retry them")
 
 
 if __name__ == "__main__":
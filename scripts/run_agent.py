@@ -1,20 +1,61 @@
-import os
-import json
+"""Talk to the deployed agent, or drive it with concurrent replayed conversations.
+
+Without arguments this is an interactive chat. With ``--conversations FILE`` it
+replays the conversations in FILE across ``--sessions`` concurrent sessions
+through ``async_stream_query`` and prints, as each turn finishes, its time to the
+first event, to the first answer text (time to first token) and to the final
+answer; a latency and throughput summary follows the run.
+
+FILE is a JSON list whose items are a message, a list of messages, an object
+with ``"turns"`` (a list of messages) or an eval case with ``"query"``, so
+``eval/data/conversation.test.json`` can be replayed as is.
+
+Usage:
+  python scripts/run_agent.py
+  python scripts/run_agent.py --conversations eval/data/conversation.test.json --sessions 16 --repeat 4
+"""
+
+import argparse
 import asyncio
+import json
+import os
+import reprlib
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, List, Optional
+
 from dotenv import load_dotenv
 import vertexai
 from vertexai import agent_engines
 from google.adk.sessions import VertexAiSessionService
 
-import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.config import deployment_config
 
+PREVIEW_LENGTH = 100
+
+# Bounded repr: stops descending into large function call arguments and
+# responses instead of serializing them whole just to cut them short.
+_preview = reprlib.Repr()
+_preview.maxlevel = 3
+_preview.maxdict = 4
+_preview.maxlist = 4
+_preview.maxstring = PREVIEW_LENGTH
+_preview.maxother = PREVIEW_LENGTH
+
+
+def preview(value: Any) -> str:
+    text = _preview.repr(value)
+    return text if len(text) <= PREVIEW_LENGTH else text[: PREVIEW_LENGTH - 3] + "..."
+
 
 def pretty_print_event(event: dict) -> None:
     if "content" not in event:
-        print(f"[{event.get('author', 'unknown')}]: {event}")
+        print(f"[{event.get('author', 'unknown')}]: {preview(event)}")
         return
     author = event.get("author", "unknown")
     parts = event["content"].get("parts", [])
@@ -24,29 +65,185 @@ def pretty_print_event(event: dict) -> None:
             print(f"[{author}]: {text}")
         elif "functionCall" in part:
             func_call = part["functionCall"]
-            args = json.dumps(func_call.get("args", {}))
-            if len(args) > 100:
-                args = args[:97] + "..."
-            print(f"[{author}]: Function call {func_call.get('name', '')} {args}")
+            print(f"[{author}]: Function call {func_call.get('name', '')} {preview(func_call.get('args', {}))}")
         elif "functionResponse" in part:
             func_response = part["functionResponse"]
-            response = json.dumps(func_response.get("response", {}))
-            if len(response) > 100:
-                response = response[:97] + "..."
-            print(f"[{author}]: Function response {func_response.get('name', '')} {response}")
+            print(f"[{author}]: Function response {func_response.get('name', '')} {preview(func_response.get('response', {}))}")
+
+
+def load_conversations(path: Path) -> List[List[str]]:
+    """Read the conversations to replay, each as its list of user messages."""
+    conversations: List[List[str]] = []
+    for item in json.loads(path.read_text(encoding="utf-8")):
+        if isinstance(item, str):
+            conversations.append([item])
+        elif isinstance(item, list):
+            conversations.append(list(item))
+        elif "turns" in item:
+            conversations.append(list(item["turns"]))
+        else:
+            conversations.append([item["query"]])
+    return conversations
+
+
+@dataclass
+class TurnResult:
+    """
+    Timings of one replayed turn, in milliseconds from sending the message.
+
+    Attributes:
+      session (int): Index of the concurrent session that ran the turn.
+      conversation (int): Index of the conversation in the replayed list.
+      turn (int): Index of the message in its conversation.
+      first_event_ms (Optional[float]): First streamed event of any kind.
+      first_token_ms (Optional[float]): First event carrying answer text.
+      final_ms (float): End of the stream, i.e. the final answer.
+      events (int): Events streamed.
+      tool_calls (int): Function calls the agent made.
+      error (Optional[str]): The exception that ended the turn, if any.
+    """
+
+    session: int
+    conversation: int
+    turn: int
+    first_event_ms: Optional[float]
+    first_token_ms: Optional[float]
+    final_ms: float
+    events: int
+    tool_calls: int
+    error: Optional[str] = None
+
+
+async def stream_events(agent_engine: Any, user_id: str, session_id: str, message: str) -> AsyncIterator[dict]:
+    """Stream the events of one turn, off the event loop for agents deployed without ``async_stream_query``."""
+    if hasattr(agent_engine, "async_stream_query"):
+        async for event in agent_engine.async_stream_query(user_id=user_id, session_id=session_id, message=message):
+            yield event
+        return
+    events = iter(agent_engine.stream_query(user_id=user_id, session_id=session_id, message=message))
+    done = object()
+    while (event := await asyncio.to_thread(next, events, done)) is not done:
+        yield event
+
+
+async def run_turn(agent_engine: Any, user_id: str, session_id: str, message: str, result: TurnResult) -> None:
+    start = time.perf_counter()
+    try:
+        async for event in stream_events(agent_engine, user_id, session_id, message):
+            elapsed = (time.perf_counter() - start) * 1000
+            result.events += 1
+            if result.first_event_ms is None:
+                result.first_event_ms = elapsed
+            for part in event.get("content", {}).get("parts", []):
+                if "functionCall" in part:
+                    result.tool_calls += 1
+                elif result.first_token_ms is None and part.get("text"):
+                    result.first_token_ms = elapsed
+    except Exception as e:  # reported per turn; the session moves on to its next conversation
+        result.error = f"{type(e).__name__}: {e}"
+    result.final_ms = (time.perf_counter() - start) * 1000
+
+
+async def run_load(
+    agent_engine: Any,
+    session_service: VertexAiSessionService,
+    app_name: str,
+    conversations: List[List[str]],
+    sessions: int,
+    keep_sessions: bool,
+    report: Callable[[TurnResult], None],
+) -> None:
+    """Replay ``conversations`` from ``sessions`` concurrent workers, each conversation in a new session."""
+    pending = iter(enumerate(conversations))
+
+    async def worker(index: int) -> None:
+        user_id = f"load-user-{index}"
+        for conversation_index, messages in pending:
+            session = await session_service.create_session(app_name=app_name, user_id=user_id)
+            try:
+                for turn, message in enumerate(messages):
+                    result = TurnResult(index, conversation_index, turn, None, None, 0.0, 0, 0)
+                    await run_turn(agent_engine, user_id, session.id, message, result)
+                    report(result)
+                    if result.error:
+                        break
+            finally:
+                if not keep_sessions:
+                    await session_service.delete_session(app_name=app_name, user_id=user_id, session_id=session.id)
+
+    await asyncio.gather(*(worker(i) for i in range(sessions)))
+
+
+def _fmt_ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.0f}ms"
+
+
+def _percentiles(values: List[float]) -> str:
+    if not values:
+        return "n/a"
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return f"p50 {statistics.median(values):.0f}ms p95 {pick(0.95):.0f}ms p99 {pick(0.99):.0f}ms"
+
+
+def load_test(agent_engine: Any, session_service: VertexAiSessionService, app_name: str, args: argparse.Namespace) -> None:
+    conversations = load_conversations(args.conversations) * args.repeat
+    results: List[TurnResult] = []
+    output = args.output.open("a", encoding="utf-8") if args.output else None
+
+    def report(result: TurnResult) -> None:
+        results.append(result)
+        print(
+            f"session {result.session} conversation {result.conversation} turn {result.turn}: "
+            f"first event {_fmt_ms(result.first_event_ms)} first token {_fmt_ms(result.first_token_ms)} "
+            f"final {_fmt_ms(result.final_ms)} events {result.events} tool calls {result.tool_calls}"
+            + (f" ERROR {result.error}" if result.error else ""),
+            flush=True,
+        )
+        if output:
+            output.write(json.dumps(asdict(result)) + "\n")
+
+    start = time.perf_counter()
+    try:
+        asyncio.run(
+            run_load(agent_engine, session_service, app_name, conversations, args.sessions, args.keep_sessions, report)
+        )
+    finally:
+        if output:
+            output.close()
+    elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if r.error is None]
+    print(
+        f"{len(results)} turns in {elapsed:.1f}s ({len(results) / elapsed:.2f} turns/s) "
+        f"over {args.sessions} sessions, {len(results) - len(ok)} errors"
+    )
+    print(f"  first token: {_percentiles([r.first_token_ms for r in ok if r.first_token_ms is not None])}")
+    print(f"  final answer: {_percentiles([r.final_ms for r in ok])}")
 
 
 def main() -> None:
     load_dotenv()
+    parser = argparse.ArgumentParser(description="Chat with the deployed agent or replay conversations against it")
+    parser.add_argument("--conversations", type=Path, default=None, help="Replay these conversations instead of chatting")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent sessions when replaying")
+    parser.add_argument("--repeat", type=int, default=1, help="Times to replay the conversations")
+    parser.add_argument("--output", type=Path, default=None, help="Append per-turn timings to this JSON lines file")
+    parser.add_argument("--keep-sessions", action="store_true", help="Do not delete the replayed sessions")
+    args = parser.parse_args()
+
     vertexai.init(project=deployment_config.project, location=deployment_config.location)
     session_service = VertexAiSessionService(project=deployment_config.project, location=deployment_config.location)
     agent_engine_id = os.getenv("AGENT_ENGINE_ID")
     if not agent_engine_id:
         raise RuntimeError("AGENT_ENGINE_ID not set. Deploy the agent first.")
-
-    session = asyncio.run(session_service.create_session(app_name=agent_engine_id, user_id="local-user"))
     agent_engine = agent_engines.get(agent_engine_id)
 
+    if args.conversations:
+        load_test(agent_engine, session_service, agent_engine_id, args)
+        return
+
+    session = asyncio.run(session_service.create_session(app_name=agent_engine_id, user_id="local-user"))
     while True:
         query = input("\n[user]: ")
         if not query:
@@ -57,4 +254,3 @@ def main() -> None:
 
 if __name__ == "__main__":
     main()
-
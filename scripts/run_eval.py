@@ -0,0 +1,410 @@
+"""Run the eval conversations against the local agent concurrently, with cached model and tool calls.
+
+Each case runs in its own session of an in-memory runner, at most ``--workers``
+at a time. Model responses and tool outputs are cached on disk under
+``--cache-dir``, keyed by a hash of their full input (the model request, or the
+tool name and arguments), so a case whose prompts, tools and data are unchanged
+replays without calling Gemini or the retrieval backends. The cache is safe to
+share between processes, so ``--num-shards``/``--shard-index`` can split the
+dataset across machines or processes and ``--merge`` summarizes their outputs.
+
+Per case the runner reports the scores ``AgentEvaluator`` uses (tool trajectory
+exact match and ROUGE-1 response match), retrieval recall@k and MRR, and the
+latency to the first event and to the end of the turn.
+
+Retrieval metrics use a case's ``relevant_documents`` (document ids, source URIs
+or titles) when present. Otherwise a retrieved document counts as relevant when
+at least ``--relevance-threshold`` of its words appear in the reference answer,
+and recall is measured against the relevant documents retrieved anywhere in the
+turn.
+
+Usage:
+  python scripts/run_eval.py --workers 8 --output eval_results.jsonl
+  python scripts/run_eval.py --num-shards 4 --shard-index 0 --output shard0.jsonl
+  python scripts/run_eval.py --merge shard*.jsonl
+"""
+
+import argparse
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from dotenv import load_dotenv
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+EVAL_DIR = Path(__file__).resolve().parent.parent / "eval" / "data"
+_WORD_RE = re.compile(r"\w+")
+
+# Counters of the case running in the current task; tool calls made on
+# tasks spawned by the runner share the same dict.
+_case_stats: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar("eval_case_stats", default=None)
+
+
+def _count(key: str) -> None:
+    stats = _case_stats.get()
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + 1
+
+
+class ResponseCache:
+    """
+    On-disk JSON values keyed by the SHA-256 of their input, one file per value.
+
+    Files are written to a temporary name and renamed into place, so concurrent
+    processes sharing the directory never read a partial value.
+
+    Attributes:
+      path (Path): Cache directory.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(namespace: str, payload: Any) -> str:
+        data = json.dumps(payload, sort_keys=True, default=str)
+        return f"{namespace}-{hashlib.sha256(data.encode('utf-8')).hexdigest()}"
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            with (self.path / f"{key}.json").open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, value: Any) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp, self.path / f"{key}.json")
+
+
+def _strip_call_ids(value: Any) -> Any:
+    """Drop the per-run function call ids, which would make every request key unique."""
+    if isinstance(value, dict):
+        return {
+            k: _strip_call_ids(v)
+            for k, v in value.items()
+            if not (k == "id" and isinstance(v, str) and v.startswith("adk-"))
+        }
+    if isinstance(value, list):
+        return [_strip_call_ids(v) for v in value]
+    return value
+
+
+class EvalCachePlugin(BasePlugin):
+    """
+    Serves model responses and tool outputs from a ``ResponseCache`` when their
+    input was seen before, and stores them otherwise.
+
+    Only complete, successful model responses and JSON-serializable tool
+    outputs are cached.
+    """
+
+    def __init__(self, cache: ResponseCache) -> None:
+        super().__init__(name="eval_cache")
+        self.cache = cache
+        # Invocation id -> key of the model request awaiting its response.
+        self._pending: Dict[str, str] = {}
+        # Function call id -> key of the tool call awaiting its output.
+        self._pending_tools: Dict[str, str] = {}
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        _count("model_calls")
+        request = llm_request.model_dump(mode="json", exclude_none=True, exclude={"live_connect_config"})
+        key = self.cache.key("model", _strip_call_ids(request))
+        cached = self.cache.get(key)
+        if cached is not None:
+            _count("model_cache_hits")
+            return LlmResponse.model_validate(cached)
+        self._pending[callback_context.invocation_id] = key
+        return None
+
+    async def after_model_callback(
+        self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        key = self._pending.pop(callback_context.invocation_id, None)
+        if key is not None and not llm_response.partial and not llm_response.error_code:
+            self.cache.put(key, llm_response.model_dump(mode="json", exclude_none=True))
+        return None
+
+    async def before_tool_callback(
+        self, *, tool: BaseTool, tool_args: Dict[str, Any], tool_context: ToolContext
+    ) -> Optional[dict]:
+        _count("tool_calls")
+        key = self.cache.key("tool", [tool.name, tool_args])
+        cached = self.cache.get(key)
+        if cached is not None:
+            _count("tool_cache_hits")
+            return cached
+        self._pending_tools[tool_context.function_call_id] = key
+        return None
+
+    async def after_tool_callback(
+        self, *, tool: BaseTool, tool_args: Dict[str, Any], tool_context: ToolContext, result: Any
+    ) -> Optional[dict]:
+        key = self._pending_tools.pop(tool_context.function_call_id, None)
+        if key is None:
+            return None
+        value = result if isinstance(result, dict) else {"result": result}
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            return None
+        self.cache.put(key, value)
+        return None
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def rouge_1(candidate: str, reference: str) -> float:
+    """Unigram F1 between ``candidate`` and ``reference``, as ``response_match_score`` measures."""
+    candidate_counts, reference_counts = Counter(_words(candidate)), Counter(_words(reference))
+    overlap = sum((candidate_counts & reference_counts).values())
+    if not overlap:
+        return 0.0
+    precision = overlap / sum(candidate_counts.values())
+    recall = overlap / sum(reference_counts.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def retrieved_documents(response: Any) -> List[Dict[str, str]]:
+    """Collect the documents in a tool response, in order, whatever shape the tool returns them in."""
+    documents: List[Dict[str, str]] = []
+
+    def walk(value: Any) -> None:
+        if isinstance(value, dict):
+            content = value.get("content") or value.get("text")
+            if isinstance(content, str):
+                documents.append({
+                    "id": str(value.get("id") or value.get("source_uri") or value.get("title") or hashlib.sha1(content.encode()).hexdigest()),
+                    "source_uri": str(value.get("source_uri", "")),
+                    "title": str(value.get("title", "")),
+                    "content": content,
+                })
+                return
+            for item in value.values():
+                walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, str):
+                    documents.append({"id": hashlib.sha1(item.encode()).hexdigest(), "source_uri": "", "title": "", "content": item})
+                else:
+                    walk(item)
+
+    walk(response)
+    return documents
+
+
+def retrieval_metrics(
+    documents: List[Dict[str, str]], case: Dict[str, Any], k: int, threshold: float
+) -> Dict[str, Optional[float]]:
+    """Return ``recall@k`` and ``mrr`` of the deduplicated ``documents``; None when nothing relevant is known."""
+    seen = set()
+    ranked = [d for d in documents if not (d["id"] in seen or seen.add(d["id"]))]
+    labels = case.get("relevant_documents")
+    if labels:
+        labels = set(labels)
+        relevant = [bool(labels & {d["id"], d["source_uri"], d["title"]}) for d in ranked]
+        total = len(labels)
+    else:
+        reference = set(_words(case.get("reference", "")))
+        relevant = []
+        for d in ranked:
+            # Short words are mostly stopwords that every document shares with the reference.
+            words = {word for word in _words(d["content"]) if len(word) > 3}
+            relevant.append(bool(words) and len(words & reference) / len(words) >= threshold)
+        total = sum(relevant)
+    if not total:
+        return {f"recall@{k}": None, "mrr": None}
+    first = next((rank for rank, hit in enumerate(relevant, 1) if hit), None)
+    return {f"recall@{k}": min(1.0, sum(relevant[:k]) / total), "mrr": 1 / first if first else 0.0}
+
+
+def tool_trajectory_score(calls: List[Dict[str, Any]], expected: List[Dict[str, Any]]) -> float:
+    """1.0 when the tool calls match the expected ones exactly, in order, as ``tool_trajectory_avg_score`` scores them."""
+    return 1.0 if calls == [{"tool_name": c["tool_name"], "tool_input": c["tool_input"]} for c in expected] else 0.0
+
+
+async def run_case(runner: Any, index: int, case: Dict[str, Any], k: int, threshold: float) -> Dict[str, Any]:
+    """Run one conversation turn in a fresh session and score it."""
+    stats: Dict[str, int] = {}
+    _case_stats.set(stats)
+    user_id = "eval-user"
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id=user_id)
+    message = types.Content(role="user", parts=[types.Part(text=case["query"])])
+
+    calls: List[Dict[str, Any]] = []
+    documents: List[Dict[str, str]] = []
+    answer = ""
+    first_event_ms: Optional[float] = None
+    error: Optional[str] = None
+    start = time.perf_counter()
+    try:
+        async for event in runner.run_async(user_id=user_id, session_id=session.id, new_message=message):
+            if first_event_ms is None:
+                first_event_ms = (time.perf_counter() - start) * 1000
+            for call in event.get_function_calls():
+                calls.append({"tool_name": call.name, "tool_input": dict(call.args or {})})
+            for response in event.get_function_responses():
+                documents.extend(retrieved_documents(response.response))
+            if event.is_final_response() and event.content and event.content.parts:
+                answer = "".join(part.text or "" for part in event.content.parts if not part.thought)
+    except Exception as e:  # a failed case is reported, not fatal to the run
+        error = f"{type(e).__name__}: {e}"
+    total_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        "index": index,
+        "query": case["query"],
+        "answer": answer,
+        "error": error,
+        "tool_trajectory_avg_score": tool_trajectory_score(calls, case.get("expected_tool_use") or []),
+        "response_match_score": rouge_1(answer, case.get("reference", "")),
+        **retrieval_metrics(documents, case, k, threshold),
+        "retrieved": len(documents),
+        "first_event_ms": round(first_event_ms or total_ms, 1),
+        "total_ms": round(total_ms, 1),
+        **stats,
+    }
+
+
+async def run_cases(
+    cases: List[tuple], workers: int, cache_dir: Optional[Path], k: int, threshold: float, output: Optional[Path]
+) -> List[Dict[str, Any]]:
+    """Run ``(index, case)`` pairs with at most ``workers`` in flight, appending each result to ``output`` as it finishes."""
+    from google.adk.runners import InMemoryRunner
+
+    from app.agent import root_agent
+
+    plugins = [EvalCachePlugin(ResponseCache(cache_dir))] if cache_dir else []
+    runner = InMemoryRunner(agent=root_agent, app_name=f"eval-{uuid.uuid4().hex[:8]}", plugins=plugins)
+    semaphore = asyncio.Semaphore(workers)
+    results: List[Dict[str, Any]] = []
+    out = output.open("a", encoding="utf-8") if output else None
+
+    async def run_one(index: int, case: Dict[str, Any]) -> None:
+        async with semaphore:
+            result = await run_case(runner, index, case, k, threshold)
+        results.append(result)
+        print(
+            f"[{index}] {result['total_ms']:.0f}ms first event {result['first_event_ms']:.0f}ms "
+            f"response {result['response_match_score']:.2f} trajectory {result['tool_trajectory_avg_score']:.0f} "
+            f"recall@{k} {_fmt(result[f'recall@{k}'])} mrr {_fmt(result['mrr'])}"
+            f"{' ERROR ' + result['error'] if result['error'] else ''}",
+            flush=True,
+        )
+        if out:
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+
+    try:
+        await asyncio.gather(*(run_one(index, case) for index, case in cases))
+    finally:
+        if out:
+            out.close()
+        await runner.close()
+    return sorted(results, key=lambda r: r["index"])
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"{value:.2f}"
+
+
+def _mean(values: Iterable[Optional[float]]) -> Optional[float]:
+    values = [v for v in values if v is not None]
+    return statistics.fmean(values) if values else None
+
+
+def summarize(results: List[Dict[str, Any]], criteria: Dict[str, float]) -> bool:
+    """Print aggregate scores and latency; return whether every criterion in ``criteria`` is met."""
+    if not results:
+        print("No results")
+        return False
+    recall_key = next((key for key in results[0] if key.startswith("recall@")), "recall@5")
+    latencies = sorted(r["total_ms"] for r in results)
+    scores = {
+        "tool_trajectory_avg_score": _mean(r["tool_trajectory_avg_score"] for r in results),
+        "response_match_score": _mean(r["response_match_score"] for r in results),
+        recall_key: _mean(r.get(recall_key) for r in results),
+        "mrr": _mean(r.get("mrr") for r in results),
+    }
+    model_calls = sum(r.get("model_calls", 0) for r in results)
+    tool_calls = sum(r.get("tool_calls", 0) for r in results)
+    print(f"{len(results)} cases, {sum(1 for r in results if r['error'])} errors")
+    for name, value in scores.items():
+        threshold = criteria.get(name)
+        print(f"  {name}: {_fmt(value)}" + (f" (threshold {threshold})" if threshold is not None else ""))
+    print(
+        f"  latency p50 {statistics.median(latencies):.0f}ms p95 {latencies[int(0.95 * (len(latencies) - 1))]:.0f}ms, "
+        f"first event p50 {statistics.median(r['first_event_ms'] for r in results):.0f}ms"
+    )
+    print(
+        f"  cache hits: model {sum(r.get('model_cache_hits', 0) for r in results)}/{model_calls}, "
+        f"tools {sum(r.get('tool_cache_hits', 0) for r in results)}/{tool_calls}"
+    )
+    return all(scores.get(name) is not None and scores[name] >= threshold for name, threshold in criteria.items())
+
+
+def main() -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Run the eval dataset against the agent concurrently")
+    parser.add_argument("--dataset", type=Path, default=EVAL_DIR / "conversation.test.json", help="Eval cases")
+    parser.add_argument("--config", type=Path, default=EVAL_DIR / "test_config.json", help="Pass criteria")
+    parser.add_argument("--workers", type=int, default=4, help="Cases run concurrently")
+    parser.add_argument("--runs", type=int, default=1, help="Times each case is run")
+    parser.add_argument("--cache-dir", type=Path, default=Path(".eval_cache"), help="Model and tool response cache")
+    parser.add_argument("--no-cache", action="store_true", help="Call the model and tools for every case")
+    parser.add_argument("--num-shards", type=int, default=1, help="Split the cases into this many shards")
+    parser.add_argument("--shard-index", type=int, default=0, help="Shard this process runs")
+    parser.add_argument("--k", type=int, default=5, help="Cutoff for recall@k")
+    parser.add_argument("--relevance-threshold", type=float, default=0.3, help="Share of a document's words that must appear in the reference answer for it to count as relevant when a case has no relevant_documents")
+    parser.add_argument("--output", type=Path, default=None, help="Append per-case results to this JSON lines file")
+    parser.add_argument("--merge", type=Path, nargs="+", default=None, help="Summarize these result files instead of running")
+    args = parser.parse_args()
+
+    criteria = json.loads(args.config.read_text(encoding="utf-8")).get("criteria", {})
+    if args.merge:
+        results = [json.loads(line) for path in args.merge for line in path.read_text(encoding="utf-8").splitlines() if line]
+        sys.exit(0 if summarize(results, criteria) else 1)
+
+    if not 0 <= args.shard_index < args.num_shards:
+        raise ValueError("--shard-index must be between 0 and --num-shards - 1")
+    dataset = json.loads(args.dataset.read_text(encoding="utf-8"))
+    cases = [
+        (run * len(dataset) + index, case)
+        for run in range(args.runs)
+        for index, case in enumerate(dataset)
+        if index % args.num_shards == args.shard_index
+    ]
+    results = asyncio.run(
+        run_cases(cases, args.workers, None if args.no_cache else args.cache_dir, args.k, args.relevance_threshold, args.output)
+    )
+    sys.exit(0 if summarize(results, criteria) else 1)
+
+
+if __name__ == "__main__":
+    main()
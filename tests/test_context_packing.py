@@ -0,0 +1,91 @@
+"""Unit tests for ``app.utils.context_packing``."""
+
+from app.utils.context_packing import ContextPacker
+from app.utils.tokens import estimate_tokens
+
+
+FILLER = " ".join(f"Filler sentence number {i} says nothing useful." for i in range(40))
+
+
+def doc(content, title="", **extra):
+    return {"content": content, "title": title, **extra}
+
+
+def test_short_documents_pass_through_in_rank_order():
+    packer = ContextPacker(token_budget=200)
+    documents = [doc("Refunds take five days.", "refunds.md"), doc("Passwords expire yearly.", "passwords.md")]
+
+    packed = packer.pack("refund", documents)
+
+    assert packed == [
+        {"source": "refunds.md", "text": "Refunds take five days."},
+        {"source": "passwords.md", "text": "Passwords expire yearly."},
+    ]
+
+
+def test_source_falls_back_to_uri_then_id():
+    assert ContextPacker.source({"source_uri": "gs://b/a.md", "id": "1"}) == "gs://b/a.md"
+    assert ContextPacker.source({"id": "1"}) == "1"
+
+
+def test_near_duplicate_documents_are_dropped():
+    text = "The refund window is thirty days from the date of purchase for every plan."
+    documents = [doc(text, "a"), doc(text + " Thanks!", "b"), doc("Unrelated text about passwords and logins here.", "c")]
+
+    packed = ContextPacker().pack("refund", documents)
+
+    assert [item["source"] for item in packed] == ["a", "c"]
+
+
+def test_empty_documents_are_skipped():
+    packed = ContextPacker().pack_indexed("refund", [doc(""), doc("   "), doc("Refunds take five days.", "r")])
+
+    assert [index for index, _ in packed] == [2]
+
+
+def test_long_documents_are_trimmed_to_matching_sentences():
+    content = FILLER + " Refunds are issued within five business days. " + FILLER
+    packer = ContextPacker(token_budget=1000, max_document_tokens=40)
+
+    [item] = packer.pack("how long do refunds take", [doc(content, "refunds.md")])
+
+    assert "Refunds are issued within five business days." in item["text"]
+    assert item["text"].startswith("…") and item["text"].endswith("…")
+    assert estimate_tokens(item["text"]) <= 40
+
+
+def test_trim_keeps_the_lead_when_nothing_matches():
+    trimmed = ContextPacker.trim(FILLER, {"refund"}, 20)
+
+    assert trimmed.startswith("Filler sentence number 0")
+    assert trimmed.endswith("…")
+
+
+def test_trim_cuts_a_sentence_that_does_not_fit():
+    sentence = "Refunds " + "really " * 50 + "take time."
+
+    trimmed = ContextPacker.trim(sentence, {"refunds"}, 10)
+
+    assert trimmed.startswith("Refunds really")
+    assert len(trimmed) <= 10 * 4
+
+
+def test_packing_stops_at_the_token_budget():
+    documents = [
+        doc(" ".join(f"Refunds note {i}.{j} is distinct." for j in range(20)), f"d{i}") for i in range(10)
+    ]
+    packer = ContextPacker(token_budget=150, max_document_tokens=60)
+
+    packed = packer.pack("refunds", documents)
+
+    assert 1 < len(packed) < len(documents)
+    assert sum(estimate_tokens(item["text"]) for item in packed) <= 150
+
+
+def test_sentences_split_on_punctuation_and_blank_lines():
+    assert ContextPacker.sentences("One. Two? Three!\n\nFour\nstill four.") == [
+        "One.",
+        "Two?",
+        "Three!",
+        "Four\nstill four.",
+    ]
@@ -0,0 +1,174 @@
+"""Unit tests for ``app.utils.datastore_hydrator`` against an in-memory Datastore client."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+from google.cloud import datastore
+
+from app.utils.datastore_hydrator import (
+    BatchingHydrationSession,
+    DatastoreHydrator,
+    flatten_doc_ids,
+)
+from app.utils.entity_cache import EntityCache
+
+
+class FakeClient:
+    """Serves every key except ``absent`` and defers ``defer_rounds`` rounds of ``deferred_ids``."""
+
+    def __init__(self, absent=(), deferred_ids=(), defer_rounds=0):
+        self.absent = set(absent)
+        self.deferred_ids = set(deferred_ids)
+        self.defer_rounds = defer_rounds
+        self.calls: List[List[str]] = []
+        self._lock = threading.Lock()
+
+    def key(self, kind: str, name: Any) -> datastore.Key:
+        return datastore.Key(kind, name, project="test-project")
+
+    def get_multi(
+        self,
+        keys: List[datastore.Key],
+        missing: Optional[List[Any]] = None,
+        deferred: Optional[List[Any]] = None,
+    ) -> List[datastore.Entity]:
+        with self._lock:
+            self.calls.append([key.name for key in keys])
+            defer = deferred is not None and self.defer_rounds > 0
+            if defer:
+                self.defer_rounds -= 1
+        entities = []
+        for key in keys:
+            if key.name in self.absent:
+                if missing is not None:
+                    missing.append(datastore.Entity(key=key))
+                continue
+            if defer and key.name in self.deferred_ids:
+                deferred.append(key)
+                continue
+            entity = datastore.Entity(key=key)
+            entity["content"] = f"content of {key.name}"
+            entities.append(entity)
+        return list(reversed(entities))
+
+
+def names(entities):
+    return [entity.key.name if entity is not None else None for entity in entities]
+
+
+def test_flatten_doc_ids_walks_nested_lists():
+    assert list(flatten_doc_ids(["a", ["b", ("c", ["d"])], "e"])) == ["a", "b", "c", "d", "e"]
+
+
+def test_fetch_aligns_results_with_requested_ids():
+    client = FakeClient(absent={"gone"})
+    hydrator = DatastoreHydrator(client, "Document")
+
+    entities = hydrator.fetch([["a", "b"], ["b", "gone", "c"]])
+
+    assert names(entities) == ["a", "b", "b", None, "c"]
+    assert client.calls == [["a", "b", "gone", "c"]]
+
+
+def test_fetch_splits_lookups_into_chunks():
+    client = FakeClient()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        hydrator = DatastoreHydrator(client, "Document", executor=pool, chunk_size=3)
+        entities = hydrator.fetch([str(i) for i in range(8)])
+
+    assert names(entities) == [str(i) for i in range(8)]
+    assert sorted(len(call) for call in client.calls) == [2, 3, 3]
+
+
+def test_deferred_keys_are_retried_until_served():
+    client = FakeClient(deferred_ids={"b"}, defer_rounds=2)
+    hydrator = DatastoreHydrator(client, "Document", retry_backoff=0)
+
+    entities = hydrator.fetch(["a", "b", "c"])
+
+    assert names(entities) == ["a", "b", "c"]
+    assert client.calls == [["a", "b", "c"], ["b"], ["b"]]
+
+
+def test_last_attempt_lets_the_client_drain_deferred_keys():
+    client = FakeClient(deferred_ids={"b"}, defer_rounds=10)
+    hydrator = DatastoreHydrator(client, "Document", max_retries=1, retry_backoff=0)
+
+    entities = hydrator.fetch(["a", "b"])
+
+    assert names(entities) == ["a", "b"]
+    assert len(client.calls) == 2
+
+
+def test_session_looks_up_each_id_once():
+    client = FakeClient()
+    session = DatastoreHydrator(client, "Document").session()
+
+    first = session.submit(["a", "b"]).result()
+    second = session.submit(["b", "c", "a"]).result()
+
+    assert names(first) == ["a", "b"]
+    assert names(second) == ["b", "c", "a"]
+    assert client.calls == [["a", "b"], ["c"]]
+
+
+def test_cached_entities_skip_the_lookup():
+    cache = EntityCache(max_entries=16, shared_path=None)
+    client = FakeClient()
+    DatastoreHydrator(client, "Document", cache=cache).fetch(["a", "b"])
+
+    entities = DatastoreHydrator(client, "Document", cache=cache).fetch(["b", "c", "a"])
+
+    assert names(entities) == ["b", "c", "a"]
+    assert client.calls == [["a", "b"], ["c"]]
+
+
+def test_batching_session_merges_submits_within_linger():
+    client = FakeClient()
+    session = BatchingHydrationSession(DatastoreHydrator(client, "Document"), linger=0.05)
+
+    first = session.submit(["a", "b"])
+    second = session.submit(["b", "c"])
+
+    assert names(first.result(timeout=2)) == ["a", "b"]
+    assert names(second.result(timeout=2)) == ["b", "c"]
+    assert client.calls == [["a", "b", "c"]]
+
+
+def test_batching_session_sends_a_full_batch_without_waiting():
+    client = FakeClient()
+    hydrator = DatastoreHydrator(client, "Document", chunk_size=2)
+    session = BatchingHydrationSession(hydrator, linger=60)
+
+    started = time.monotonic()
+    entities = session.submit(["a", "b"]).result(timeout=2)
+
+    assert names(entities) == ["a", "b"]
+    assert time.monotonic() - started < 1
+    session.close()
+
+
+def test_batching_session_close_sends_the_pending_batch():
+    client = FakeClient()
+    session = BatchingHydrationSession(DatastoreHydrator(client, "Document"), linger=60)
+
+    pending = session.submit(["a"])
+    assert not client.calls
+    session.close()
+
+    assert names(pending.result(timeout=2)) == ["a"]
+    assert client.calls == [["a"]]
+
+
+def test_lookup_errors_reach_the_caller():
+    class FailingClient(FakeClient):
+        def get_multi(self, keys, missing=None, deferred=None):
+            raise RuntimeError("unavailable")
+
+    hydrator = DatastoreHydrator(FailingClient(), "Document")
+
+    future = hydrator.submit(["a"])
+
+    assert isinstance(future.exception(timeout=2), RuntimeError)
@@ -0,0 +1,117 @@
+"""Unit tests for ``app.utils.entity_cache``."""
+
+import time
+
+from google.cloud import datastore
+
+from app.utils import entity_cache as entity_cache_module
+from app.utils.entity_cache import EntityCache, SharedEntityStore, invalidate_entities
+
+
+def make_entity(doc_id: str, content: str = "") -> datastore.Entity:
+    entity = datastore.Entity(key=datastore.Key("Document", doc_id, project="test-project"))
+    entity["content"] = content or f"content of {doc_id}"
+    return entity
+
+
+def test_shared_store_round_trips_entities(tmp_path):
+    store = SharedEntityStore(tmp_path / "entities.sqlite")
+    store.put_many("Document", [make_entity("a", "alpha")])
+
+    found = store.get_many("Document", ["a", "b"])
+
+    assert list(found) == ["a"]
+    assert found["a"]["content"] == "alpha"
+    assert store.get_many("Other", ["a"]) == {}
+    store.close()
+
+
+def test_shared_store_reads_more_ids_than_one_statement_binds(tmp_path):
+    store = SharedEntityStore(tmp_path / "entities.sqlite")
+    ids = [str(i) for i in range(entity_cache_module._SQL_CHUNK * 5 + 7)]
+    store.put_many("Document", [make_entity(doc_id) for doc_id in ids])
+
+    found = store.get_many("Document", ids)
+
+    assert sorted(found) == sorted(ids)
+    assert store.invalidate("Document", ids) == len(ids)
+    assert store.get_many("Document", ids) == {}
+    store.close()
+
+
+def test_shared_store_drops_expired_entities(tmp_path, monkeypatch):
+    store = SharedEntityStore(tmp_path / "entities.sqlite", ttl=10)
+    store.put_many("Document", [make_entity("a")])
+    now = time.time()
+    monkeypatch.setattr(entity_cache_module.time, "time", lambda: now + 11)
+
+    assert store.get_many("Document", ["a"]) == {}
+    assert store.stats.expirations == 1
+    store.close()
+
+
+def test_shared_store_counts_generations_per_kind(tmp_path):
+    store = SharedEntityStore(tmp_path / "entities.sqlite")
+
+    assert store.generation("Document") == 0
+    store.invalidate("Document")
+    store.invalidate("Document", ["a"])
+
+    assert store.generation("Document") == 2
+    assert store.generation("Other") == 0
+    store.close()
+
+
+def test_cache_promotes_shared_entities_to_memory(tmp_path):
+    path = tmp_path / "entities.sqlite"
+    writer = EntityCache(shared_path=path)
+    writer.put_many("Document", [make_entity("a")])
+    reader = EntityCache(shared_path=path)
+
+    assert list(reader.get_many("Document", ["a", "b"])) == ["a"]
+    assert reader.shared.stats.hits == 1
+    assert list(reader.get_many("Document", ["a"])) == ["a"]
+    assert reader.shared.stats.hits == 1
+
+
+def test_invalidation_in_another_process_reaches_memory_tier(tmp_path):
+    path = tmp_path / "entities.sqlite"
+    cache = EntityCache(shared_path=path, generation_check_interval=0)
+    cache.put_many("Document", [make_entity("a"), make_entity("b")])
+    assert len(cache.get_many("Document", ["a", "b"])) == 2
+
+    # A separate store stands in for another process on the same host.
+    other = SharedEntityStore(path)
+    other.invalidate("Document", ["a"])
+    other.close()
+
+    assert list(cache.get_many("Document", ["a", "b"])) == ["b"]
+
+
+def test_generation_is_rechecked_only_after_the_interval(tmp_path):
+    path = tmp_path / "entities.sqlite"
+    cache = EntityCache(shared_path=path, generation_check_interval=3600)
+    cache.put_many("Document", [make_entity("a")])
+
+    other = SharedEntityStore(path)
+    other.invalidate("Document")
+    other.close()
+
+    # The memory tier still trusts its generation until the interval passes.
+    assert list(cache.get_many("Document", ["a"])) == ["a"]
+    cache._generations.clear()
+    assert cache.get_many("Document", ["a"]) == {}
+
+
+def test_invalidate_entities_reaches_live_caches_and_the_shared_store(tmp_path):
+    path = tmp_path / "entities.sqlite"
+    cache = EntityCache(shared_path=path)
+    memory_only = EntityCache()
+    cache.put_many("Document", [make_entity("a"), make_entity("b")])
+    memory_only.put_many("Document", [make_entity("a")])
+
+    invalidate_entities("Document", ["a"], shared_path=path)
+
+    assert list(cache.get_many("Document", ["a", "b"])) == ["b"]
+    assert memory_only.get_many("Document", ["a"]) == {}
+    assert list(SharedEntityStore(path).get_many("Document", ["a", "b"])) == ["b"]
@@ -0,0 +1,92 @@
+"""Unit tests for ``app.utils.fusion`` and the hybrid search tool's fusion of backends."""
+
+import pytest
+
+from app.tools.hybrid_tool import HybridSearchTool, document_key
+from app.utils.fusion import reciprocal_rank_fusion
+
+
+def chunk(source, content):
+    return {"source_uri": source, "content": content}
+
+
+class FakeRetriever:
+    def __init__(self, name, documents=None, error=None):
+        self.name = name
+        self.documents = documents or []
+        self.error = error
+
+    async def retrieve(self, query):
+        if self.error is not None:
+            raise self.error
+        return list(self.documents)
+
+
+def test_rrf_rewards_items_found_by_several_lists():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], key=str, k=60)
+
+    assert [item for item, _, _ in fused] == ["c", "a", "b", "d"]
+    item, score, found_in = fused[0]
+    assert score == pytest.approx(1 / 63 + 1 / 61)
+    assert found_in == [0, 1]
+
+
+def test_rrf_counts_an_item_once_per_list():
+    fused = reciprocal_rank_fusion([["a", "a", "b"]], key=str, k=0)
+
+    assert fused == [("a", 1.0, [0]), ("b", pytest.approx(1 / 3), [0])]
+
+
+def test_rrf_weights_scale_each_list():
+    fused = reciprocal_rank_fusion([["a"], ["b"]], key=str, weights=[1.0, 2.0])
+
+    assert [item for item, _, _ in fused] == ["b", "a"]
+
+
+def test_rrf_keeps_the_earliest_list_representative():
+    first = {"id": "1", "from": "first"}
+    second = {"id": "1", "from": "second"}
+
+    [(item, _, _)] = reciprocal_rank_fusion([[first], [second]], key=lambda d: d["id"])
+
+    assert item is first
+
+
+def test_document_key_merges_the_same_chunk_across_backends():
+    assert document_key(chunk("gs://b/docs/a.md", "Refunds take  five days.")) == document_key(
+        chunk("gs://b/docs/a.md", "refunds take five days.")
+    )
+
+
+def test_document_key_separates_same_named_files_and_other_chunks():
+    key = document_key(chunk("gs://b/docs/a.md", "Refunds take five days."))
+
+    assert key != document_key(chunk("gs://b/other/a.md", "Refunds take five days."))
+    assert key != document_key(chunk("gs://b/docs/a.md", "Shipping is free."))
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_fuses_backends_and_skips_failures():
+    shared = chunk("gs://b/a.md", "Refunds take five days.")
+    tool = HybridSearchTool(
+        [
+            FakeRetriever("datastore", [chunk("gs://b/b.md", "Shipping is free."), shared]),
+            FakeRetriever("rag_engine", [dict(shared)]),
+            FakeRetriever("broken", error=RuntimeError("unavailable")),
+        ],
+        top_n=5,
+    )
+
+    documents = await tool.retrieve("refunds")
+
+    assert [document["source_uri"] for document in documents] == ["gs://b/a.md", "gs://b/b.md"]
+    assert documents[0]["retrievers"] == ["datastore", "rag_engine"]
+    assert documents[1]["retrievers"] == ["datastore"]
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_fails_when_every_backend_fails():
+    tool = HybridSearchTool([FakeRetriever("broken", error=RuntimeError("unavailable"))])
+
+    with pytest.raises(RuntimeError, match="every retrieval backend failed"):
+        await tool.retrieve("refunds")
@@ -0,0 +1,221 @@
+"""Unit tests for ``app.utils.hedging``."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.utils.hedging import (
+    CircuitBreaker,
+    CircuitOpenError,
+    HedgedCaller,
+    LatencyTracker,
+    RetrievalTimeoutError,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_latency_tracker_keeps_a_rolling_window():
+    tracker = LatencyTracker(window=3)
+    assert tracker.percentile(50) is None
+    for seconds in (10.0, 1.0, 2.0, 3.0):
+        tracker.record(seconds)
+
+    assert len(tracker) == 3
+    assert tracker.percentile(100) == 3.0
+
+
+def test_breaker_opens_after_consecutive_failures():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_half_open_breaker_admits_one_trial():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.state == "half-open"
+
+    breaker.check()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    breaker.record_success()
+
+    assert breaker.state == "closed"
+    breaker.check()
+
+
+def test_failed_trial_reopens_the_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now = 10
+    breaker.check()
+
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    clock.now = 19
+    assert breaker.state == "open"
+    clock.now = 20
+    assert breaker.state == "half-open"
+
+
+def test_released_trial_frees_the_slot():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    breaker.check()
+
+    breaker.release()
+
+    assert breaker.state == "half-open"
+    breaker.check()
+
+
+@pytest.mark.asyncio
+async def test_call_returns_the_result_and_records_its_latency():
+    caller = HedgedCaller(timeout=1)
+
+    assert await caller.call(lambda a, b=0: a + b, 1, b=2) == 3
+    assert len(caller.latencies) == 1
+    caller.close()
+
+
+@pytest.mark.asyncio
+async def test_hedge_wins_when_the_first_attempt_is_slow():
+    calls = []
+    lock = threading.Lock()
+
+    def backend():
+        with lock:
+            calls.append(time.monotonic())
+            first = len(calls) == 1
+        time.sleep(0.5 if first else 0.01)
+        return "first" if first else "hedge"
+
+    caller = HedgedCaller(timeout=2, hedge_percentile=95, initial_hedge_delay=0.05)
+    started = time.monotonic()
+
+    assert await caller.call(backend) == "hedge"
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.04
+    assert time.monotonic() - started < 0.4
+    caller.close()
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_without_a_percentile():
+    calls = []
+
+    def backend():
+        calls.append(1)
+        time.sleep(0.1)
+        return "done"
+
+    caller = HedgedCaller(timeout=2, initial_hedge_delay=0.01)
+
+    assert await caller.call(backend) == "done"
+    assert len(calls) == 1
+    caller.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_call_times_out_and_counts_as_a_failure():
+    caller = HedgedCaller(timeout=0.05, breaker=CircuitBreaker(failure_threshold=1))
+
+    with pytest.raises(RetrievalTimeoutError, match="did not complete"):
+        await caller.call(time.sleep, 0.3)
+
+    assert caller.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        await caller.call(lambda: "unused")
+    caller.close()
+
+
+@pytest.mark.asyncio
+async def test_backend_errors_propagate_and_count_as_failures():
+    def backend():
+        raise ValueError("bad request")
+
+    caller = HedgedCaller(timeout=1, breaker=CircuitBreaker(failure_threshold=1))
+
+    with pytest.raises(ValueError):
+        await caller.call(backend)
+    assert caller.breaker.state == "open"
+    caller.close()
+
+
+@pytest.mark.asyncio
+async def test_deadline_counts_from_when_the_call_starts_running():
+    caller = HedgedCaller(timeout=0.3, max_workers=1)
+    release = threading.Event()
+    caller.executor.submit(release.wait)
+    asyncio.get_running_loop().call_later(0.2, release.set)
+    started = time.monotonic()
+
+    assert await caller.call(lambda: time.sleep(0.2) or "done") == "done"
+    # Queued plus running time exceeds the deadline; running time alone does not.
+    assert time.monotonic() - started > 0.3
+    caller.close()
+
+
+@pytest.mark.asyncio
+async def test_call_that_never_starts_is_not_a_backend_failure():
+    caller = HedgedCaller(timeout=0.05, max_workers=1, breaker=CircuitBreaker(failure_threshold=1))
+    release = threading.Event()
+    caller.executor.submit(release.wait)
+    calls = []
+
+    try:
+        with pytest.raises(RetrievalTimeoutError, match="did not start"):
+            await caller.call(lambda: calls.append(1))
+        # The queued attempt's executor future is cancelled on the loop's next pass.
+        await asyncio.sleep(0)
+    finally:
+        release.set()
+
+    assert caller.breaker.state == "closed"
+    caller.executor.submit(lambda: None).result(timeout=1)
+    assert calls == []
+    caller.close()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_trial_releases_the_half_open_slot():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    caller = HedgedCaller(timeout=5, breaker=breaker)
+
+    task = asyncio.ensure_future(caller.call(time.sleep, 0.2))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert breaker.state == "half-open"
+    breaker.check()
+    caller.close()
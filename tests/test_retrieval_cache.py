@@ -0,0 +1,126 @@
+"""Unit tests for ``app.utils.retrieval_cache`` and ``app.utils.corpus_generation``."""
+
+import pytest
+
+from app.utils.corpus_generation import CorpusGenerations
+from app.utils.retrieval_cache import RetrievalCache, invalidate_corpus
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Fetcher:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return f"response {self.calls}"
+
+
+def test_exact_hits_ignore_case_and_spacing():
+    cache = RetrievalCache()
+    fetch = Fetcher()
+
+    first = cache.get_or_fetch("Reset my  password", ["corpus"], 10, 0.6, fetch)
+    second = cache.get_or_fetch("reset my password", ["corpus"], 10, 0.6, fetch)
+
+    assert first == second == "response 1"
+    assert fetch.calls == 1
+
+
+def test_request_parameters_are_part_of_the_key():
+    cache = RetrievalCache()
+    cache.set("reset my password", "top 10", ["corpus"], 10, 0.6)
+
+    assert cache.get("reset my password", ["corpus"], 10, 0.6) == "top 10"
+    assert cache.get("reset my password", ["corpus"], 5, 0.6) is None
+    assert cache.get("reset my password", ["other"], 10, 0.6) is None
+
+
+def test_near_duplicate_hits_need_the_threshold():
+    exact = RetrievalCache()
+    near = RetrievalCache(similarity_threshold=0.75)
+    for cache in (exact, near):
+        cache.set("how do I reset my password", "answer", ["corpus"])
+
+    assert exact.get("how can I reset my password", ["corpus"]) is None
+    assert near.get("how can I reset my password", ["corpus"]) == "answer"
+    assert near.get("what is the refund policy", ["corpus"]) is None
+
+
+def test_invalidate_corpus_drops_only_its_entries():
+    cache = RetrievalCache(similarity_threshold=0.75)
+    cache.set("reset my password", "a", ["corpus-a"])
+    cache.set("reset my password", "ab", ["corpus-a", "corpus-b"])
+    cache.set("reset my password", "b", ["corpus-b"])
+
+    invalidate_corpus("corpus-a")
+
+    assert cache.get("reset my password", ["corpus-a"]) is None
+    assert cache.get("reset my password", ["corpus-b", "corpus-a"]) is None
+    assert cache.get("reset my password", ["corpus-b"]) == "b"
+
+
+def test_generations_bump_and_refresh(tmp_path):
+    clock = FakeClock()
+    location = str(tmp_path / "generations.json")
+    reader = CorpusGenerations(location, refresh_interval=30, clock=clock)
+    assert reader.current() == {}
+
+    generation = CorpusGenerations(location).bump("corpus")
+
+    assert reader.current() == {}
+    clock.now = 30
+    assert reader.current() == {"corpus": generation}
+
+
+def test_generations_keep_the_last_values_when_a_read_fails(tmp_path):
+    clock = FakeClock()
+    path = tmp_path / "generations.json"
+    generations = CorpusGenerations(str(path), refresh_interval=30, clock=clock)
+    generation = generations.bump("corpus")
+    assert generations.current() == {"corpus": generation}
+
+    path.write_text("not json")
+    clock.now = 30
+
+    assert generations.current() == {"corpus": generation}
+    assert not generations.due()
+
+
+def test_cache_drops_a_corpus_after_another_process_bumps_it(tmp_path):
+    clock = FakeClock()
+    location = str(tmp_path / "generations.json")
+    cache = RetrievalCache(generations=CorpusGenerations(location, refresh_interval=30, clock=clock))
+    fetch = Fetcher()
+    cache.get_or_fetch("reset my password", ["corpus"], 10, None, fetch)
+    cache.get_or_fetch("reset my password", ["other"], 10, None, fetch)
+
+    # The indexing script runs in another process with its own reader.
+    CorpusGenerations(location).bump("corpus")
+    assert cache.get_or_fetch("reset my password", ["corpus"], 10, None, fetch) == "response 1"
+
+    clock.now = 30
+    assert cache.get_or_fetch("reset my password", ["corpus"], 10, None, fetch) == "response 3"
+    assert cache.get_or_fetch("reset my password", ["other"], 10, None, fetch) == "response 2"
+
+
+@pytest.mark.asyncio
+async def test_async_fetch_shares_the_cache():
+    cache = RetrievalCache()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return "response"
+
+    assert await cache.get_or_fetch_async("reset my password", ["corpus"], 10, None, fetch) == "response"
+    assert await cache.get_or_fetch_async("Reset my password", ["corpus"], 10, None, fetch) == "response"
+    assert cache.get_or_fetch("reset my password", ["corpus"], 10, None, lambda: "fresh") == "response"
+    assert len(calls) == 1
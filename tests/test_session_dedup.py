@@ -0,0 +1,95 @@
+"""Unit tests for ``app.utils.session_dedup``."""
+
+from app.utils.context_packing import ContextPacker
+from app.utils.session_dedup import SessionDeduplicator, sentence_fingerprints
+
+
+REFUNDS = {
+    "id": "refunds-1",
+    "title": "refunds.md",
+    "content": "Refunds are issued within five days. Shipping costs are not refunded.",
+}
+PASSWORDS = {
+    "id": "passwords-1",
+    "title": "passwords.md",
+    "content": "Passwords expire every year.",
+}
+
+
+def test_fingerprints_depend_on_the_chunk_and_the_normalized_sentence():
+    [(sentence, fingerprint)] = sentence_fingerprints({"id": "a", "content": "Hello  World."})
+    [(_, same)] = sentence_fingerprints({"id": "a", "content": "hello world."})
+    [(_, other)] = sentence_fingerprints({"id": "b", "content": "Hello World."})
+
+    assert sentence == "Hello  World."
+    assert fingerprint == same
+    assert fingerprint != other
+
+
+def test_first_results_pass_through_and_repeats_become_references():
+    dedup = SessionDeduplicator()
+    state = {}
+
+    first = dedup.present("refunds", [REFUNDS, PASSWORDS], state)
+    second = dedup.present("refunds", [REFUNDS, PASSWORDS], state)
+
+    assert first == [REFUNDS, PASSWORDS]
+    assert second == [
+        {"source": "refunds.md", "already_provided": True},
+        {"source": "passwords.md", "already_provided": True},
+    ]
+
+
+def test_partially_seen_documents_carry_only_unseen_sentences():
+    dedup = SessionDeduplicator()
+    state = {}
+    dedup.remember(state, [{**REFUNDS, "content": "Refunds are issued within five days."}])
+
+    new, references = dedup.split(state, [REFUNDS])
+
+    assert new == [{**REFUNDS, "content": "Shipping costs are not refunded."}]
+    assert references == []
+
+
+def test_sentences_trimmed_by_the_packer_are_returned_later():
+    long_refunds = {
+        "id": "refunds-2",
+        "title": "refunds.md",
+        "content": " ".join(f"Filler sentence {i} is long enough to matter." for i in range(30))
+        + " Refunds are issued within five days.",
+    }
+    dedup = SessionDeduplicator()
+    state = {}
+    packer = ContextPacker(token_budget=30, max_document_tokens=30)
+
+    [first] = dedup.present("refunds", [long_refunds], state, packer=packer)
+    [second] = dedup.present("filler sentence", [long_refunds], state, packer=packer)
+
+    assert "Refunds are issued within five days." in first["text"]
+    assert "Refunds are issued" not in second["text"]
+    assert "Filler sentence" in second["text"]
+
+
+def test_documents_dropped_by_the_packer_are_not_remembered():
+    dedup = SessionDeduplicator()
+    state = {}
+    packer = ContextPacker(token_budget=5, max_document_tokens=None)
+
+    dedup.present("refunds", [REFUNDS, PASSWORDS], state, packer=packer)
+    new, _ = dedup.split(state, [PASSWORDS])
+
+    assert new == [PASSWORDS]
+
+
+def test_state_is_bounded_and_reassigned():
+    dedup = SessionDeduplicator(state_key="seen", max_remembered=2)
+    state = {}
+    dedup.remember(state, [REFUNDS])
+    before = state["seen"]
+
+    dedup.remember(state, [PASSWORDS])
+
+    assert state["seen"] is not before
+    assert len(state["seen"]) == 2
+    new, _ = dedup.split(state, [REFUNDS])
+    assert new == [{**REFUNDS, "content": "Refunds are issued within five days."}]
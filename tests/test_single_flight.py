@@ -0,0 +1,168 @@
+"""Unit tests for ``app.utils.single_flight``."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import pytest
+
+from app.utils.single_flight import SingleFlight, request_key
+
+
+@dataclass
+class Resource:
+    corpus: str
+
+
+def wait_for_shared(flights, count):
+    deadline = time.monotonic() + 2
+    while flights.stats.shared < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_request_key_is_equal_for_equal_arguments():
+    first = request_key("q", rag_resources=[Resource("c")], filters={"b": 1, "a": [2]})
+    second = request_key("q", filters={"a": [2], "b": 1}, rag_resources=[Resource("c")])
+
+    assert first == second
+    assert hash(first) == hash(second)
+    assert request_key("q", rag_resources=[Resource("d")]) != request_key("q", rag_resources=[Resource("c")])
+
+
+def test_concurrent_blocking_calls_share_one_call():
+    flights = SingleFlight()
+    entered = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def backend():
+        calls.append(1)
+        entered.set()
+        release.wait(timeout=2)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(flights.do, "key", backend)
+        entered.wait(timeout=2)
+        followers = [pool.submit(flights.do, "key", backend) for _ in range(3)]
+        wait_for_shared(flights, 3)
+        release.set()
+        results = [leader.result(timeout=2)] + [f.result(timeout=2) for f in followers]
+
+    assert results == ["result"] * 4
+    assert calls == [1]
+    assert flights.stats.calls == 1 and flights.stats.shared == 3
+    assert flights.stats.shared_ratio == 0.75
+
+
+def test_finished_calls_are_not_reused():
+    flights = SingleFlight()
+
+    assert flights.do("key", lambda: 1) == 1
+    assert flights.do("key", lambda: 2) == 2
+    assert flights.stats.calls == 2
+
+
+def test_blocking_errors_reach_every_waiter():
+    flights = SingleFlight()
+    entered = threading.Event()
+    release = threading.Event()
+
+    def backend():
+        entered.set()
+        release.wait(timeout=2)
+        raise ValueError("backend down")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flights.do, "key", backend)
+        entered.wait(timeout=2)
+        follower = pool.submit(flights.do, "key", backend)
+        wait_for_shared(flights, 1)
+        release.set()
+
+        assert isinstance(leader.exception(timeout=2), ValueError)
+        assert isinstance(follower.exception(timeout=2), ValueError)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_coroutines_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def backend():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*(flights.do_async("key", backend) for _ in range(5)))
+
+    assert results == ["result"] * 5
+    assert calls == [1]
+    assert await flights.do_async("other", backend) == "result"
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_async_errors_reach_every_waiter():
+    flights = SingleFlight()
+
+    async def backend():
+        await asyncio.sleep(0.01)
+        raise ValueError("backend down")
+
+    results = await asyncio.gather(
+        *(flights.do_async("key", backend) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_leaves_the_others_waiting():
+    flights = SingleFlight()
+    cancelled = []
+
+    async def backend():
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return "result"
+
+    first = asyncio.ensure_future(flights.do_async("key", backend))
+    second = asyncio.ensure_future(flights.do_async("key", backend))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert await second == "result"
+    assert first.cancelled()
+    assert cancelled == []
+
+
+@pytest.mark.asyncio
+async def test_shared_call_is_cancelled_once_every_caller_left():
+    flights = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def backend():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    callers = [asyncio.ensure_future(flights.do_async("key", backend)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+    async def fresh():
+        return "fresh"
+
+    assert await flights.do_async("key", fresh) == "fresh"